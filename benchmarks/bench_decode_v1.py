@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: Dekodierung von InfluxDB v1 Query-Ergebnissen
+
+Vergleicht den bisherigen Pfad (get_points() -> Dict pro Zeile -> ISO-String-Parsing mit
+format='mixed') mit der spaltenweisen Dekodierung von Epoch-Millisekunden.
+
+Aufruf:
+    python benchmarks/bench_decode_v1.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Füge das Projektverzeichnis zum Python-Pfad hinzu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from influxdb.resultset import ResultSet
+from core.data.decoding import decode_series_v1
+
+def make_series(rows, epoch_ms):
+    """
+    Erzeugt eine synthetische Serie wie in der JSON-Antwort von /query (10-Sekunden-Raster)
+    """
+    start_ms = 1672531200000
+    epochs = start_ms + np.arange(rows, dtype=np.int64) * 10_000
+    values = np.random.default_rng(42).normal(500, 100, rows).round(1)
+    if epoch_ms:
+        times = epochs.tolist()
+    else:
+        times = pd.to_datetime(epochs, unit="ms", utc=True).strftime("%Y-%m-%dT%H:%M:%SZ").tolist()
+    return {
+        "name": "W",
+        "tags": {"entity_id": "senec_house_power"},
+        "columns": ["time", "value"],
+        "values": [list(row) for row in zip(times, values.tolist())]
+    }
+
+def decode_legacy(series):
+    """
+    Bisheriger Pfad aus fetch_senec_power_data_v1 / fetch_market_prices
+    """
+    result = ResultSet({"series": [series]})
+    data = []
+    for point in result.get_points():
+        data.append({"time": point["time"], "value": point["value"]})
+    df = pd.DataFrame(data)
+    df["time"] = pd.to_datetime(df["time"], format="mixed", errors="coerce")
+    df = df.dropna(subset=["time"])
+    return df.set_index("time")
+
+def measure(label, func, series, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = func(series)
+        best = min(best, time.perf_counter() - started)
+    rows = len(df)
+    print(f"{label:<28} {rows:>10} Zeilen  {best * 1000:>9.1f} ms  {rows / best:>14,.0f} Zeilen/s")
+    return rows / best
+
+def main():
+    parser = argparse.ArgumentParser(description="Dekodier-Durchsatz für InfluxDB v1 Ergebnisse")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Anzahl Zeilen der synthetischen Serie")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (bester Lauf zählt)")
+    args = parser.parse_args()
+
+    legacy = measure("ISO-Strings + Dicts (alt)", decode_legacy, make_series(args.rows, epoch_ms=False), args.repeat)
+    columnar = measure("epoch='ms' spaltenweise (neu)", decode_series_v1, make_series(args.rows, epoch_ms=True), args.repeat)
+    print(f"Beschleunigung: {columnar / legacy:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Durchsatz der Datenzugriffsfunktionen gegen einen lokalen InfluxDB-Ersatz
+
+Misst für jede Fetch-Funktion und jeden Zeitraum (1 Tag bis 5 Jahre) die Latenz,
+die gelieferten Zeilen pro Sekunde und den Spitzenspeicher (tracemalloc). Der
+Server (benchmarks/fake_influxdb.py) läuft in einem eigenen Prozess, damit seine
+Speicherbelegung nicht in die Messung eingeht.
+
+Aufruf:
+    python benchmarks/bench_fetch.py --spans 1,7,30,365,1825 --interval 10
+    python benchmarks/bench_fetch.py --latency 0.02 --csv ergebnisse.csv
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Füge das Projektverzeichnis zum Python-Pfad hinzu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import requests
+from core.config import CONFIG
+from core.data import (fetch_dashboard_data, fetch_senec_entities, fetch_senec_entities_v1,
+                       get_client_registry)
+from core.data.influxdb_market import fetch_market_prices
+from core.data.influxdb_v1 import resolve_resolution
+
+END_TIME = pd.Timestamp("2024-06-01")
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(interval, latency):
+    """
+    Startet den InfluxDB-Ersatz als eigenen Prozess und wartet, bis er antwortet
+    """
+    port = _free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_influxdb.py")
+    process = subprocess.Popen(
+        [sys.executable, script, "--port", str(port), "--interval", str(interval), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/ping", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake InfluxDB Server startet nicht")
+
+def fetch_functions(entity_ids, raw_max_days):
+    """
+    Zu messende Funktionen: Name -> (Funktion (start, end) -> Ergebnis, maximale Tage oder None)
+    """
+    def flux(start, end):
+        return fetch_senec_entities(start, end, entity_ids, every=f"{resolve_resolution(start, end)}s")
+
+    def dashboard(start, end):
+        return fetch_dashboard_data(start, end, entity_ids)["power"]
+
+    return {
+        "v1 auto": (lambda start, end: fetch_senec_entities_v1(start, end, entity_ids), None),
+        "v1 raw": (lambda start, end: fetch_senec_entities_v1(start, end, entity_ids, "raw"), raw_max_days),
+        "EPEX": (fetch_market_prices, None),
+        "Flux auto": (flux, None),
+        "async dashboard": (dashboard, None),
+    }
+
+def measure(func, start, end, repeat):
+    """
+    Bester Lauf aus repeat Wiederholungen plus ein Lauf mit tracemalloc für den Spitzenspeicher
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(start, end)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(start, end)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rows = len(result) if result is not None else 0
+    return {"latency_ms": best * 1000, "rows": rows, "rows_per_s": rows / best if best > 0 else 0.0,
+            "peak_mb": peak / 1024 / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description="Durchsatz der core.data Fetch-Funktionen")
+    parser.add_argument("--spans", default="1,7,30,365,1825", help="Zeiträume in Tagen, kommagetrennt")
+    parser.add_argument("--interval", type=int, default=10, help="Abstand der SENEC Messpunkte in Sekunden")
+    parser.add_argument("--latency", type=float, default=0.0, help="Künstliche Verzögerung pro Request in Sekunden")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (bester Lauf zählt)")
+    parser.add_argument("--raw-max-days", type=int, default=30, help="Rohdaten nur bis zu dieser Zeitraumlänge")
+    parser.add_argument("--functions", default=None, help="Nur diese Funktionen messen, kommagetrennt")
+    parser.add_argument("--cache", action="store_true", help="Parquet- und Fenster-Cache aktivieren (temporäres Verzeichnis)")
+    parser.add_argument("--csv", default=None, help="Ergebnisse zusätzlich als CSV speichern")
+    args = parser.parse_args()
+
+    process, url = start_server(args.interval, args.latency)
+    try:
+        CONFIG["data_sources"]["influxdb"]["url"] = url
+        CONFIG["cache"]["enabled"] = args.cache
+        CONFIG["cache"]["memo_enabled"] = args.cache
+        if args.cache:
+            CONFIG["cache"]["directory"] = tempfile.mkdtemp(prefix="bench-cache-")
+        get_client_registry().close_all()
+
+        entity_ids = list(CONFIG["data_sources"]["influxdb"]["entity_ids"].values())
+        functions = fetch_functions(entity_ids, args.raw_max_days)
+        if args.functions:
+            selected = [name.strip() for name in args.functions.split(",")]
+            functions = {name: functions[name] for name in selected}
+
+        print(f"Fake InfluxDB: {url} (Raster {args.interval}s, Latenz {args.latency * 1000:.0f} ms)")
+        print(f"{'Funktion':<18} {'Tage':>6} {'Zeilen':>10} {'Latenz':>12} {'Zeilen/s':>14} {'Speicher':>10}")
+
+        results = []
+        for days in [int(value) for value in args.spans.split(",")]:
+            start = END_TIME - pd.Timedelta(days=days)
+            for name, (func, max_days) in functions.items():
+                if max_days is not None and days > max_days:
+                    continue
+                stats = measure(func, start, END_TIME, args.repeat)
+                results.append({"function": name, "days": days, **stats})
+                print(f"{name:<18} {days:>6} {stats['rows']:>10} {stats['latency_ms']:>9.1f} ms "
+                      f"{stats['rows_per_s']:>14,.0f} {stats['peak_mb']:>7.1f} MB")
+
+        if args.csv:
+            pd.DataFrame(results).to_csv(args.csv, index=False)
+            print(f"Ergebnisse gespeichert: {args.csv}")
+    finally:
+        get_client_registry().close_all()
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Lokaler InfluxDB-Ersatz für Benchmarks und Tests ohne Home Assistant Installation
+
+Ein In-Process HTTP-Server, der die Teile des InfluxDB Protokolls spricht, die
+core.data verwendet:
+    - v1 /query (InfluxQL, JSON, optional epoch='ms', GROUP BY time() mit mean/min/max/last)
+    - v2 /api/v2/query (Flux, CSV ohne Annotationen, aggregateWindow und pivot)
+
+Die Zeitreihen sind synthetisch und deterministisch: SENEC Leistungsdaten
+(Haus, Solar, Batterie, Netz) im Raster interval_seconds und stündliche
+EPEX Spot Preise. Es werden keine Daten vorgehalten, jede Anfrage berechnet
+nur den angefragten Ausschnitt.
+
+Aufruf (Server im Vordergrund, z.B. für die Web-App):
+    python benchmarks/fake_influxdb.py --port 8086 --interval 10
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Füge das Projektverzeichnis zum Python-Pfad hinzu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+
+_FROM = re.compile(r'FROM\s+"([^"]+)"')
+_ENTITY_REGEX = re.compile(r'"?entity_id"?\]?\s*=~\s*/\^\((.*?)\)\$/')
+_ENTITY_EQ = re.compile(r'"entity_id"\s*=\s*\'([^\']+)\'')
+_TIME_START = re.compile(r"time\s*>=\s*'([^']+)'")
+_TIME_END = re.compile(r"time\s*(<=|<)\s*'([^']+)'")
+_GROUP_TIME = re.compile(r'GROUP BY time\((\d+)s\)')
+_FLUX_RANGE = re.compile(r'range\(start:\s*([^,\s]+),\s*stop:\s*([^)\s]+)\)')
+_FLUX_WINDOW = re.compile(r'aggregateWindow\(every:\s*([0-9a-z]+)')
+_DURATION = re.compile(r'(\d+)(ms|s|m|h|d|w)')
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+def _unescape(pattern):
+    """
+    Entity IDs aus einem mit re.escape erzeugten Alternativ-Muster zurückgewinnen
+    """
+    return [re.sub(r'\\(.)', r'\1', part) for part in pattern.split("|")]
+
+def _parse_duration(text):
+    return int(sum(int(amount) * _DURATION_SECONDS[unit] for amount, unit in _DURATION.findall(text)))
+
+def _to_ms(value):
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value // 1_000_000
+
+class SyntheticDataset:
+    """
+    Deterministische SENEC und EPEX Zeitreihen
+
+    Args:
+        interval_seconds (int): Abstand der SENEC Messpunkte
+        price_interval_seconds (int): Abstand der EPEX Preise
+        start (datetime): Erster verfügbarer Zeitpunkt (None = unbegrenzt)
+        end (datetime): Letzter verfügbarer Zeitpunkt (None = unbegrenzt)
+    """
+
+    def __init__(self, interval_seconds=10, price_interval_seconds=3600, start=None, end=None):
+        influx_config = CONFIG["data_sources"]["influxdb"]
+        self.interval_seconds = int(interval_seconds)
+        self.price_interval_seconds = int(price_interval_seconds)
+        self.start_ms = _to_ms(start) if start is not None else None
+        self.end_ms = _to_ms(end) if end is not None else None
+        self.roles = {entity_id: role for role, entity_id in influx_config["entity_ids"].items()}
+        self.roles.setdefault(influx_config["entity_id"], "house_power")
+        self.price_entity = influx_config["market_entity_ids"]["total_price"]
+        self.power_measurement = influx_config["measurement"]
+
+    def epochs(self, start_ms, end_ms, end_inclusive=True, interval_seconds=None):
+        """
+        Zeitstempel (Epoch-Millisekunden) der Messpunkte im Zeitraum
+        """
+        step = (interval_seconds or self.interval_seconds) * 1000
+        if self.start_ms is not None:
+            start_ms = max(start_ms, self.start_ms)
+        if self.end_ms is not None and self.end_ms < end_ms:
+            end_ms, end_inclusive = self.end_ms, True
+        first = -(-start_ms // step)
+        last = end_ms // step if end_inclusive or end_ms % step else end_ms // step - 1
+        return np.arange(first, last + 1, dtype=np.int64) * step
+
+    def power(self, entity_id, epochs):
+        """
+        Leistungswerte in W mit Tagesprofil und deterministischem Rauschen
+        """
+        seconds = epochs // 1000
+        phase = (seconds % 86400) / 86400
+        noise = ((seconds // self.interval_seconds * 2654435761 + len(entity_id) * 97) % 1000) / 1000 - 0.5
+
+        house = 350 + 250 * np.clip(np.sin(2 * np.pi * (phase - 0.3)), 0, None) + 150 * noise
+        solar = np.clip(4000 * np.sin(np.pi * (phase - 0.25) / 0.5), 0, None) * (0.8 + 0.2 * noise)
+        battery = np.clip(solar - house, -2500, 2500) * 0.8
+        role = self.roles.get(entity_id, "house_power")
+        if role == "solar_generated":
+            return solar
+        if role == "battery_power":
+            return battery
+        if role == "grid_power":
+            return house - solar + battery
+        return house
+
+    def price(self, epochs):
+        """
+        Stündliche Gesamtpreise in €/kWh mit Tagesprofil
+        """
+        seconds = epochs // 1000
+        phase = (seconds % 86400) / 86400
+        noise = ((seconds // self.price_interval_seconds * 2654435761) % 1000) / 1000 - 0.5
+        return np.round(0.28 + 0.08 * np.sin(2 * np.pi * (phase - 0.4)) + 0.05 * noise, 5)
+
+    def series(self, measurement, entity_id, start_ms, end_ms, end_inclusive=True):
+        """
+        Rohdaten einer Entität als (epochs, values) oder None, wenn die Entität unbekannt ist
+        """
+        if measurement == self.power_measurement and entity_id in self.roles:
+            epochs = self.epochs(start_ms, end_ms, end_inclusive)
+            return epochs, self.power(entity_id, epochs)
+        if entity_id == self.price_entity:
+            epochs = self.epochs(start_ms, end_ms, end_inclusive, self.price_interval_seconds)
+            return epochs, self.price(epochs)
+        return None
+
+def _bucketize(epochs, values, start_ms, end_ms, bucket_ms):
+    """
+    mean/min/max/last pro Zeit-Bucket wie InfluxDB mit fill(null)
+    """
+    first = start_ms // bucket_ms * bucket_ms
+    buckets = np.arange(first, end_ms + 1, bucket_ms, dtype=np.int64)
+    if len(epochs):
+        grouped = pd.Series(values).groupby((epochs - first) // bucket_ms).agg(["mean", "min", "max", "last"])
+        stats = grouped.reindex(range(len(buckets))).to_numpy()
+    else:
+        stats = np.full((len(buckets), 4), np.nan)
+    return buckets, stats
+
+def _rows(epochs, matrix, epoch):
+    """
+    Zeilen für die JSON-Antwort (NaN wird zu null, Zeit als Epoch oder RFC3339)
+    """
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(len(epochs), -1)
+    values = matrix.astype(object)
+    values[np.isnan(matrix)] = None
+    if epoch == "ms":
+        times = epochs.tolist()
+    elif epoch == "s":
+        times = (epochs // 1000).tolist()
+    else:
+        times = pd.to_datetime(epochs, unit="ms", utc=True).strftime("%Y-%m-%dT%H:%M:%SZ").tolist()
+    return [[time_value, *row] for time_value, row in zip(times, values.tolist())]
+
+def handle_influxql(dataset, query, epoch=None):
+    """
+    Beantwortet eine InfluxQL SELECT Query im JSON Format von /query
+    """
+    measurement = _FROM.search(query).group(1)
+    regex = _ENTITY_REGEX.search(query)
+    entity_ids = _unescape(regex.group(1)) if regex else [_ENTITY_EQ.search(query).group(1)]
+    start_ms = _to_ms(_TIME_START.search(query).group(1))
+    operator, end_text = _TIME_END.search(query).groups()
+    end_ms = _to_ms(end_text)
+    group_time = _GROUP_TIME.search(query)
+    grouped_by_entity = 'GROUP BY' in query and '"entity_id"' in query.split('GROUP BY', 1)[1]
+
+    series = []
+    for entity_id in entity_ids:
+        data = dataset.series(measurement, entity_id, start_ms, end_ms, end_inclusive=operator == "<=")
+        if data is None:
+            continue
+        epochs, values = data
+        if group_time:
+            epochs, stats = _bucketize(epochs, values, start_ms, end_ms if operator == "<=" else end_ms - 1,
+                                       int(group_time.group(1)) * 1000)
+            columns = ["time", "value", "min", "max", "last"]
+            rows = _rows(epochs, stats, epoch)
+        else:
+            if not len(epochs):
+                continue
+            columns = ["time", "value"]
+            rows = _rows(epochs, values, epoch)
+        entry = {"name": measurement, "columns": columns, "values": rows}
+        if grouped_by_entity:
+            entry["tags"] = {"entity_id": entity_id}
+        series.append(entry)
+
+    result = {"statement_id": 0}
+    if series:
+        result["series"] = series
+    return {"results": [result]}
+
+def handle_flux(dataset, query):
+    """
+    Beantwortet eine gepivotete Flux Query als CSV ohne Annotationen
+    """
+    start_text, stop_text = _FLUX_RANGE.search(query).groups()
+    start_ms, stop_ms = _to_ms(start_text), _to_ms(stop_text)
+    entity_ids = _unescape(_ENTITY_REGEX.search(query).group(1))
+    window = _FLUX_WINDOW.search(query)
+
+    columns = {}
+    for entity_id in entity_ids:
+        data = dataset.series(dataset.power_measurement, entity_id, start_ms, stop_ms, end_inclusive=False)
+        if data is None or not len(data[0]):
+            continue
+        epochs, values = data
+        series = pd.Series(values, index=epochs)
+        if window:
+            every_ms = _parse_duration(window.group(1)) * 1000
+            # aggregateWindow: Zeitstempel ist das Fensterende, begrenzt auf das Ende des Zeitraums
+            stops = np.minimum((epochs // every_ms + 1) * every_ms, stop_ms)
+            series = series.groupby(stops).mean()
+        columns[entity_id] = series
+
+    if not columns:
+        return ""
+
+    table = pd.DataFrame(columns).sort_index()
+    times = pd.to_datetime(table.index.to_numpy(), unit="ms", utc=True).strftime("%Y-%m-%dT%H:%M:%SZ")
+    table.index = times
+    table.index.name = "_time"
+    table = table.reset_index()
+    table.insert(0, "table", 0)
+    table.insert(0, "result", "_result")
+    table.insert(0, "", "")
+    return table.to_csv(index=False, lineterminator="\r\n")
+
+class FakeInfluxServer:
+    """
+    InfluxDB-Ersatz in einem Hintergrund-Thread
+
+    Args:
+        dataset (SyntheticDataset): Datenquelle (Standard: 10-Sekunden-Raster, unbegrenzt)
+        latency (float): Künstliche Antwortverzögerung pro Request in Sekunden (simuliert Netzwerk)
+        host (str): Adresse
+        port (int): Port (0 = freier Port)
+
+    Verwendung:
+        with FakeInfluxServer() as server:
+            CONFIG["data_sources"]["influxdb"]["url"] = server.url
+    """
+
+    def __init__(self, dataset=None, latency=0.0, host="127.0.0.1", port=0):
+        self.dataset = dataset or SyntheticDataset()
+        self.latency = float(latency)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _dispatch(self):
+                server._count()
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                body = self._body()
+                try:
+                    if parsed.path == "/ping":
+                        self.send_response(204)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                    elif parsed.path == "/query":
+                        if body and "q" not in params:
+                            params.update({key: values[-1] for key, values in parse_qs(body.decode("utf-8")).items()})
+                        payload = handle_influxql(server.dataset, params["q"], params.get("epoch"))
+                        self._send(200, json.dumps(payload), "application/json")
+                    elif parsed.path == "/api/v2/query":
+                        request = json.loads(body or b"{}")
+                        self._send(200, handle_flux(server.dataset, request["query"]), "text/csv; charset=utf-8")
+                    else:
+                        self._send(404, json.dumps({"error": f"unbekannter Pfad {parsed.path}"}), "application/json")
+                except Exception as e:
+                    self._send(400, json.dumps({"error": str(e)}), "application/json")
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-influxdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler InfluxDB-Ersatz mit synthetischen SENEC und EPEX Daten")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8086)
+    parser.add_argument("--interval", type=int, default=10, help="Abstand der SENEC Messpunkte in Sekunden")
+    parser.add_argument("--latency", type=float, default=0.0, help="Künstliche Verzögerung pro Request in Sekunden")
+    args = parser.parse_args()
+
+    server = FakeInfluxServer(SyntheticDataset(interval_seconds=args.interval), latency=args.latency,
+                              host=args.host, port=args.port)
+    print(f"Fake InfluxDB läuft unter {server.url} (Strg+C zum Beenden)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+if __name__ == "__main__":
+    main()
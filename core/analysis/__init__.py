@@ -2,13 +2,39 @@
 Analysemodule
 """
 
-from .consumption import analyze_historical_consumption, analyze_monthly_consumption, get_consumption_by_hour
+from .consumption import analyze_historical_consumption, analyze_monthly_consumption, analyze_time_period, get_consumption_by_hour
+from .energy import EnergyIntegrator, cumulative_energy
+from .rollup import compute_rollups
+from .rollup_store import RollupStore, get_rollup_store
+from .timeindex import TimeSeriesIndex
+from .profile import LoadProfile
 from .cost import calculate_costs, find_best_alternative
+from .battery import simulate_batteries, simulate_battery_sizes
+from .loadshift import apply_schedule, optimize_load_shifting
+from .sweep import run_sweep
+from .montecarlo import simulate_cost_distribution
+from .flow import aggregate_energy_flows, decompose_energy_flows
 
 __all__ = [
     'analyze_historical_consumption',
     'analyze_monthly_consumption',
+    'analyze_time_period',
+    'EnergyIntegrator',
+    'cumulative_energy',
+    'compute_rollups',
+    'RollupStore',
+    'get_rollup_store',
+    'TimeSeriesIndex',
+    'LoadProfile',
     'calculate_costs',
     'find_best_alternative',
+    'simulate_batteries',
+    'simulate_battery_sizes',
+    'optimize_load_shifting',
+    'apply_schedule',
+    'run_sweep',
+    'simulate_cost_distribution',
+    'aggregate_energy_flows',
+    'decompose_energy_flows',
     'get_consumption_by_hour'
 ]
\ No newline at end of file
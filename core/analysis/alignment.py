@@ -0,0 +1,250 @@
+"""
+Gemeinsame Zeitachse für mehrere Messreihen (SENEC Leistungen, EPEX Preise)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+def merge_times(*arrays):
+    """
+    Vereinigung sortierter Zeitachsen in Epoch-ns (stabile Sortierung verschmilzt die
+    Läufe deutlich schneller als np.union1d); identische Achsen werden nicht erneut sortiert
+    """
+    arrays = [array for array in arrays if array is not None and len(array)]
+    if not arrays:
+        return np.array([], dtype=np.int64)
+    merged = arrays[0]
+    for array in arrays[1:]:
+        if len(array) == len(merged) and np.array_equal(array, merged):
+            continue
+        merged = np.sort(np.concatenate((merged, array)), kind="stable")
+        keep = np.ones(len(merged), dtype=bool)
+        keep[1:] = merged[1:] != merged[:-1]
+        merged = merged[keep]
+    return merged
+
+def asof(times, source_times, source_values, max_staleness_ns=None, method="step"):
+    """
+    Werte einer Reihe zu beliebigen Zeitpunkten (as-of Join)
+
+    Args:
+        times (ndarray): Zielzeitpunkte in Epoch-ns (sortiert)
+        source_times (ndarray): Zeitpunkte der Reihe in Epoch-ns (sortiert)
+        source_values (ndarray): Werte der Reihe
+        max_staleness_ns (int): Ältere Werte gelten als fehlend (None = unbegrenzt)
+        method (str): 'step' (letzter Wert wird gehalten) oder 'linear' (Interpolation zum
+                      nächsten Wert, sofern dieser nicht weiter als max_staleness_ns entfernt ist)
+
+    Returns:
+        ndarray: float64, NaN vor dem ersten Wert und für veraltete Werte
+    """
+    if len(source_times) == len(times) and np.array_equal(source_times, times):
+        return np.array(source_values, dtype=np.float64)
+    positions = np.searchsorted(source_times, times, side="right") - 1
+    clipped = np.clip(positions, 0, None)
+    values = source_values[clipped].astype(np.float64)
+    age = times - source_times[clipped]
+    missing = positions < 0
+    if max_staleness_ns is not None:
+        missing |= age > max_staleness_ns
+
+    if method == "linear":
+        following = np.minimum(clipped + 1, len(source_times) - 1)
+        span = source_times[following] - source_times[clipped]
+        usable = (following > clipped) & ~missing
+        if max_staleness_ns is not None:
+            usable &= span <= max_staleness_ns
+        with np.errstate(invalid="ignore", divide="ignore"):
+            interpolated = values + (source_values[following] - values) * age / span
+        values = np.where(usable & ~np.isnan(interpolated), interpolated, values)
+
+    values[missing] = np.nan
+    return values
+
+def _source_arrays(data, column="value"):
+    """
+    Zeitpunkte (Epoch-ns, sortiert) und Werte einer Reihe; zeitzonenlose Indizes gelten in CONFIG timezone
+    """
+    times, values, tz = series_arrays(data, column)
+    if tz is None:
+        index = pd.DatetimeIndex(times.view("datetime64[ns]")).tz_localize(CONFIG["timezone"])
+        times, tz = _index_ns(index), index.tz
+    return times, values, tz
+
+class AlignedSeries:
+    """
+    Mehrere Reihen auf einer gemeinsamen Zeitachse, je Reihe ein zusammenhängendes float64-Array
+
+    Intervall i reicht von times[i] bis times[i+1] (höchstens max_gap); held_ns enthält die
+    jeweilige Dauer, das letzte Intervall hat keine Dauer. Werte sind NaN, wo eine Reihe keinen
+    (aktuellen) Messwert hat.
+    """
+
+    def __init__(self, times, values, held_ns, tz):
+        self.times = times
+        self.values = values
+        self.held_ns = held_ns
+        self.tz = tz
+        self._index = None
+
+    def __len__(self):
+        return len(self.times)
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    @property
+    def names(self):
+        return list(self.values)
+
+    @property
+    def index(self):
+        """
+        Zeitachse als DatetimeIndex (wird erst bei Bedarf erzeugt)
+        """
+        if self._index is None:
+            self._index = pd.DatetimeIndex(self.times.view("datetime64[ns]")).tz_localize("UTC").tz_convert(self.tz)
+        return self._index
+
+    @property
+    def held_hours(self):
+        return self.held_ns / 3.6e12
+
+    def slice(self, begin, end=None):
+        """
+        Positionsbereich [begin, end) als neue AlignedSeries (Sichten ohne Kopie)
+        """
+        return AlignedSeries(self.times[begin:end], {name: values[begin:end] for name, values in self.values.items()},
+                             self.held_ns[begin:end], self.tz)
+
+    def since(self, start_ns):
+        """
+        Ausschnitt ab dem zum Zeitpunkt start_ns gültigen Wert
+        """
+        return self.slice(max(int(np.searchsorted(self.times, start_ns, side="right")) - 1, 0))
+
+    def valid_range(self, names):
+        """
+        Positionsbereich (begin, end) vom ersten bis zum letzten Zeitpunkt, an dem eine der Reihen
+        einen Wert hat (z.B. um Preise für die Zukunft abzuschneiden); None ohne Werte
+        """
+        present = [~np.isnan(self.values[name]) for name in names if name in self.values]
+        valid = np.flatnonzero(np.logical_or.reduce(present)) if present else []
+        if not len(valid):
+            return None
+        return int(valid[0]), int(valid[-1]) + 1
+
+    def filled(self, name, fill=0.0):
+        """
+        Werte einer Reihe mit fehlenden Werten ersetzt
+        """
+        values = self.values.get(name)
+        if values is None:
+            return np.full(len(self.times), fill)
+        return np.where(np.isnan(values), fill, values)
+
+    def energy_kwh(self, name):
+        """
+        Energie je Intervall in kWh für eine Leistungsreihe in W
+        """
+        return self.filled(name) * self.held_hours / 1000
+
+    def integrator(self, name):
+        """
+        EnergyIntegrator über der gemeinsamen Zeitachse (z.B. für calculate_costs)
+        """
+        return EnergyIntegrator.from_arrays(self.times, self.values[name], self.held_ns, self.tz)
+
+    def sum_by_bins(self, per_interval, edges):
+        """
+        Summiert Größen je Intervall (z.B. kWh) auf beliebige Perioden
+
+        Intervalle, die eine Periodengrenze überschreiten, werden zeitanteilig aufgeteilt; da die
+        Werte innerhalb eines Intervalls konstant sind, ist das exakt.
+
+        Args:
+            per_interval (dict): Name -> ndarray mit einem Wert je Intervall
+            edges: Aufsteigende Periodengrenzen (DatetimeIndex oder Epoch-ns)
+
+        Returns:
+            dict: Name -> ndarray mit einem Wert je Periode
+        """
+        edge_ns = _index_ns(edges) if isinstance(edges, pd.DatetimeIndex) else np.asarray(edges, dtype=np.int64)
+        positions = np.searchsorted(self.times, edge_ns, side="right") - 1
+        clipped = np.clip(positions, 0, None)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(self.held_ns[clipped] > 0,
+                                np.minimum(edge_ns - self.times[clipped], self.held_ns[clipped]) / self.held_ns[clipped], 0.0)
+        totals = {}
+        for name, values in per_interval.items():
+            cumulative = np.concatenate(([0.0], np.cumsum(values)))
+            at_edges = np.where(positions >= 0, cumulative[clipped] + values[clipped] * fraction, 0.0)
+            totals[name] = np.diff(at_edges)
+        return totals
+
+    def to_frame(self):
+        """
+        Alle Reihen als DataFrame (nur für Diagramme und Export)
+        """
+        return pd.DataFrame(self.values, index=self.index.rename("time"))
+
+def align_series(series, grid=None, method="step", max_staleness_seconds=None, max_gap_seconds=None, extra_times=None):
+    """
+    Richtet beliebig viele Reihen in einem Durchlauf auf eine gemeinsame Zeitachse aus
+
+    Args:
+        series (dict): Name -> DataFrame/Series/TimeSeries ('value' Spalte); None wird übersprungen
+        grid: None (Vereinigung aller Zeitpunkte), Liste von Namen (Vereinigung dieser Reihen),
+              Frequenz wie '15min' (festes Raster) oder Epoch-ns Array
+        method (str/dict): 'step' oder 'linear', global oder je Name
+        max_staleness_seconds (float/dict): Maximales Alter eines Werts, global oder je Name
+                                            (Standard: max_gap_seconds, None im dict = unbegrenzt)
+        max_gap_seconds (float): Maximale Dauer eines Intervalls (Standard: CONFIG max_gap_minutes)
+        extra_times (ndarray): Zusätzliche Zeitpunkte in Epoch-ns (z.B. Periodengrenzen)
+
+    Returns:
+        AlignedSeries: Gemeinsame Zeitachse mit einem Array je Reihe oder None ohne Daten
+    """
+    if max_gap_seconds is None:
+        max_gap_seconds = float(CONFIG["max_gap_minutes"]) * 60
+    sources = {name: _source_arrays(data) for name, data in series.items() if data is not None and len(data)}
+    if not sources:
+        return None
+    tz = next(iter(sources.values()))[2]
+
+    if grid is None:
+        times = merge_times(*(source_times for source_times, _, _ in sources.values()))
+    elif isinstance(grid, (list, tuple)):
+        times = merge_times(*(sources[name][0] for name in grid if name in sources))
+    elif isinstance(grid, str):
+        first = min(source_times[0] for source_times, _, _ in sources.values())
+        last = max(source_times[-1] for source_times, _, _ in sources.values())
+        step = pd.Timedelta(grid).value
+        times = np.arange(first - first % step, last + 1, step, dtype=np.int64)
+    else:
+        times = np.asarray(grid, dtype=np.int64)
+    if extra_times is not None and len(times):
+        times = merge_times(times, extra_times[(extra_times > times[0]) & (extra_times < times[-1])])
+
+    values = {}
+    for name, (source_times, source_values, _) in sources.items():
+        staleness = max_staleness_seconds.get(name, max_gap_seconds) if isinstance(max_staleness_seconds, dict) else (
+            max_staleness_seconds if max_staleness_seconds is not None else max_gap_seconds)
+        rule = method.get(name, "step") if isinstance(method, dict) else method
+        values[name] = asof(times, source_times, source_values,
+                            int(staleness * 1e9) if staleness is not None else None, rule)
+
+    held_ns = np.zeros(len(times), dtype=np.int64)
+    if len(times):
+        np.minimum(np.diff(times), int(max_gap_seconds * 1e9), out=held_ns[:-1])
+    return AlignedSeries(times, values, held_ns, tz)
@@ -0,0 +1,198 @@
+"""
+Simulation von Heimspeichern unterschiedlicher Größe über historischen SENEC Daten
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.alignment import align_series
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Standardwerte für nicht angegebene Speicherparameter
+DEFAULT_BATTERY = {
+    "capacity_kwh": 10.0,
+    "charge_power_kw": 5.0,
+    "discharge_power_kw": 5.0,
+    "efficiency": 0.9,  # Round-Trip-Wirkungsgrad
+    "min_soc": 0.1  # Anteil der Kapazität, der nicht entladen wird
+}
+
+def prepare_battery_inputs(house_data, solar_data, prices=None, max_gap_seconds=None):
+    """
+    Richtet Hausverbrauch, PV-Erzeugung und Preise auf eine gemeinsame Zeitachse aus
+
+    Args:
+        house_data (DataFrame): Hausverbrauch in W mit Zeitindex und 'value' Spalte
+        solar_data (DataFrame): PV-Erzeugung in W (None = keine PV)
+        prices (DataFrame): EPEX Preise in €/kWh mit 'value' Spalte (None = CONFIG current_tariff)
+        max_gap_seconds (float): Maximale Haltedauer eines Messwerts (Standard: CONFIG max_gap_minutes)
+
+    Returns:
+        dict: times (Epoch-ns), net_kwh (Energie je Intervall, > 0 Bezug, < 0 Überschuss)
+              und price (€/kWh je Intervall) als ndarrays
+    """
+    # Zeitachse aus Haus- und PV-Messungen; Preise gelten bis zum nächsten Preis
+    aligned = align_series({"house": house_data, "solar": solar_data, "price": prices}, grid=["house", "solar"],
+                           max_staleness_seconds={"house": None, "solar": None, "price": None},
+                           max_gap_seconds=max_gap_seconds)
+    return {
+        "times": aligned.times,
+        "net_kwh": aligned.energy_kwh("house") - aligned.energy_kwh("solar"),
+        "hours": aligned.held_hours,
+        "price": aligned.filled("price", float(CONFIG["current_tariff"]))
+    }
+
+def _battery_parameters(configurations):
+    """
+    Speicherparameter als Spaltenvektoren (Konfigurationen × 1)
+    """
+    table = pd.DataFrame([{**DEFAULT_BATTERY, **configuration} for configuration in configurations])
+    table = table[list(DEFAULT_BATTERY)].astype(np.float64)
+    column = lambda name: table[name].to_numpy()[:, None]
+    capacity = column("capacity_kwh")
+    root = np.sqrt(column("efficiency"))
+    return table, {
+        "upper": capacity,
+        "lower": capacity * column("min_soc"),
+        "charge_kw": column("charge_power_kw"),
+        "discharge_kw": column("discharge_power_kw"),
+        "root_efficiency": root
+    }
+
+def _soc_delta(net_kwh, hours, params):
+    """
+    Gewünschte Änderung des Speicherinhalts je Intervall (vor Begrenzung durch Kapazität)
+
+    Überschuss lädt mit höchstens charge_kw (Ladeverluste √η), Bezug entlädt mit höchstens
+    discharge_kw (Entladeverluste √η).
+    """
+    charge = np.minimum(np.maximum(-net_kwh, 0.0), params["charge_kw"] * hours) * params["root_efficiency"]
+    discharge = np.minimum(np.maximum(net_kwh, 0.0), params["discharge_kw"] * hours) / params["root_efficiency"]
+    return charge - discharge
+
+def simulate_batteries(inputs, configurations, feed_in_tariff=0.0, return_series=False):
+    """
+    Simuliert mehrere Speicherkonfigurationen in einem Durchlauf
+
+    Der Speicherinhalt folgt s[t+1] = clip(s[t] + d[t], lower, upper). Eine Verkettung solcher
+    Begrenzungen ist wieder eine Begrenzung der Form clip(s + a, l, h), daher wird die Reihe in
+    √n Blöcke geteilt: Ein erster Durchlauf fasst jeden Block zu (a, l, h) zusammen, dann werden
+    die Blockanfänge bestimmt und ein zweiter Durchlauf berechnet die Intervallwerte. Beide
+    Durchläufe sind über alle Blöcke und Konfigurationen vektorisiert.
+
+    Args:
+        inputs (dict): Ergebnis von prepare_battery_inputs
+        configurations (list): Speicherkonfigurationen als dicts (Schlüssel wie DEFAULT_BATTERY)
+        feed_in_tariff (float): Einspeisevergütung in €/kWh
+        return_series (bool): Zusätzlich Netzbezug und Speicherinhalt je Intervall liefern
+
+    Returns:
+        DataFrame: Eine Zeile je Konfiguration mit grid_import_kwh, grid_export_kwh, charged_kwh,
+                   discharged_kwh, cycles, cost_eur und savings_eur (gegenüber ohne Speicher);
+                   mit return_series ein Tupel (DataFrame, dict mit 'grid_kwh' und 'soc_kwh' als
+                   ndarrays Konfigurationen × Intervalle)
+    """
+    table, params = _battery_parameters(configurations)
+    net_kwh, hours, price = inputs["net_kwh"], inputs["hours"], inputs["price"]
+    n = len(net_kwh)
+    configs = len(table)
+
+    # Spaltenweise Ablage (Position im Block × Block), damit jeder Schritt zusammenhängend liest
+    block = max(int(np.ceil(np.sqrt(n))), 1)
+    blocks = max(-(-n // block), 1)
+    def by_position(values):
+        padded = np.zeros(block * blocks)
+        padded[:n] = values
+        return np.ascontiguousarray(padded.reshape(blocks, block).T)
+    net_cols, hour_cols, price_cols = by_position(net_kwh), by_position(hours), by_position(price)
+    lower, upper, root = params["lower"], params["upper"], params["root_efficiency"]
+
+    # 1. Durchlauf: Zusammensetzung der Begrenzungen je Block
+    shift = np.zeros((configs, blocks))
+    low = np.full((configs, blocks), -np.inf)
+    high = np.full((configs, blocks), np.inf)
+    for position in range(block):
+        delta = _soc_delta(net_cols[position], hour_cols[position], params)
+        shift += delta
+        low = np.clip(low + delta, lower, upper)
+        high = np.clip(high + delta, lower, upper)
+
+    # Speicherinhalt am Anfang jedes Blocks (Start mit leerem Speicher)
+    starts = np.empty((configs, blocks))
+    soc = lower[:, 0].copy()
+    for index in range(blocks):
+        starts[:, index] = soc
+        soc = np.clip(soc + shift[:, index], low[:, index], high[:, index])
+
+    # 2. Durchlauf: Intervallwerte und Summen
+    soc = starts
+    totals = {name: np.zeros(configs) for name in ("import", "export", "charged", "discharged", "cost")}
+    if return_series:
+        grid_series = np.empty((configs, block, blocks))
+        soc_series = np.empty((configs, block, blocks))
+    for position in range(block):
+        next_soc = np.clip(soc + _soc_delta(net_cols[position], hour_cols[position], params), lower, upper)
+        change = next_soc - soc
+        charged = np.maximum(change, 0.0)
+        discharged = np.maximum(-change, 0.0)
+        grid = net_cols[position] + charged / root - discharged * root
+        imported = np.maximum(grid, 0.0)
+        exported = np.maximum(-grid, 0.0)
+        totals["import"] += imported.sum(axis=1)
+        totals["export"] += exported.sum(axis=1)
+        totals["charged"] += charged.sum(axis=1)
+        totals["discharged"] += discharged.sum(axis=1)
+        totals["cost"] += (imported * price_cols[position] - exported * feed_in_tariff).sum(axis=1)
+        if return_series:
+            grid_series[:, position] = grid
+            soc_series[:, position] = soc
+        soc = next_soc
+
+    # Vergleich ohne Speicher
+    baseline_import = np.maximum(net_kwh, 0.0)
+    baseline_cost = float(baseline_import @ price - np.maximum(-net_kwh, 0.0).sum() * feed_in_tariff)
+
+    usable = (upper - lower)[:, 0]
+    result = table.assign(
+        grid_import_kwh=totals["import"],
+        grid_export_kwh=totals["export"],
+        charged_kwh=totals["charged"],
+        discharged_kwh=totals["discharged"],
+        cycles=np.divide(totals["discharged"], usable, out=np.zeros(configs), where=usable > 0),
+        cost_eur=totals["cost"],
+        savings_eur=baseline_cost - totals["cost"]
+    )
+    logger.info(f"Speichersimulation: {configs} Konfigurationen über {n} Intervalle")
+
+    if return_series:
+        reorder = lambda values: values.transpose(0, 2, 1).reshape(configs, -1)[:, :n]
+        return result, {"grid_kwh": reorder(grid_series), "soc_kwh": reorder(soc_series)}
+    return result
+
+def simulate_battery_sizes(house_data, solar_data, prices=None, capacities_kwh=(5.0, 10.0, 15.0), **battery):
+    """
+    Beantwortet "was wäre mit einem Speicher von 5/10/15 kWh" für die geladenen Daten
+
+    Args:
+        house_data (DataFrame): Hausverbrauch in W
+        solar_data (DataFrame): PV-Erzeugung in W
+        prices (DataFrame): EPEX Preise in €/kWh (None = CONFIG current_tariff)
+        capacities_kwh (tuple): Zu vergleichende Speichergrößen
+        **battery: Weitere Speicherparameter für alle Größen (siehe DEFAULT_BATTERY)
+
+    Returns:
+        DataFrame: Ergebnis von simulate_batteries oder None bei Fehlern
+    """
+    try:
+        if house_data is None or house_data.empty:
+            return None
+        inputs = prepare_battery_inputs(house_data, solar_data, prices)
+        configurations = [{**battery, "capacity_kwh": capacity} for capacity in capacities_kwh]
+        return simulate_batteries(inputs, configurations)
+
+    except Exception as e:
+        logger.error(f"Fehler bei der Speichersimulation: {e}")
+        return None
@@ -2,20 +2,30 @@
 Verbrauchsanalysemodul
 """
 
+import numpy as np
 import pandas as pd
 import logging
 from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator
+from core.analysis.rollup import compute_rollups, period_edges
+from core.analysis.timeindex import TimeSeriesIndex
+from core.analysis.profile import LoadProfile
+from core.data.timeseries import series_arrays
 from datetime import datetime
 
 # Logging konfigurieren
 logger = logging.getLogger(__name__)
 
-def analyze_historical_consumption(consumption_data):
+def analyze_historical_consumption(consumption_data, integrator=None, index=None, extremes=None):
     """
     Analysiert den historischen Verbrauch und berechnet Statistiken
     
     Args:
-        consumption_data (DataFrame): Verbrauchsdaten mit Zeitindex und 'value' Spalte
+        consumption_data (DataFrame/TimeSeries): Verbrauchsdaten mit Zeitindex und 'value' Spalte
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie der Daten
+        index (StoredSeriesIndex): Zeitindex mit RollupStore; die Kennzahlen kommen dann für den
+                                   Zeitraum der Daten aus den gespeicherten Stunden
+        extremes (tuple): (Minimum, Maximum) je Bucket bei Daten mit Auflösung (siehe bucket_extremes)
         
     Returns:
         dict: Analyseergebnisse mit Statistiken
@@ -25,21 +35,30 @@ def analyze_historical_consumption(consumption_data):
             logger.warning("Keine Verbrauchsdaten für Analyse verfügbar")
             return None
         
-        # Grundlegende Statistiken berechnen
-        average_power_w = consumption_data['value'].mean()
-        max_power_w = consumption_data['value'].max()
-        min_power_w = consumption_data['value'].min()
+        times, values, tz = series_arrays(consumption_data)
+        start_time = pd.Timestamp(int(times[0]), tz=tz)
+        end_time = pd.Timestamp(int(times[-1]), tz=tz)
         
-        # Berechne die Dauer des Zeitraums in Stunden
-        duration_hours = (consumption_data.index.max() - consumption_data.index.min()).total_seconds() / 3600
-        
-        # Korrekte kWh Berechnung: Durchschnittsleistung in kW * Dauer in Stunden
-        total_consumption_kwh = (average_power_w / 1000) * duration_hours  # (W → kW) * Stunden = kWh
-        
-        # Zeitbasierte Statistiken
-        start_time = consumption_data.index.min()
-        end_time = consumption_data.index.max()
-        duration_hours = len(consumption_data)
+        if index is not None:
+            # Zeitraum [erster, letzter Messwert] inklusive des letzten Messwerts
+            stats = index.stats(start_time, end_time + pd.Timedelta(1, unit='ns'))
+            total_consumption_kwh = stats['energy_kwh']
+            duration_hours = stats['covered_hours']
+            average_power_w = stats['mean_w']
+            max_power_w = stats['max_w']
+            min_power_w = stats['min_w']
+        else:
+            # Zeitgewichtete Energie: jeder Messwert gilt bis zum nächsten (begrenzt auf max_gap_minutes)
+            if integrator is None:
+                integrator = EnergyIntegrator(consumption_data)
+            total_consumption_kwh = integrator.total_kwh()
+            duration_hours = integrator.total_hours()
+            
+            # Zeitgewichtete Durchschnittsleistung; ohne Haltedauer (ein Messwert) einfacher Mittelwert
+            average_power_w = total_consumption_kwh * 1000 / duration_hours if duration_hours > 0 else float(np.nanmean(values))
+            minimum, maximum = (values, values) if extremes is None else (series_arrays(part)[1] for part in extremes)
+            max_power_w = float(np.nanmax(maximum))
+            min_power_w = float(np.nanmin(minimum))
         
         # Kosten mit aktuellem Tarif berechnen
         current_cost = total_consumption_kwh * CONFIG['current_tariff']
@@ -65,31 +84,60 @@ def analyze_historical_consumption(consumption_data):
         logger.error(f"Fehler bei der Verbrauchsanalyse: {e}")
         return None
 
-def get_consumption_by_hour(consumption_data):
+def get_consumption_by_hour(consumption_data, rollups=None, profile=None):
     """
-    Berechnet den Verbrauch nach Tageszeit
+    Berechnet den Verbrauch nach Tageszeit (Ortszeit)
     
     Args:
-        consumption_data (DataFrame): Verbrauchsdaten
+        consumption_data (DataFrame/TimeSeries): Verbrauchsdaten
+        rollups (dict): Bereits berechnete Aggregate aus compute_rollups (mit 'hour')
+        profile (LoadProfile): Bereits berechnetes Lastprofil (hat Vorrang vor rollups)
         
     Returns:
-        DataFrame: Verbrauch nach Stunde des Tages
+        Series: Energie in kWh nach Stunde des Tages (0-23)
     """
     try:
-        consumption_data['hour'] = consumption_data.index.hour
-        hourly_consumption = consumption_data.groupby('hour')['value'].sum() / 1000  # kWh
+        if profile is None and rollups is None:
+            if consumption_data is None or consumption_data.empty:
+                return None
+            profile = LoadProfile(consumption_data)
+        
+        if profile is not None:
+            return profile.profile(None, 'hour').iloc[0].rename(None)
+        
+        # Sicht auf die Stundenaggregate: Energie nach lokaler Stunde des Tages summieren
+        hourly = rollups['hour']
+        hours = hourly.index.tz_convert(CONFIG['timezone']).hour if hourly.index.tz is not None else hourly.index.hour
+        hourly_consumption = pd.Series(
+            np.bincount(hours, weights=hourly['energy_kwh'].to_numpy(), minlength=24),
+            index=pd.RangeIndex(24, name='hour')
+        )
         return hourly_consumption
     except Exception as e:
         logger.error(f"Fehler bei Stundenanalyse: {e}")
         return None
 
 
-def analyze_monthly_consumption(consumption_data):
+def _monthly_from_index(consumption_data, index):
+    """
+    Monatskennzahlen wie compute_rollups, je Monat beschränkt auf den Zeitraum der Daten
+    """
+    times, _, tz = series_arrays(consumption_data)
+    start_time = pd.Timestamp(int(times[0]), tz=tz)
+    end_time = pd.Timestamp(int(times[-1]), tz=tz) + pd.Timedelta(1, unit='ns')
+    edges = period_edges(start_time, end_time, 'month')
+    rows = [index.stats(max(month_start, start_time), min(month_end, end_time))
+            for month_start, month_end in zip(edges[:-1], edges[1:])]
+    return pd.DataFrame(rows, index=pd.DatetimeIndex(edges[:-1], name='period_start'))
+
+def analyze_monthly_consumption(consumption_data, rollups=None, index=None):
     """
     Analysiert den monatlichen Verbrauch und aggregiert Daten
     
     Args:
-        consumption_data (DataFrame): Verbrauchsdaten mit Zeitindex und 'value' Spalte
+        consumption_data (DataFrame/TimeSeries): Verbrauchsdaten mit Zeitindex und 'value' Spalte
+        rollups (dict): Bereits berechnete Aggregate aus compute_rollups (mit 'month')
+        index (StoredSeriesIndex): Zeitindex mit RollupStore (hat Vorrang vor rollups)
         
     Returns:
         dict: Monatliche Analyseergebnisse
@@ -98,38 +146,27 @@ def analyze_monthly_consumption(consumption_data):
         if consumption_data is None or consumption_data.empty:
             logger.warning("Keine Verbrauchsdaten für monatliche Analyse verfügbar")
             return None
-            
-        # Monatliche Aggregation - korrekte kWh Berechnung
-        consumption_data['month'] = consumption_data.index.to_period('M')
+        
+        if index is not None:
+            months = _monthly_from_index(consumption_data, index)
+        else:
+            if rollups is None:
+                rollups = compute_rollups(consumption_data, granularities=('month',))
+            months = rollups['month']
+        
+        # Sicht auf die Monatsaggregate (nur Monate mit Messwerten)
+        months = months[months['count'] > 0]
         
         # Ergebnisse formatieren
         monthly_results = {}
-        for month_period, month_data in consumption_data.groupby('month'):
-            month_key = month_period.strftime('%Y-%m')
-            
-            # Korrekte kWh Berechnung: Durchschnittsleistung * Dauer
-            # Berechne die tatsächliche Dauer basierend auf den Datenpunkten
-            if len(month_data) > 1:
-                # Wenn wir mehrere Datenpunkte haben, berechne die tatsächliche Dauer
-                time_deltas = month_data.index.to_series().diff().dropna()
-                total_seconds = time_deltas.sum().total_seconds()
-                duration_hours = total_seconds / 3600
-            else:
-                # Wenn nur ein Datenpunkt, gehe von 1 Stunde aus
-                duration_hours = 1.0
-                
-            # Mindestens 1 Stunde annehmen, um Division durch 0 zu vermeiden
-            duration_hours = max(duration_hours, 1.0)
-            
-            average_power_w = month_data['value'].mean()
-            total_consumption_kwh = (average_power_w / 1000) * duration_hours  # (W → kW) * Stunden = kWh
-            
-            monthly_results[month_key] = {
-                'total_consumption_kwh': total_consumption_kwh,
-                'average_power_w': month_data['value'].mean(),
-                'max_power_w': month_data['value'].max(),
-                'min_power_w': month_data['value'].min(),
-                'cost_with_current_tariff': total_consumption_kwh * CONFIG['current_tariff']
+        for month_start, energy_kwh, mean_w, max_w, min_w in zip(
+                months.index, months['energy_kwh'], months['mean_w'], months['max_w'], months['min_w']):
+            monthly_results[month_start.strftime('%Y-%m')] = {
+                'total_consumption_kwh': float(energy_kwh),
+                'average_power_w': float(mean_w),
+                'max_power_w': float(max_w),
+                'min_power_w': float(min_w),
+                'cost_with_current_tariff': float(energy_kwh) * CONFIG['current_tariff']
             }
         
         logger.info(f"Monatliche Analyse abgeschlossen für {len(monthly_results)} Monate")
@@ -137,4 +174,48 @@ def analyze_monthly_consumption(consumption_data):
         
     except Exception as e:
         logger.error(f"Fehler bei der monatlichen Analyse: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def analyze_time_period(data, start_time, end_time, period_name, tariff=None, index=None):
+    """
+    Analysiert den Verbrauch in einem Zeitraum [start_time, end_time) (z.B. Heute, Letzte Woche)
+    
+    Args:
+        data (DataFrame/TimeSeries): Verbrauchsdaten mit Zeitindex und 'value' Spalte
+        start_time (datetime): Beginn des Zeitraums (naive Werte in der Zeitzone der Daten)
+        end_time (datetime): Ende des Zeitraums (exklusiv)
+        period_name (str): Bezeichnung des Zeitraums
+        tariff (float): Strompreis in €/kWh (Standard: CONFIG current_tariff)
+        index (TimeSeriesIndex): Einmal aufgebauter Zeitindex der Daten, damit mehrere
+                                 Zeiträume ohne erneuten Durchlauf ausgewertet werden
+                                 (oder StoredSeriesIndex: gespeicherte Stunden aus dem RollupStore)
+        
+    Returns:
+        dict: Verbrauch, Leistungskennzahlen und Kosten oder None ohne Daten im Zeitraum
+    """
+    try:
+        if data is None or data.empty:
+            return None
+        if tariff is None:
+            tariff = CONFIG['current_tariff']
+        if index is None:
+            index = TimeSeriesIndex(data)
+        
+        # Alle Kennzahlen aus Präfixsummen und Sparse Table (zwei Binärsuchen pro Zeitraum)
+        stats = index.stats(start_time, end_time)
+        if stats['count'] == 0:
+            return None
+        
+        return {
+            'period_name': period_name,
+            'total_consumption_kwh': stats['energy_kwh'],
+            'average_power_kw': stats['mean_w'] / 1000,
+            'max_power_kw': stats['max_w'] / 1000,
+            'min_power_kw': stats['min_w'] / 1000,
+            'cost': stats['energy_kwh'] * tariff,
+            'data_points': stats['count']
+        }
+        
+    except Exception as e:
+        logger.error(f"Fehler bei der Zeitraumanalyse ({period_name}): {e}")
+        return None
@@ -3,47 +3,77 @@ Kostenanalysemodul
 """
 
 import logging
+import numpy as np
+import pandas as pd
 from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
 
 # Logging konfigurieren
 logger = logging.getLogger(__name__)
 
-def calculate_costs(consumption_data, tariff_data):
+def build_price_matrix(tariff_data):
+    """
+    Preismatrix (Intervalle × Provider) aus Tarifdaten mit einer Spalte pro Provider
+
+    Jeder Preis gilt ab seinem Zeitstempel bis zum nächsten (Stufenfunktion); das letzte
+    Intervall erhält die übliche Rasterweite. Fehlende Preise werden mit dem zuletzt
+    gültigen Preis desselben Providers aufgefüllt.
+
+    Args:
+        tariff_data (DataFrame): Tarifdaten mit Zeitindex und Preisen in €/kWh
+
+    Returns:
+        tuple: (Intervallgrenzen als DatetimeIndex mit n+1 Einträgen, Providernamen, ndarray n × Provider)
+    """
+    prices = tariff_data.drop(columns=['time'], errors='ignore').select_dtypes(include='number')
+    if not prices.index.is_monotonic_increasing:
+        prices = prices.sort_index()
+    prices = prices[~prices.index.duplicated(keep='last')]
+
+    index = pd.DatetimeIndex(prices.index)
+    steps = np.diff(_index_ns(index)) if len(index) > 1 else np.array([3_600_000_000_000])
+    edges = index.append(pd.DatetimeIndex([index[-1] + pd.Timedelta(int(np.median(steps)), 'ns')]))
+
+    matrix = prices.ffill().to_numpy(dtype=np.float64)
+    return edges, list(prices.columns), matrix
+
+def calculate_costs(consumption_data, tariff_data, integrator=None):
     """
     Berechnet die Kosten für verschiedene Tarife
     
+    Die Energie wird einmal auf die Preisintervalle verteilt (Werte werden bis zum nächsten
+    Messwert gehalten), die Kosten aller Provider ergeben sich dann aus einem einzigen
+    Matrix-Vektor-Produkt. Zeitzonenlose Zeitstempel gelten in der Zeitzone der Verbrauchsdaten.
+    
     Args:
-        consumption_data (DataFrame): Verbrauchsdaten
+        consumption_data (DataFrame): Verbrauchsdaten (Leistung in W)
         tariff_data (DataFrame): Tarifdaten mit Provider-Spalten
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie der Verbrauchsdaten
+                                       (auch aus einer gemeinsamen Zeitachse, AlignedSeries.integrator)
         
     Returns:
         dict: Kosten pro Provider
     """
     try:
         costs = {}
+        if integrator is None:
+            integrator = EnergyIntegrator(consumption_data)
         
         # Aktueller Tarif
-        total_consumption_kwh = consumption_data['value'].sum() / 1000
-        current_cost = total_consumption_kwh * CONFIG['current_tariff']
-        costs['Aktueller Tarif'] = current_cost
+        total_consumption_kwh = integrator.total_kwh()
+        costs['Aktueller Tarif'] = total_consumption_kwh * CONFIG['current_tariff']
+        
+        # Dynamische Tarife: Energie pro Preisintervall × Preismatrix
+        edges, providers, prices = build_price_matrix(tariff_data)
+        interval_kwh, _ = integrator.energy_by_bins(edges)
+        priced = ~np.isnan(prices)
+        provider_costs = interval_kwh @ np.where(priced, prices, 0.0)
         
-        # Dynamische Tarife
-        for provider in tariff_data.columns:
-            if provider != 'time':  # Zeitspalte überspringen
-                # Zeitstempel synchronisieren (gleiche Zeitzone)
-                consumption_copy = consumption_data.copy()
-                tariff_copy = tariff_data[[provider]].copy()
-                
-                # Zeitstempel ohne Zeitzone verwenden
-                if consumption_copy.index.tz is not None:
-                    consumption_copy.index = consumption_copy.index.tz_localize(None)
-                if tariff_copy.index.tz is not None:
-                    tariff_copy.index = tariff_copy.index.tz_localize(None)
-                
-                # Stündliche Kosten berechnen
-                hourly_costs = (consumption_copy['value'] / 1000) * tariff_copy[provider]
-                total_cost = hourly_costs.sum()
-                costs[provider] = total_cost
+        uncovered_kwh = total_consumption_kwh - interval_kwh @ priced
+        for provider, cost, missing in zip(providers, provider_costs, uncovered_kwh):
+            costs[provider] = float(cost)
+            if missing > 1e-6:
+                logger.warning(f"{provider}: {missing:.2f} kWh liegen außerhalb der Preisdaten und sind nicht bewertet")
         
         logger.info(f"Kostenberechnung abgeschlossen für {len(costs)} Tarife")
         return costs
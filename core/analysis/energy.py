@@ -0,0 +1,208 @@
+"""
+Zeitgewichtete Energieberechnung aus unregelmäßigen Leistungsmessungen
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# W·s → kWh
+WS_PER_KWH = 3.6e6
+
+# Nanosekunden pro Einheit eines DatetimeIndex
+_UNIT_NS = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+def _index_ns(index):
+    """
+    Epoch-Nanosekunden eines DatetimeIndex (schneller als as_unit, da ohne Überlaufprüfung)
+    """
+    return index.asi8 * np.int64(_UNIT_NS[index.unit])
+
+def _to_ns(value, tz):
+    """
+    Konvertiert einen Zeitpunkt in Epoch-Nanosekunden passend zur Zeitzone der Daten
+    """
+    timestamp = pd.Timestamp(value)
+    if tz is not None and timestamp.tz is None:
+        timestamp = timestamp.tz_localize(tz)
+    elif tz is None and timestamp.tz is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.value
+
+class EnergyIntegrator:
+    """
+    Integriert eine Leistungsreihe (W) zu Energie (kWh) mit Halten des letzten Werts
+
+    Home Assistant schreibt nur bei Änderungen, daher gilt jeder Messwert bis zum nächsten.
+    Die Haltedauer ist auf max_gap_seconds begrenzt, damit Ausfälle nicht als Verbrauch zählen.
+    Die kumulierte Energie wird einmal berechnet; Energie und Mittelwerte für beliebige
+    Zeiträume ergeben sich daraus per Binärsuche ohne erneuten Durchlauf über die Daten.
+
+    Args:
+        data (DataFrame/Series/TimeSeries): Leistungswerte in W mit Zeitindex
+        column (str): Spalte mit den Leistungswerten (bei DataFrames)
+        max_gap_seconds (float): Maximale Haltedauer (Standard: CONFIG max_gap_minutes)
+        end_time (datetime): Zeitpunkt, bis zu dem der letzte Wert gehalten wird (Standard: nicht gehalten)
+    """
+
+    def __init__(self, data, column="value", max_gap_seconds=None, end_time=None):
+        times, values, self.tz = series_arrays(data, column)
+        if max_gap_seconds is None:
+            max_gap_seconds = float(CONFIG["max_gap_minutes"]) * 60
+        self.max_gap_ns = np.int64(max_gap_seconds * 1e9)
+
+        # Haltedauer jedes Messwerts bis zum nächsten (begrenzt)
+        held = np.empty_like(times)
+        if len(times):
+            np.subtract(times[1:], times[:-1], out=held[:-1])
+            last_end = _to_ns(end_time, self.tz) if end_time is not None else times[-1]
+            held[-1] = max(last_end - times[-1], 0)
+            np.minimum(held, self.max_gap_ns, out=held)
+        self._accumulate(times, values, held)
+
+    @classmethod
+    def from_arrays(cls, times, values, held_ns, tz=None):
+        """
+        Integrator über bereits ausgerichteten Arrays (z.B. aus align_series)
+
+        Args:
+            times (ndarray): Zeitpunkte in Epoch-ns (sortiert)
+            values (ndarray): Leistungswerte in W (NaN = kein Messwert)
+            held_ns (ndarray): Gültigkeitsdauer jedes Werts in ns
+            tz: Zeitzone der Zeitpunkte
+        """
+        integrator = cls.__new__(cls)
+        integrator.tz = tz
+        integrator.max_gap_ns = np.int64(held_ns.max()) if len(held_ns) else np.int64(0)
+        integrator._accumulate(times, np.asarray(values, dtype=np.float64), np.array(held_ns, dtype=np.int64))
+        return integrator
+
+    def _accumulate(self, times, values, held):
+        """
+        Berechnet kumulierte Energie und abgedeckte Zeit; NaN-Werte zählen nicht
+        """
+        self.times = times
+        invalid = np.isnan(values)
+        has_invalid = invalid.any()
+        self.values = np.where(invalid, 0.0, values) if has_invalid else values
+        if has_invalid:
+            held[invalid] = 0
+        self.held_ns = held
+
+        # Kumulierte Energie (kWh) und abgedeckte Zeit (ns) am Anfang jedes Messwerts
+        self.cumulative_kwh = np.zeros(len(held) + 1)
+        np.cumsum(self.values * held, out=self.cumulative_kwh[1:])
+        self.cumulative_kwh /= 1e9 * WS_PER_KWH
+        self.cumulative_ns = np.zeros(len(held) + 1, dtype=np.int64)
+        np.cumsum(held, out=self.cumulative_ns[1:])
+
+    def __len__(self):
+        return len(self.times)
+
+    def _positions(self, times_ns):
+        """
+        Index des jeweils gültigen Messwerts und die seitdem vergangene (begrenzte) Zeit
+        """
+        idx = np.searchsorted(self.times, times_ns, side="right") - 1
+        clipped = np.clip(idx, 0, None)
+        elapsed = np.where(idx >= 0, np.minimum(times_ns - self.times[clipped], self.held_ns[clipped]), 0)
+        return idx, clipped, elapsed
+
+    def energy_at(self, times):
+        """
+        Kumulierte Energie in kWh vom ersten Messwert bis zu den angegebenen Zeitpunkten
+
+        Args:
+            times: Einzelner Zeitpunkt oder Folge von Zeitpunkten
+
+        Returns:
+            ndarray: Kumulierte Energie in kWh (gleiche Form wie die Eingabe)
+        """
+        times_ns = self.to_ns(times)
+        if not len(self.times):
+            return np.zeros(np.shape(times_ns))
+        idx, clipped, elapsed = self._positions(times_ns)
+        partial = self.values[clipped] * elapsed / 1e9 / WS_PER_KWH
+        return np.where(idx >= 0, self.cumulative_kwh[clipped] + partial, 0.0)
+
+    def covered_at(self, times):
+        """
+        Kumulierte, durch Messwerte abgedeckte Zeit in Sekunden bis zu den angegebenen Zeitpunkten
+        """
+        times_ns = self.to_ns(times)
+        if not len(self.times):
+            return np.zeros(np.shape(times_ns))
+        idx, clipped, elapsed = self._positions(times_ns)
+        return np.where(idx >= 0, self.cumulative_ns[clipped] + elapsed, 0) / 1e9
+
+    def to_ns(self, times):
+        """
+        Wandelt Zeitpunkte in Epoch-Nanosekunden in der Zeitzone der Daten um
+        """
+        if not isinstance(times, (pd.DatetimeIndex, pd.Series, np.ndarray, list, tuple)):
+            return np.int64(_to_ns(times, self.tz))
+        index = pd.DatetimeIndex(times)
+        if self.tz is not None and index.tz is None:
+            index = index.tz_localize(self.tz)
+        elif self.tz is None and index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        return _index_ns(index)
+
+    def energy_between(self, start_time, end_time):
+        """
+        Energie in kWh im Zeitraum [start_time, end_time]
+        """
+        return float(self.energy_at(end_time) - self.energy_at(start_time))
+
+    def covered_hours_between(self, start_time, end_time):
+        """
+        Durch Messwerte abgedeckte Zeit in Stunden im Zeitraum [start_time, end_time]
+        """
+        return float(self.covered_at(end_time) - self.covered_at(start_time)) / 3600
+
+    def energy_by_bins(self, edges):
+        """
+        Energie pro Intervall zwischen aufeinanderfolgenden Grenzen
+
+        Args:
+            edges: Aufsteigende Intervallgrenzen (n+1 Zeitpunkte für n Intervalle)
+
+        Returns:
+            tuple: (Energie in kWh je Intervall, abgedeckte Stunden je Intervall) als ndarrays
+        """
+        return np.diff(self.energy_at(edges)), np.diff(self.covered_at(edges)) / 3600
+
+    def total_kwh(self):
+        """
+        Gesamte Energie aller Messwerte in kWh
+        """
+        return float(self.cumulative_kwh[-1])
+
+    def total_hours(self):
+        """
+        Gesamte durch Messwerte abgedeckte Zeit in Stunden
+        """
+        return float(self.cumulative_ns[-1]) / 1e9 / 3600
+
+    def cumulative(self):
+        """
+        Kumulierte Energie in kWh am Zeitpunkt jedes Messwerts
+
+        Returns:
+            Series: Kumulierte Energie mit dem Zeitindex der Messwerte
+        """
+        index = pd.DatetimeIndex(self.times.view("datetime64[ns]"))
+        if self.tz is not None:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+        return pd.Series(self.cumulative_kwh[:-1], index=index, name="energy_kwh")
+
+def cumulative_energy(data, column="value", max_gap_seconds=None):
+    """
+    Kumulierte Energie in kWh einer Leistungsreihe (siehe EnergyIntegrator)
+    """
+    return EnergyIntegrator(data, column, max_gap_seconds).cumulative()
@@ -0,0 +1,159 @@
+"""
+Aufteilung der Energieflüsse zwischen Haus, PV, Batterie und Netz je Zeitintervall
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.alignment import align_series
+from core.analysis.rollup import period_edges
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+FLOW_COLUMNS = [
+    "solar_to_house",
+    "solar_to_battery",
+    "solar_to_grid",
+    "battery_to_house",
+    "battery_to_grid",
+    "grid_to_house",
+    "grid_to_battery",
+]
+
+# Namen der Leistungsreihen in einer gemeinsamen Zeitachse (siehe align_series)
+FLOW_SOURCES = ("house", "solar", "battery", "grid")
+
+def split_power_flows(house_w, solar_w, battery_w, grid_w):
+    """
+    Teilt gleichzeitige Leistungen in gerichtete Flüsse auf (alle Werte in W, vektorisiert)
+
+    Vorzeichen: Batterie > 0 lädt, Netz > 0 ist Bezug. PV versorgt zuerst das Haus, dann die
+    Batterie und speist den Rest ein; die Batterie versorgt das Haus vor dem Netz. Messfehler
+    (Bilanz nicht ausgeglichen) werden dem Netz zugeschlagen, sodass kein Fluss negativ wird.
+
+    Returns:
+        dict: Fluss -> ndarray in W (Schlüssel wie FLOW_COLUMNS)
+    """
+    solar = np.maximum(solar_w, 0.0)
+    house = np.maximum(house_w, 0.0)
+    charge = np.maximum(battery_w, 0.0)
+    discharge = np.maximum(-battery_w, 0.0)
+    export = np.maximum(-grid_w, 0.0)
+
+    solar_to_house = np.minimum(solar, house)
+    solar_left = solar - solar_to_house
+    solar_to_battery = np.minimum(solar_left, charge)
+    solar_to_grid = np.minimum(solar_left - solar_to_battery, export)
+
+    house_left = house - solar_to_house
+    battery_to_house = np.minimum(discharge, house_left)
+    battery_to_grid = np.minimum(discharge - battery_to_house, export - solar_to_grid)
+    return {
+        "solar_to_house": solar_to_house,
+        "solar_to_battery": solar_to_battery,
+        "solar_to_grid": solar_to_grid,
+        "battery_to_house": battery_to_house,
+        "battery_to_grid": battery_to_grid,
+        "grid_to_house": house_left - battery_to_house,
+        "grid_to_battery": charge - solar_to_battery,
+    }
+
+def interval_flows(aligned):
+    """
+    Energieflüsse in kWh je Intervall einer gemeinsamen Zeitachse
+
+    Args:
+        aligned (AlignedSeries): Reihen 'house', 'solar', 'battery', 'grid' in W (fehlende = 0)
+
+    Returns:
+        dict: Fluss -> kWh je Intervall ab dem jeweiligen Zeitpunkt
+    """
+    flows = split_power_flows(*(aligned.filled(name) for name in FLOW_SOURCES))
+    held_hours = aligned.held_hours
+    return {name: power * held_hours / 1000 for name, power in flows.items()}
+
+def decompose_energy_flows(house_data, solar_data, battery_data, grid_data, extra_times=None, max_gap_seconds=None):
+    """
+    Energieflüsse in kWh je Intervall auf der gemeinsamen Zeitachse der vier SENEC Reihen
+
+    Jeder Messwert gilt bis zum nächsten Zeitpunkt der gemeinsamen Achse (höchstens
+    max_gap_seconds). Mit extra_times (z.B. Periodengrenzen) werden zusätzliche Zeitpunkte
+    eingefügt, damit kein Intervall eine Grenze überschreitet.
+
+    Args:
+        house_data, solar_data, battery_data, grid_data (DataFrame): Leistungen in W ('value'), None = 0
+        extra_times (ndarray): Zusätzliche Zeitpunkte in Epoch-ns
+        max_gap_seconds (float): Maximale Haltedauer (Standard: CONFIG max_gap_minutes)
+
+    Returns:
+        tuple: (Zeitpunkte in Epoch-ns, dict Fluss -> kWh je Intervall ab diesem Zeitpunkt)
+    """
+    aligned = align_series(dict(zip(FLOW_SOURCES, (house_data, solar_data, battery_data, grid_data))),
+                           max_gap_seconds=max_gap_seconds, extra_times=extra_times)
+    if aligned is None:
+        return np.array([], dtype=np.int64), {name: np.array([]) for name in FLOW_COLUMNS}
+    return aligned.times, interval_flows(aligned)
+
+def _with_ratios(table):
+    """
+    Ergänzt Summen sowie Autarkie und Eigenverbrauchsquote
+    """
+    table["house_kwh"] = table["solar_to_house"] + table["battery_to_house"] + table["grid_to_house"]
+    table["solar_kwh"] = table["solar_to_house"] + table["solar_to_battery"] + table["solar_to_grid"]
+    table["grid_import_kwh"] = table["grid_to_house"] + table["grid_to_battery"]
+    table["grid_export_kwh"] = table["solar_to_grid"] + table["battery_to_grid"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Autarkie: Anteil des Hausverbrauchs aus PV und Batterie
+        table["self_sufficiency"] = (table["solar_to_house"] + table["battery_to_house"]) / table["house_kwh"]
+        # Eigenverbrauch: Anteil der PV-Erzeugung, der nicht eingespeist wird
+        table["self_consumption"] = (table["solar_to_house"] + table["solar_to_battery"]) / table["solar_kwh"]
+    return table
+
+def aggregate_energy_flows(house_data, solar_data, battery_data, grid_data, granularity="day", max_gap_seconds=None,
+                           aligned=None):
+    """
+    Energieflüsse, Autarkie und Eigenverbrauch pro Stunde, Tag, Woche, Monat oder Jahr
+
+    Intervalle, die eine Periodengrenze überschreiten, werden zeitanteilig aufgeteilt, daher
+    sind die Summen und Quoten je Periode exakt und nicht aus Mittelwerten geschätzt.
+
+    Args:
+        house_data, solar_data, battery_data, grid_data (DataFrame): Leistungen in W ('value')
+        granularity (str): 'hour', 'day', 'week', 'month' oder 'year'
+        max_gap_seconds (float): Maximale Haltedauer (Standard: CONFIG max_gap_minutes)
+        aligned (AlignedSeries): Bereits ausgerichtete Reihen (FLOW_SOURCES); ersetzt die DataFrames
+
+    Returns:
+        DataFrame: Flüsse in kWh (FLOW_COLUMNS), house_kwh, solar_kwh, grid_import_kwh,
+                   grid_export_kwh, self_sufficiency, self_consumption je Periode oder None
+    """
+    try:
+        if aligned is None:
+            aligned = align_series(dict(zip(FLOW_SOURCES, (house_data, solar_data, battery_data, grid_data))),
+                                   max_gap_seconds=max_gap_seconds)
+        bounds = aligned.valid_range(FLOW_SOURCES) if aligned is not None else None
+        if bounds is None:
+            return None
+        aligned = aligned.slice(*bounds)
+        index = aligned.index.tz_convert(CONFIG["timezone"])
+        edges = period_edges(index[0], index[-1], granularity)
+
+        totals = aligned.sum_by_bins(interval_flows(aligned), edges)
+        table = pd.DataFrame(totals, index=pd.DatetimeIndex(edges[:-1], name="period_start"))
+        return _with_ratios(table)
+
+    except Exception as e:
+        logger.error(f"Fehler bei der Energiefluss-Analyse: {e}")
+        return None
+
+def summarize_energy_flows(flows_table):
+    """
+    Gesamtsummen und Quoten über alle Perioden einer aggregierten Tabelle
+
+    Returns:
+        Series: Summen der Flüsse und exakte Gesamtquoten
+    """
+    totals = flows_table[FLOW_COLUMNS].sum().to_frame().T
+    return _with_ratios(totals).iloc[0]
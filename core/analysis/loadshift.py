@@ -0,0 +1,245 @@
+"""
+Preisoptimierte Verschiebung flexibler Verbraucher (Spülmaschine, Wärmepumpen-Puffer, E-Auto)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.analysis.alignment import align_series
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Standardwerte für nicht angegebene Parameter eines flexiblen Verbrauchers
+DEFAULT_LOAD = {
+    "name": "Flexibel",
+    "energy_kwh": 2.0,  # Energiebedarf pro Tag
+    "power_kw": 2.0,  # Maximale Leistung
+    "window": (0, 24)  # Erlaubte Stunden (Ortszeit) [Beginn, Ende); Beginn > Ende = über Mitternacht im selben Tag
+}
+
+# Strafkosten in €/kWh für nicht unterzubringende Energie im LP (hält das Problem immer lösbar)
+_UNSERVED_PENALTY = 1000.0
+
+def build_slot_prices(prices, slot_minutes=60):
+    """
+    Preise als Matrix Tage × Zeitschlitze in Ortszeit
+
+    Jeder Preis gilt bis zum nächsten; der Preis eines Zeitschlitzes ist der zeitgewichtete
+    Mittelwert. Tage mit Zeitumstellung haben einen Zeitschlitz weniger bzw. mehr, fehlende
+    Zeitschlitze sind NaN.
+
+    Args:
+        prices (DataFrame): Preise in €/kWh mit Zeitindex und 'value' Spalte
+        slot_minutes (int): Länge eines Zeitschlitzes
+
+    Returns:
+        dict: days (lokale Tage), price (Tage × Zeitschlitze), start_ns (Beginn je Zeitschlitz),
+              hour (lokale Stunde je Zeitschlitz), slot_hours
+    """
+    series = prices["value"].sort_index()
+    if series.index.tz is None:
+        series.index = series.index.tz_localize(CONFIG["timezone"])
+    local = series.index.tz_convert(CONFIG["timezone"])
+
+    # Letzter Preis gilt eine übliche Rasterweite lang
+    steps = np.diff(_index_ns(series.index))
+    step = pd.Timedelta(int(np.median(steps)) if len(steps) else 3_600_000_000_000, "ns")
+    integrator = EnergyIntegrator(series, max_gap_seconds=step.total_seconds(), end_time=series.index[-1] + step)
+
+    first_day = local[0].normalize()
+    last_day = (local[-1] + step - pd.Timedelta(1, "ns")).normalize() + pd.DateOffset(days=1)
+    edges = pd.date_range(first_day, last_day, freq=f"{slot_minutes}min")
+    weighted, hours = integrator.energy_by_bins(edges)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slot_price = np.where(hours > 0, weighted * 1000 / hours, np.nan)
+
+    starts = edges[:-1]
+    day_codes, days = pd.factorize(starts.normalize())
+    first_slot = np.searchsorted(day_codes, np.arange(len(days)))
+    position = np.arange(len(starts)) - first_slot[day_codes]
+    width = int(position.max()) + 1
+
+    price = np.full((len(days), width), np.nan)
+    start_ns = np.full((len(days), width), -1, dtype=np.int64)
+    hour = np.full((len(days), width), -1)
+    price[day_codes, position] = slot_price
+    start_ns[day_codes, position] = _index_ns(starts)
+    hour[day_codes, position] = starts.hour
+    return {"days": days, "price": price, "start_ns": start_ns, "hour": hour, "slot_hours": slot_minutes / 60}
+
+def _load_parameters(loads):
+    """
+    Flexible Verbraucher mit Standardwerten ergänzt
+    """
+    return [{**DEFAULT_LOAD, **load} for load in loads]
+
+def _window_mask(hour, window):
+    """
+    Zeitschlitze innerhalb des erlaubten Stundenfensters
+    """
+    begin, end = window
+    if begin <= end:
+        return (hour >= begin) & (hour < end)
+    return (hour >= begin) | (hour < end)
+
+def _greedy(key, capacity, energy):
+    """
+    Füllt pro Tag die Zeitschlitze in Reihenfolge des Schlüssels bis zum Energiebedarf
+
+    Args:
+        key (ndarray): Sortierschlüssel Tage × Zeitschlitze (inf = nicht erlaubt)
+        capacity (ndarray): Maximale Energie je Zeitschlitz in kWh
+        energy (float): Energiebedarf pro Tag in kWh
+
+    Returns:
+        ndarray: Energie je Zeitschlitz in kWh
+    """
+    order = np.argsort(key, axis=1, kind="stable")
+    sorted_capacity = np.take_along_axis(capacity, order, axis=1)
+    before = np.cumsum(sorted_capacity, axis=1) - sorted_capacity
+    allocation = np.empty_like(capacity)
+    np.put_along_axis(allocation, order, np.clip(energy - before, 0.0, sorted_capacity), axis=1)
+    return allocation
+
+def _solve_lp(price, capacities, energies, shared_capacity):
+    """
+    Kostenminimaler Fahrplan aller Verbraucher und Tage als ein gemeinsames LP
+
+    Variablen sind die Energien je Verbraucher, Tag und erlaubtem Zeitschlitz. Pro Verbraucher
+    und Tag muss der Bedarf gedeckt werden (Fehlmenge mit Strafkosten), pro Zeitschlitz ist die
+    Summe aller Verbraucher durch shared_capacity begrenzt.
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+
+    loads = len(capacities)
+    days, slots = price.shape
+    load_index, day_index, slot_index = np.nonzero(np.stack(capacities) > 0)
+    variables = len(load_index)
+    groups = load_index * days + day_index
+
+    # Bedarf je (Verbraucher, Tag): Summe der Zeitschlitze + Fehlmenge = Energie
+    equality = coo_matrix(
+        (np.ones(variables + loads * days),
+         (np.concatenate((groups, np.arange(loads * days))), np.arange(variables + loads * days))),
+        shape=(loads * days, variables + loads * days)
+    )
+    demand = np.repeat(energies, days)
+
+    # Gemeinsame Leistungsgrenze je (Tag, Zeitschlitz)
+    cells = day_index * slots + slot_index
+    inequality = coo_matrix((np.ones(variables), (cells, np.arange(variables))),
+                            shape=(days * slots, variables + loads * days))
+    limit = np.nan_to_num(shared_capacity.ravel(), nan=0.0)
+
+    cost = np.concatenate((price[day_index, slot_index], np.full(loads * days, _UNSERVED_PENALTY)))
+    upper = np.concatenate((np.stack(capacities)[load_index, day_index, slot_index], np.full(loads * days, np.inf)))
+    result = linprog(cost, A_ub=inequality.tocsr(), b_ub=limit, A_eq=equality.tocsr(), b_eq=demand,
+                     bounds=np.column_stack((np.zeros(len(upper)), upper)), method="highs")
+    if result.status != 0:
+        raise RuntimeError(f"LP nicht gelöst: {result.message}")
+
+    allocations = np.zeros((loads, days, slots))
+    allocations[load_index, day_index, slot_index] = result.x[:variables]
+    return list(allocations)
+
+def optimize_load_shifting(prices, loads, max_total_kw=None, slot_minutes=60, method="auto"):
+    """
+    Berechnet den kostenminimalen Fahrplan flexibler Verbraucher für alle Tage auf einmal
+
+    Ohne gemeinsame Leistungsgrenze sind die Verbraucher unabhängig; dann werden pro Tag die
+    günstigsten erlaubten Zeitschlitze gefüllt (Sortierung, vektorisiert über alle Tage). Mit
+    max_total_kw und mehreren Verbrauchern wird ein LP über alle Tage gelöst (scipy/HiGHS).
+    Als Vergleich dient der Betrieb ab Fensterbeginn mit voller Leistung.
+
+    Args:
+        prices (DataFrame): EPEX Preise in €/kWh mit Zeitindex und 'value' Spalte
+        loads (list): Flexible Verbraucher als dicts (Schlüssel wie DEFAULT_LOAD)
+        max_total_kw (float): Gemeinsame Leistungsgrenze aller flexiblen Verbraucher
+        slot_minutes (int): Länge eines Zeitschlitzes
+        method (str): 'auto', 'greedy' oder 'lp'
+
+    Returns:
+        dict: 'schedule' und 'baseline' (DataFrame, Leistung in W je Verbraucher und Zeitschlitz),
+              'summary' (DataFrame je Verbraucher mit energy_kwh, cost_baseline_eur, cost_optimized_eur,
+              savings_eur, unserved_kwh) oder None bei Fehlern
+    """
+    try:
+        if prices is None or prices.empty or not loads:
+            return None
+        slots = build_slot_prices(prices, slot_minutes)
+        price, hour, slot_hours = slots["price"], slots["hour"], slots["slot_hours"]
+        available = ~np.isnan(price)
+        loads = _load_parameters(loads)
+        if method == "auto":
+            method = "lp" if max_total_kw is not None and len(loads) > 1 else "greedy"
+
+        capacities = []
+        for load in loads:
+            power_kw = load["power_kw"] if max_total_kw is None else min(load["power_kw"], max_total_kw)
+            allowed = available & _window_mask(hour, load["window"])
+            capacities.append(np.where(allowed, power_kw * slot_hours, 0.0))
+
+        energies = np.array([load["energy_kwh"] for load in loads], dtype=np.float64)
+        if method == "lp":
+            shared = np.where(available, max_total_kw * slot_hours, 0.0) if max_total_kw is not None else np.full(price.shape, np.inf)
+            optimized = _solve_lp(np.nan_to_num(price), capacities, energies, shared)
+        else:
+            optimized = [_greedy(np.where(capacity > 0, price, np.inf), capacity, energy)
+                         for capacity, energy in zip(capacities, energies)]
+
+        # Vergleich: Start bei Fensterbeginn (Reihenfolge der Zeitschlitze ab Fensterbeginn)
+        baseline = []
+        for load, capacity, energy in zip(loads, capacities, energies):
+            since_begin = (hour - load["window"][0]) % 24
+            baseline.append(_greedy(np.where(capacity > 0, since_begin, np.inf), capacity, energy))
+
+        valid = slots["start_ns"] >= 0
+        index = pd.DatetimeIndex(slots["start_ns"][valid].view("datetime64[ns]")).tz_localize("UTC").tz_convert(CONFIG["timezone"])
+        to_power = lambda allocation: allocation[valid] * 1000 / slot_hours
+        names = [load["name"] for load in loads]
+        schedule = pd.DataFrame({name: to_power(a) for name, a in zip(names, optimized)}, index=index).sort_index()
+        reference = pd.DataFrame({name: to_power(a) for name, a in zip(names, baseline)}, index=index).sort_index()
+        schedule.index.name = reference.index.name = "time"
+
+        priced = np.nan_to_num(price)
+        summary = pd.DataFrame({
+            "energy_kwh": [a.sum() for a in optimized],
+            "cost_baseline_eur": [(a * priced).sum() for a in baseline],
+            "cost_optimized_eur": [(a * priced).sum() for a in optimized],
+            "unserved_kwh": [np.clip(energy - a.sum(axis=1), 0, None).sum() for energy, a in zip(energies, optimized)]
+        }, index=pd.Index(names, name="load"))
+        summary["savings_eur"] = summary["cost_baseline_eur"] - summary["cost_optimized_eur"]
+        if summary["unserved_kwh"].sum() > 1e-6:
+            logger.warning(f"Lastverschiebung: {summary['unserved_kwh'].sum():.2f} kWh passen nicht in die erlaubten Zeitfenster")
+
+        logger.info(f"Lastverschiebung ({method}) für {len(slots['days'])} Tage: Einsparung {summary['savings_eur'].sum():.2f} €")
+        return {"schedule": schedule, "baseline": reference, "summary": summary}
+
+    except Exception as e:
+        logger.error(f"Fehler bei der Lastverschiebung: {e}")
+        return None
+
+def apply_schedule(consumption_data, result):
+    """
+    Verbrauch nach Verschiebung: Vergleichsbetrieb abziehen, optimierten Fahrplan addieren
+
+    Setzt voraus, dass die flexiblen Verbraucher heute zum Vergleichszeitpunkt (Fensterbeginn)
+    laufen. Das Ergebnis kann direkt an calculate_costs übergeben werden.
+
+    Args:
+        consumption_data (DataFrame): Verbrauch in W mit Zeitindex und 'value' Spalte
+        result (dict): Ergebnis von optimize_load_shifting
+
+    Returns:
+        DataFrame: Verbrauch in W auf der gemeinsamen Zeitachse aus Messwerten und Zeitschlitzen
+    """
+    change = (result["schedule"] - result["baseline"]).sum(axis=1)
+    aligned = align_series({"value": consumption_data, "change": change},
+                           max_staleness_seconds={"value": None, "change": None})
+    values = aligned["value"] + aligned.filled("change")
+    shifted = pd.DataFrame({"value": values}, index=aligned.index.rename("time"))
+    return shifted.dropna()
@@ -0,0 +1,199 @@
+"""
+Monte-Carlo-Verteilung der Stromkosten mit zufällig zusammengesetzten EPEX Preisjahren
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def _season(months):
+    """
+    Jahreszeit je Monat: 0 Winter (Dez-Feb), 1 Frühling, 2 Sommer, 3 Herbst
+    """
+    return (np.asarray(months) % 12) // 3
+
+def _local_hours(index):
+    """
+    Lokale Tage (sortiert) sowie Tagesnummer und Stunde jedes Zeitstempels
+    """
+    if index.tz is None:
+        index = index.tz_localize(CONFIG["timezone"])
+    local = index.tz_convert(CONFIG["timezone"])
+    day_codes, days = pd.factorize(local.normalize(), sort=True)
+    return days, day_codes, local.hour.to_numpy()
+
+def daily_price_profiles(prices):
+    """
+    Preise als Matrix Tage × 24 lokale Stunden
+
+    Mehrere Werte einer Stunde (15-Minuten-Preise, doppelte Stunde bei Zeitumstellung) werden
+    gemittelt, fehlende Stunden mit der vorherigen Stunde desselben Tages aufgefüllt.
+
+    Args:
+        prices (DataFrame): Preise in €/kWh mit Zeitindex und 'value' Spalte
+
+    Returns:
+        tuple: (lokale Tage als DatetimeIndex, ndarray Tage × 24; Tage mit weniger als 12
+               Preisstunden sind komplett NaN)
+    """
+    series = prices["value"].dropna().sort_index()
+    days, day_codes, hours = _local_hours(series.index)
+    cells = day_codes * HOURS_PER_DAY + hours
+    size = len(days) * HOURS_PER_DAY
+    sums = np.bincount(cells, weights=series.to_numpy(dtype=np.float64), minlength=size)
+    counts = np.bincount(cells, minlength=size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profile = pd.DataFrame((sums / counts).reshape(len(days), HOURS_PER_DAY))
+    complete = (counts.reshape(len(days), HOURS_PER_DAY) > 0).sum(axis=1) >= 12
+    profile = profile.ffill(axis=1).bfill(axis=1).to_numpy(copy=True)
+    profile[~complete] = np.nan
+    return days, profile
+
+def daily_energy_profile(consumption_data, integrator=None):
+    """
+    Verbrauch in kWh als Matrix Tage × 24 lokale Stunden (zeitgewichtet)
+
+    Returns:
+        tuple: (lokale Tage als DatetimeIndex, ndarray Tage × 24)
+    """
+    if integrator is None:
+        integrator = EnergyIntegrator(consumption_data)
+    times, _, tz = series_arrays(consumption_data)
+    first, last = pd.Timestamp(int(times[0]), tz=tz), pd.Timestamp(int(times[-1]), tz=tz)
+    if tz is None:
+        first, last = first.tz_localize(CONFIG["timezone"]), last.tz_localize(CONFIG["timezone"])
+    edges = pd.date_range(first.tz_convert(CONFIG["timezone"]).normalize(),
+                          last.tz_convert(CONFIG["timezone"]).normalize() + pd.DateOffset(days=1), freq="h")
+    energy, _ = integrator.energy_by_bins(edges)
+
+    days, day_codes, hours = _local_hours(edges[:-1])
+    profile = np.bincount(day_codes * HOURS_PER_DAY + hours, weights=energy,
+                          minlength=len(days) * HOURS_PER_DAY).reshape(len(days), HOURS_PER_DAY)
+    return days, profile
+
+def bootstrap_price_matrix(source_days, source_profiles, target_days, n_scenarios, block_days=7, rng=None):
+    """
+    Zieht n_scenarios synthetische Preisverläufe für die Zieltage in einem Aufruf
+
+    Block-Bootstrap: Die Zieltage werden in Blöcke zu block_days Tagen geteilt; jeder Block
+    übernimmt block_days aufeinanderfolgende historische Tage, deren erster Tag denselben
+    Wochentag und dieselbe Jahreszeit hat wie der Blockbeginn. So bleiben Wochenmuster und
+    Wetterlagen über mehrere Tage erhalten. Gibt es keinen passenden Tag, wird zuerst auf die
+    Jahreszeit und dann auf den Wochentag verzichtet.
+
+    Args:
+        source_days (DatetimeIndex): Historische Tage (aufeinanderfolgend, siehe daily_price_profiles)
+        source_profiles (ndarray): Historische Preise Tage × 24
+        target_days (DatetimeIndex): Tage des synthetischen Zeitraums
+        n_scenarios (int): Anzahl Szenarien
+        block_days (int): Länge eines Blocks in Tagen
+        rng (Generator): Zufallszahlengenerator
+
+    Returns:
+        ndarray: Preise (n_scenarios × Zieltage·24) als float32
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    source_days = pd.DatetimeIndex(source_days)
+    if len(source_days) < block_days:
+        raise ValueError(f"Weniger als {block_days} Preistage vorhanden")
+
+    # Mögliche Blockanfänge: alle block_days Tage vollständig und lückenlos
+    day_numbers = (_index_ns(source_days.tz_localize(None)) // 86_400_000_000_000).astype(np.int64)
+    complete = ~np.isnan(source_profiles).any(axis=1)
+    runs = np.lib.stride_tricks.sliding_window_view(np.append(complete, [False] * (block_days - 1)), block_days).all(axis=1)
+    consecutive = np.zeros(len(source_days), dtype=bool)
+    consecutive[:len(source_days) - block_days + 1] = day_numbers[block_days - 1:] - day_numbers[:len(source_days) - block_days + 1] == block_days - 1
+    starts = np.flatnonzero(runs & consecutive)
+    if not len(starts):
+        raise ValueError(f"Keine {block_days} aufeinanderfolgenden vollständigen Preistage vorhanden")
+
+    block_starts = pd.DatetimeIndex(target_days)[::block_days]
+    source_key = (source_days.weekday[starts].to_numpy(), _season(source_days.month[starts]))
+    target_key = (block_starts.weekday.to_numpy(), _season(block_starts.month))
+
+    # Kandidaten je Block: gleiche Wochentag+Jahreszeit, sonst gleicher Wochentag, sonst alle
+    chosen = np.empty((n_scenarios, len(block_starts)), dtype=np.int64)
+    for block, (weekday, season) in enumerate(zip(*target_key)):
+        candidates = starts[(source_key[0] == weekday) & (source_key[1] == season)]
+        if not len(candidates):
+            candidates = starts[source_key[0] == weekday]
+        if not len(candidates):
+            candidates = starts
+        chosen[:, block] = candidates[rng.integers(0, len(candidates), n_scenarios)]
+
+    day_index = (chosen[:, :, None] + np.arange(block_days)).reshape(n_scenarios, -1)[:, :len(target_days)]
+    profiles = source_profiles.astype(np.float32)
+    return profiles[day_index].reshape(n_scenarios, -1)
+
+def simulate_cost_distribution(consumption_data, prices, n_scenarios=10000, block_days=7, markup_eur_kwh=0.0,
+                               current_tariff=None, quantiles=DEFAULT_QUANTILES, seed=None, chunk_size=2000,
+                               integrator=None):
+    """
+    Verteilung der Kosten und Einsparungen eines dynamischen Tarifs über synthetische Preisjahre
+
+    Der Verbrauch (kWh je lokaler Stunde) wird gegen n_scenarios per Block-Bootstrap erzeugte
+    EPEX Verläufe bewertet. Die Kosten aller Szenarien eines Abschnitts ergeben sich aus einem
+    Matrix-Vektor-Produkt; Abschnitte begrenzen den Speicherbedarf der Preismatrix.
+
+    Args:
+        consumption_data (DataFrame/TimeSeries): Verbrauch in W mit Zeitindex und 'value' Spalte
+        prices (DataFrame): Historische EPEX Preise in €/kWh
+        n_scenarios (int): Anzahl synthetischer Preisverläufe
+        block_days (int): Länge der gezogenen Blöcke in Tagen
+        markup_eur_kwh (float): Aufschlag des dynamischen Tarifs auf den Börsenpreis
+        current_tariff (float): Vergleichstarif in €/kWh (Standard: CONFIG current_tariff)
+        quantiles (tuple): Auszugebende Quantile der Einsparung
+        seed (int): Startwert für reproduzierbare Ergebnisse (bei gleicher chunk_size)
+        chunk_size (int): Szenarien pro Abschnitt
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie des Verbrauchs
+
+    Returns:
+        dict: current_cost_eur, costs_eur (ndarray je Szenario), savings_quantiles (Series),
+              expected_savings_eur, probability_savings oder None bei Fehlern
+    """
+    try:
+        if consumption_data is None or consumption_data.empty or prices is None or prices.empty:
+            return None
+        if current_tariff is None:
+            current_tariff = CONFIG["current_tariff"]
+
+        source_days, source_profiles = daily_price_profiles(prices)
+        target_days, energy = daily_energy_profile(consumption_data, integrator)
+        total_kwh = float(energy.sum())
+        energy = energy.ravel().astype(np.float32)
+        current_cost = total_kwh * current_tariff
+
+        rng = np.random.default_rng(seed)
+        costs = np.empty(n_scenarios)
+        for begin in range(0, n_scenarios, chunk_size):
+            count = min(chunk_size, n_scenarios - begin)
+            matrix = bootstrap_price_matrix(source_days, source_profiles, target_days, count, block_days, rng)
+            costs[begin:begin + count] = matrix @ energy
+        costs += total_kwh * markup_eur_kwh
+
+        savings = current_cost - costs
+        result = {
+            "current_cost_eur": current_cost,
+            "costs_eur": costs,
+            "savings_quantiles": pd.Series(np.quantile(savings, quantiles), index=pd.Index(quantiles, name="quantile")),
+            "expected_savings_eur": float(savings.mean()),
+            "probability_savings": float((savings > 0).mean())
+        }
+        logger.info(f"Monte-Carlo: {n_scenarios} Szenarien über {len(target_days)} Tage, "
+                    f"Median-Einsparung {np.median(savings):.2f} €, P(Einsparung) {result['probability_savings']:.0%}")
+        return result
+
+    except Exception as e:
+        logger.error(f"Fehler in der Monte-Carlo-Kostenanalyse: {e}")
+        return None
@@ -0,0 +1,176 @@
+"""
+Lastprofile (Stunde × Wochentag, Stunde × Monat, typischer Tag) über zwischengespeicherten Kalendercodes
+"""
+
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.analysis.alignment import asof, merge_times
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Kalendercodes und Anzahl ihrer Ausprägungen
+CALENDAR_CODES = {"hour": 24, "weekday": 7, "month": 12, "week": 53}
+
+_CODE_LABELS = {
+    "hour": range(24),
+    "weekday": ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"],
+    "month": range(1, 13),
+    "week": range(1, 54),
+}
+
+@lru_cache(maxsize=16)
+def calendar_codes(start_ns, hours, tz):
+    """
+    Kalendercodes jeder lokalen Stunde ab start_ns (einmal berechnet und zwischengespeichert)
+
+    Stundengrenzen liegen in UTC immer 3600 s auseinander, daher bestimmen Beginn, Anzahl
+    und Zeitzone die Codes eindeutig.
+
+    Returns:
+        dict: hour (0-23), weekday (0 = Montag), month (0-11), week (ISO-Woche 0-52) als
+              schreibgeschützte int64 Arrays
+    """
+    index = pd.DatetimeIndex(start_ns + np.arange(hours, dtype=np.int64) * 3_600_000_000_000).tz_localize("UTC").tz_convert(tz)
+    codes = {
+        "hour": index.hour.to_numpy(dtype=np.int64),
+        "weekday": index.weekday.to_numpy(dtype=np.int64),
+        "month": index.month.to_numpy(dtype=np.int64) - 1,
+        "week": index.isocalendar().week.to_numpy(dtype=np.int64) - 1,
+    }
+    for values in codes.values():
+        values.flags.writeable = False
+    return codes
+
+class LoadProfile:
+    """
+    Energie je lokaler Stunde einer Leistungsreihe; alle Profile entstehen daraus per np.bincount
+
+    Die Energie wird einmal zeitgewichtet auf Stundengrenzen verteilt (Messwerte gelten bis
+    zum nächsten, siehe EnergyIntegrator), danach kostet jedes Profil nur einen Durchlauf über
+    die Stunden. Mit Preisen werden zusätzlich die Kosten je Stunde mit dem jeweils gültigen
+    EPEX Preis bestimmt (15-Minuten-Preise werden innerhalb der Stunde exakt berücksichtigt).
+
+    Args:
+        data (DataFrame/TimeSeries): Leistungswerte in W
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie der Daten
+        prices (DataFrame/TimeSeries): EPEX Preise in €/kWh (optional)
+        tz: Zeitzone der Kalendercodes (Standard: CONFIG timezone)
+    """
+
+    def __init__(self, data, integrator=None, prices=None, tz=None):
+        if integrator is None:
+            integrator = EnergyIntegrator(data)
+        self.tz = tz if tz is not None else CONFIG["timezone"]
+        times, _, data_tz = series_arrays(data)
+        first, last = pd.Timestamp(int(times[0]), tz=data_tz), pd.Timestamp(int(times[-1]), tz=data_tz)
+        if data_tz is None:
+            first, last = first.tz_localize(self.tz), last.tz_localize(self.tz)
+
+        # Auf volle Stunden in UTC runden (eindeutig auch in der doppelten Stunde der Zeitumstellung)
+        first = first.tz_convert("UTC").floor("h").tz_convert(self.tz)
+        last = last.tz_convert("UTC").floor("h").tz_convert(self.tz)
+        self.edges = pd.date_range(first, last + pd.Timedelta(hours=1), freq="h")
+        self.edge_ns = _index_ns(self.edges)
+        self.energy_kwh, self.covered_hours = integrator.energy_by_bins(self.edges)
+        self.codes = calendar_codes(int(self.edge_ns[0]), len(self.edge_ns) - 1, str(self.tz))
+
+        self.cost_eur = None
+        self.priced_kwh = None
+        if prices is not None and len(prices):
+            self._add_prices(integrator, prices)
+
+    def __len__(self):
+        return len(self.energy_kwh)
+
+    def _add_prices(self, integrator, prices):
+        """
+        Kosten je Stunde: Energie zwischen Stunden- und Preisgrenzen × gültiger Preis
+        """
+        price_times, price_values, price_tz = series_arrays(prices)
+        if price_tz is None:
+            price_times = _index_ns(pd.DatetimeIndex(price_times.view("datetime64[ns]")).tz_localize(self.tz))
+        inside = price_times[(price_times > self.edge_ns[0]) & (price_times < self.edge_ns[-1])]
+        edges = merge_times(self.edge_ns, inside)
+        energy, _ = integrator.energy_by_bins(pd.DatetimeIndex(edges.view("datetime64[ns]")).tz_localize("UTC"))
+        price = asof(edges[:-1], price_times, price_values)
+        priced = ~np.isnan(price)
+        hour = np.searchsorted(self.edge_ns, edges[:-1], side="right") - 1
+        self.cost_eur = np.bincount(hour, weights=np.where(priced, energy * price, 0.0), minlength=len(self))
+        self.priced_kwh = np.bincount(hour, weights=np.where(priced, energy, 0.0), minlength=len(self))
+
+    def _values(self, value):
+        if value == "energy":
+            return self.energy_kwh
+        if value == "cost":
+            if self.cost_eur is None:
+                raise ValueError("Keine Preise für das Kostenprofil übergeben")
+            return self.cost_eur
+        raise ValueError(f"Unbekannte Größe: {value}")
+
+    def profile(self, rows="weekday", columns="hour", value="energy", statistic="sum"):
+        """
+        Zweidimensionales Profil (z.B. Wochentag × Stunde) in einem bincount
+
+        Args:
+            rows (str): Kalendercode der Zeilen ('hour', 'weekday', 'month', 'week' oder None)
+            columns (str): Kalendercode der Spalten
+            value (str): 'energy' (kWh) oder 'cost' (€, nur mit Preisen)
+            statistic (str): 'sum' (Summe), 'mean' (Mittel je Kalenderstunde mit Messwerten) oder
+                             'power' (zeitgewichtete mittlere Leistung in kW, nur für 'energy')
+
+        Returns:
+            DataFrame: Zeilen × Spalten (bei rows=None eine Zeile)
+        """
+        column_count = CALENDAR_CODES[columns]
+        row_count = CALENDAR_CODES[rows] if rows is not None else 1
+        cells = self.codes[columns] if rows is None else self.codes[rows] * column_count + self.codes[columns]
+        size = row_count * column_count
+
+        totals = np.bincount(cells, weights=self._values(value), minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if statistic == "power":
+                totals = totals / np.bincount(cells, weights=self.covered_hours, minlength=size)
+            elif statistic == "mean":
+                totals = totals / np.bincount(cells, weights=(self.covered_hours > 0).astype(np.float64), minlength=size)
+            elif statistic != "sum":
+                raise ValueError(f"Unbekannte Statistik: {statistic}")
+
+        return pd.DataFrame(totals.reshape(row_count, column_count),
+                            index=pd.Index(_CODE_LABELS[rows], name=rows) if rows is not None else pd.RangeIndex(1),
+                            columns=pd.Index(_CODE_LABELS[columns], name=columns))
+
+    def typical_day(self, by=None):
+        """
+        Typischer Tagesverlauf: mittlere Leistung in kW je Stunde (zeitgewichtet)
+
+        Args:
+            by (str): Optional je Wochentag ('weekday') oder Monat ('month')
+
+        Returns:
+            Series (ohne by) oder DataFrame (by × Stunde)
+        """
+        table = self.profile(by, "hour", statistic="power")
+        return table.iloc[0].rename("power_kw") if by is None else table
+
+    def cost_by_hour(self):
+        """
+        Kosten, Energie und mittlerer Preis (energiegewichtet) je Stunde des Tages
+
+        Returns:
+            DataFrame: cost_eur, priced_kwh und price_eur_kwh je Stunde (0-23)
+        """
+        if self.cost_eur is None:
+            raise ValueError("Keine Preise für das Kostenprofil übergeben")
+        hour = self.codes["hour"]
+        cost = np.bincount(hour, weights=self.cost_eur, minlength=24)
+        energy = np.bincount(hour, weights=self.priced_kwh, minlength=24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            price = cost / energy
+        return pd.DataFrame({"cost_eur": cost, "priced_kwh": energy, "price_eur_kwh": price},
+                            index=pd.RangeIndex(24, name="hour"))
@@ -4,69 +4,362 @@ Vergleicht aktuellen Tarif mit EPEX Spot in Echtzeit
 """
 
 import pandas as pd
+import numpy as np
 import logging
+from collections import deque
 from core.config import CONFIG
+from core.data.timeseries import series_arrays
 
 logger = logging.getLogger(__name__)
 
-def analyze_realtime(consumption_data, tariff_data, current_tariff):
+class _WindowState:
+    """
+    Laufende Summen und monotone Warteschlangen (Minimum/Maximum) eines gleitenden Fensters
+    """
+
+    __slots__ = ("length_ns", "start", "count", "total", "minima", "maxima")
+
+    def __init__(self, length_ns, start):
+        self.length_ns = length_ns
+        self.start = start  # Absoluter Index des ersten Messwerts im Fenster
+        self.count = 0
+        self.total = 0.0
+        self.minima = deque()
+        self.maxima = deque()
+
+class RealtimeWindow:
+    """
+    Gleitende Zeitfenster über einer laufend ergänzten Messreihe
+
+    Messwerte liegen in einem Ringpuffer; jedes Fenster (now - Länge, now] führt Anzahl, Summe
+    sowie monotone Warteschlangen für Minimum und Maximum mit. Zusätzlich werden das Integral
+    (Werte bis zum nächsten Messwert gehalten, Haltedauer begrenzt) und die abgedeckte Zeit
+    kumuliert. Ein neuer Messwert kostet amortisiert O(1) pro Fenster, unabhängig davon, wie
+    viel Historie geladen ist. Bezugszeitpunkt "now" ist der jüngste Messwert.
+
+    Args:
+        windows_minutes (list): Fensterlängen in Minuten (Standard: CONFIG realtime_windows_minutes)
+        max_gap_seconds (float): Maximale Haltedauer eines Messwerts (Standard: CONFIG max_gap_minutes)
+        capacity (int): Anfangsgröße des Ringpuffers (wächst bei Bedarf)
+    """
+
+    def __init__(self, windows_minutes=None, max_gap_seconds=None, capacity=1024):
+        if windows_minutes is None:
+            windows_minutes = CONFIG["realtime_windows_minutes"]
+        if max_gap_seconds is None:
+            max_gap_seconds = float(CONFIG["max_gap_minutes"]) * 60
+        self.max_gap_ns = int(max_gap_seconds * 1e9)
+
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros(capacity)
+        self._integral = np.zeros(capacity)  # Wert·Sekunden bis zum jeweiligen Messwert
+        self._covered = np.zeros(capacity, dtype=np.int64)  # Abgedeckte ns bis zum jeweiligen Messwert
+        self.windows = {int(minutes): _WindowState(int(minutes) * 60_000_000_000, 0)
+                        for minutes in sorted(set(windows_minutes))}
+        self.clear()
+
+    def clear(self):
+        """
+        Verwirft alle Messwerte und Fensterzustände
+        """
+        self._first = 0  # Absoluter Index des ältesten gehaltenen Messwerts
+        self._next = 0  # Absoluter Index des nächsten Messwerts
+        self.windows = {minutes: _WindowState(window.length_ns, 0) for minutes, window in self.windows.items()}
+
+    def __len__(self):
+        return self._next - self._first
+
+    @property
+    def last_time(self):
+        """
+        Zeitstempel des jüngsten Messwerts in Epoch-ns (None ohne Messwerte)
+        """
+        return int(self._times[(self._next - 1) % len(self._times)]) if self._next else None
+
+    @property
+    def last_value(self):
+        """
+        Jüngster Messwert (NaN ohne Messwerte)
+        """
+        return float(self._values[(self._next - 1) % len(self._values)]) if self._next else float("nan")
+
+    def _grow(self):
+        capacity = len(self._times)
+        order = np.arange(self._first, self._next) % capacity
+        for name in ("_times", "_values", "_integral", "_covered"):
+            old = getattr(self, name)
+            new = np.zeros(capacity * 2, dtype=old.dtype)
+            new[np.arange(self._first, self._next) % (capacity * 2)] = old[order]
+            setattr(self, name, new)
+
+    def append(self, time_ns, value):
+        """
+        Fügt einen Messwert an (Zeitstempel müssen aufsteigend sein, ältere werden ignoriert)
+
+        Returns:
+            bool: True, wenn der Messwert übernommen wurde
+        """
+        last = self.last_time
+        if last is not None and time_ns <= last:
+            return False
+        if self._next - self._first == len(self._times):
+            self._grow()
+
+        capacity = len(self._times)
+        position = self._next % capacity
+        if last is None:
+            integral, covered = 0.0, 0
+        else:
+            previous = (self._next - 1) % capacity
+            held = min(time_ns - last, self.max_gap_ns)
+            previous_value = self._values[previous]
+            if np.isnan(previous_value):
+                held, previous_value = 0, 0.0
+            integral = self._integral[previous] + previous_value * held / 1e9
+            covered = self._covered[previous] + held
+        self._times[position] = time_ns
+        self._values[position] = value
+        self._integral[position] = integral
+        self._covered[position] = covered
+        index = self._next
+        self._next += 1
+
+        valid = not np.isnan(value)
+        oldest_needed = index
+        for window in self.windows.values():
+            if valid:
+                window.count += 1
+                window.total += value
+                while window.minima and self._values[window.minima[-1] % capacity] >= value:
+                    window.minima.pop()
+                window.minima.append(index)
+                while window.maxima and self._values[window.maxima[-1] % capacity] <= value:
+                    window.maxima.pop()
+                window.maxima.append(index)
+
+            # Messwerte mit Zeitstempel <= now - Länge verlassen das Fenster
+            boundary = time_ns - window.length_ns
+            while self._times[window.start % capacity] <= boundary:
+                leaving = self._values[window.start % capacity]
+                if not np.isnan(leaving):
+                    window.count -= 1
+                    window.total -= leaving
+                if window.minima and window.minima[0] == window.start:
+                    window.minima.popleft()
+                if window.maxima and window.maxima[0] == window.start:
+                    window.maxima.popleft()
+                window.start += 1
+            oldest_needed = min(oldest_needed, window.start - 1)
+
+        # Den letzten Messwert vor dem längsten Fenster für das gehaltene Teilstück behalten
+        self._first = max(self._first, oldest_needed)
+        return True
+
+    def update(self, data, column="value"):
+        """
+        Übernimmt nur die seit dem letzten Aufruf neuen Zeilen einer Zeitreihe
+
+        Beim ersten Aufruf werden nur die Messwerte des längsten Fensters (plus der davor
+        gültige Wert) gelesen, sodass der Aufwand nicht von der geladenen Historie abhängt.
+        Endet die Zeitreihe vor dem jüngsten bekannten Messwert (anderer Zeitraum gewählt),
+        wird der Zustand neu aufgebaut.
+
+        Args:
+            data (DataFrame/Series/TimeSeries): Messwerte mit Zeitindex
+            column (str): Spalte mit den Werten (bei DataFrames)
+
+        Returns:
+            int: Anzahl übernommener Messwerte
+        """
+        if data is None or len(data) == 0:
+            return 0
+        times, values, _ = series_arrays(data, column)
+        return self.update_arrays(times, values)
+
+    def update_arrays(self, times, values):
+        """
+        Wie update, aber für bereits ausgerichtete Arrays (Epoch-ns, aufsteigend); NaN-Werte
+        (z.B. veraltete Werte einer gemeinsamen Zeitachse) beenden die Haltedauer des Vorgängers
+
+        Returns:
+            int: Anzahl übernommener Messwerte
+        """
+        if not len(times):
+            return 0
+        if self._next and times[-1] < self.last_time:
+            self.clear()
+
+        if self._next:
+            begin = int(np.searchsorted(times, self.last_time, side="right"))
+        else:
+            longest = max(window.length_ns for window in self.windows.values())
+            begin = max(int(np.searchsorted(times, times[-1] - longest, side="right")) - 1, 0)
+
+        added = 0
+        for position in range(begin, len(times)):
+            added += self.append(int(times[position]), float(values[position]))
+        return added
+
+    def _state_at_boundary(self, window):
+        """
+        Integral und abgedeckte Zeit bis zur Fenstergrenze now - Länge
+
+        Der davor gültige Messwert ist window.start - 1 (falls noch gehalten), daher ist
+        keine Suche nötig.
+        """
+        capacity = len(self._times)
+        before = window.start - 1
+        if before < self._first:
+            first = max(window.start, self._first) % capacity
+            return self._integral[first], self._covered[first]
+        position = before % capacity
+        boundary = self.last_time - window.length_ns
+        held = min(boundary - self._times[position], self.max_gap_ns)
+        value = self._values[position]
+        if np.isnan(value):
+            held, value = 0, 0.0
+        return self._integral[position] + value * held / 1e9, self._covered[position] + held
+
+    def stats(self, minutes):
+        """
+        Kennzahlen eines konfigurierten Fensters
+
+        Returns:
+            dict: count, mean, min, max (über die Messwerte im Fenster), time_mean
+                  (zeitgewichtet), value_hours (Wert × Stunden, bei W also Wh) und covered_hours
+        """
+        window = self.windows[int(minutes)]
+        capacity = len(self._times)
+        if not self._next:
+            nan = float("nan")
+            return {"count": 0, "mean": nan, "min": nan, "max": nan, "time_mean": nan,
+                    "value_hours": 0.0, "covered_hours": 0.0}
+
+        last = (self._next - 1) % capacity
+        start_integral, start_covered = self._state_at_boundary(window)
+        value_seconds = self._integral[last] - start_integral
+        covered_ns = int(self._covered[last] - start_covered)
+
+        count = window.count
+        mean = window.total / count if count else float("nan")
+        if covered_ns > 0:
+            time_mean = value_seconds * 1e9 / covered_ns
+        else:
+            # Ohne Haltedauer (einzelner Messwert) gilt der zuletzt bekannte Wert
+            time_mean = mean if count else self.last_value
+        return {
+            "count": count,
+            "mean": mean,
+            "min": float(self._values[window.minima[0] % capacity]) if window.minima else time_mean,
+            "max": float(self._values[window.maxima[0] % capacity]) if window.maxima else time_mean,
+            "time_mean": float(time_mean),
+            "value_hours": float(value_seconds) / 3600,
+            "covered_hours": covered_ns / 3.6e12
+        }
+
+    def all_stats(self):
+        """
+        Kennzahlen aller konfigurierten Fenster, nach Fensterlänge in Minuten
+        """
+        return {minutes: self.stats(minutes) for minutes in self.windows}
+
+def realtime_window_minutes():
+    """
+    Fensterlängen der Echtzeit-Analyse in Minuten (15 und 60 Minuten sind immer enthalten)
+    """
+    return sorted(set(CONFIG["realtime_windows_minutes"]) | {15, 60})
+
+def create_realtime_windows():
+    """
+    Fensterzustände für Verbrauch und EPEX Preise (15 und 60 Minuten sind immer enthalten)
+
+    Returns:
+        tuple: (RealtimeWindow für Verbrauch, RealtimeWindow für Preise)
+    """
+    windows_minutes = realtime_window_minutes()
+    # Preise gelten bis zum nächsten Preis, daher keine kurze Haltebegrenzung
+    return (RealtimeWindow(windows_minutes),
+            RealtimeWindow(windows_minutes, max_gap_seconds=max(windows_minutes) * 60))
+
+def _epex_costs(aligned, consumption_key, price_key, current_epex, minutes):
+    """
+    EPEX Kosten der letzten Minuten mit dem jeweils gültigen Preis je Intervall (€)
+    """
+    end = int(aligned.times[-1])
+    edges = [end - int(window * 60e9) for window in sorted(minutes, reverse=True)] + [end]
+    tail = aligned.since(edges[0])
+    cost = tail.energy_kwh(consumption_key) * tail.filled(price_key, current_epex)
+    totals = np.cumsum(tail.sum_by_bins({"cost": cost}, edges)["cost"][::-1])[::-1]
+    return dict(zip(sorted(minutes, reverse=True), totals))
+
+def analyze_realtime(consumption_data, tariff_data, current_tariff, consumption_window=None, price_window=None,
+                     aligned=None, consumption_key="consumption", price_key="price"):
     """
     Analysiert in Echtzeit, ob Tarifwechsel sinnvoll ist
     
+    Die Fenster werden nur um neue Messwerte ergänzt; übergibt der Aufrufer dieselben
+    RealtimeWindow-Objekte bei jeder Aktualisierung (z.B. aus st.session_state), hängt der
+    Aufwand nur von den neu hinzugekommenen Daten ab.
+    
     Args:
         consumption_data: Aktuelle Verbrauchsdaten
         tariff_data: Aktuelle EPEX Spot Preise
         current_tariff: Aktueller Tarifpreis
+        consumption_window (RealtimeWindow): Fensterzustand des Verbrauchs (Standard: neu)
+        price_window (RealtimeWindow): Fensterzustand der EPEX Preise (Standard: neu)
+        aligned (AlignedSeries): Gemeinsame Zeitachse mit Verbrauch und Preis (ersetzt die
+                                 DataFrames); die EPEX Kosten der Fenster werden dann je
+                                 Intervall mit dem gültigen Preis statt mit dem aktuellen berechnet
+        consumption_key, price_key (str): Namen der Reihen in aligned
         
     Returns:
         dict: Analyseergebnisse
     """
     try:
-        if consumption_data is None or tariff_data is None:
+        if aligned is None and (consumption_data is None or tariff_data is None):
             return None
         
-        # Aktuellen Verbrauch berechnen (letzte Stunde)
-        current_consumption = consumption_data.iloc[-1]['value']  # Aktueller Wert
-        
-        # Daten der letzten Viertelstunde extrahieren (15 Minuten) - zeitbasiert
-        from datetime import timedelta
-        last_quarter_hour_data = consumption_data[consumption_data.index > (consumption_data.index[-1] - timedelta(minutes=15))]
-        
-        # Statistiken für die letzte Viertelstunde
-        avg_consumption_last_quarter = last_quarter_hour_data['value'].mean()
-        max_consumption_last_quarter = last_quarter_hour_data['value'].max()
-        min_consumption_last_quarter = last_quarter_hour_data['value'].min()
-        # Korrekte kWh Berechnung: Durchschnittsleistung in kW * Zeit in Stunden
-        # Für Viertelstunde: durchschnittliche Leistung in kW * 0.25 Stunden
-        avg_power_kw_quarter = avg_consumption_last_quarter / 1000  # W zu kW
-        total_consumption_last_quarter_kwh = avg_power_kw_quarter * 0.25  # kW * 0.25h = kWh
-        
-        # Daten der letzten Stunde extrahieren - zeitbasiert
-        last_hour_data = consumption_data[consumption_data.index > (consumption_data.index[-1] - timedelta(hours=1))]
-        
-        # Statistiken für die letzte Stunde
-        avg_consumption_last_hour = last_hour_data['value'].mean()
-        max_consumption_last_hour = last_hour_data['value'].max()
-        min_consumption_last_hour = last_hour_data['value'].min()
-        # Korrekte kWh Berechnung: Durchschnittsleistung in kW * Zeit in Stunden
-        # Für Stunde: durchschnittliche Leistung in kW * 1 Stunde
-        avg_power_kw_hour = avg_consumption_last_hour / 1000  # W zu kW
-        total_consumption_last_hour_kwh = avg_power_kw_hour * 1.0  # kW * 1h = kWh
-        
-        # Aktuellen EPEX Preis
-        current_epex = tariff_data.iloc[-1]['value']  # Aktueller Spot-Preis
-        
-        # EPEX Preisentwicklung der letzten Viertelstunde
-        last_quarter_epex = tariff_data.iloc[-15:]['value']
-        avg_epex_last_quarter = last_quarter_epex.mean()
-        max_epex_last_quarter = last_quarter_epex.max()
-        min_epex_last_quarter = last_quarter_epex.min()
-        
-        # EPEX Preisentwicklung der letzten Stunde
-        last_hour_epex = tariff_data.iloc[-60:]['value']
-        avg_epex_last_hour = last_hour_epex.mean()
-        max_epex_last_hour = last_hour_epex.max()
-        min_epex_last_hour = last_hour_epex.min()
+        if consumption_window is None or price_window is None:
+            consumption_window, price_window = create_realtime_windows()
+        if aligned is not None:
+            # Zeitpunkte nach dem letzten Verbrauchswert (z.B. Day-Ahead-Preise) nicht berücksichtigen
+            bounds = aligned.valid_range([consumption_key])
+            if bounds is None:
+                return None
+            aligned = aligned.slice(0, bounds[1])
+            consumption_window.update_arrays(aligned.times, aligned[consumption_key])
+            price_window.update_arrays(aligned.times, aligned[price_key])
+        else:
+            consumption_window.update(consumption_data)
+            price_window.update(tariff_data)
+        
+        # Aktueller Verbrauch und Spot-Preis
+        current_consumption = consumption_window.last_value
+        current_epex = price_window.last_value
+        
+        # Letzte Viertelstunde und letzte Stunde (zeitgewichtet, Werte bis zum nächsten Messwert gehalten)
+        quarter = consumption_window.stats(15)
+        hour = consumption_window.stats(60)
+        avg_consumption_last_quarter = quarter['time_mean']
+        max_consumption_last_quarter = quarter['max']
+        min_consumption_last_quarter = quarter['min']
+        total_consumption_last_quarter_kwh = quarter['value_hours'] / 1000  # Wh zu kWh
+        
+        avg_consumption_last_hour = hour['time_mean']
+        max_consumption_last_hour = hour['max']
+        min_consumption_last_hour = hour['min']
+        total_consumption_last_hour_kwh = hour['value_hours'] / 1000  # Wh zu kWh
+        
+        # EPEX Preisentwicklung der letzten Viertelstunde und Stunde (zeitbasiert statt Zeilenanzahl)
+        quarter_epex = price_window.stats(15)
+        hour_epex = price_window.stats(60)
+        avg_epex_last_quarter = quarter_epex['time_mean']
+        max_epex_last_quarter = quarter_epex['max']
+        min_epex_last_quarter = quarter_epex['min']
+        
+        avg_epex_last_hour = hour_epex['time_mean']
+        max_epex_last_hour = hour_epex['max']
+        min_epex_last_hour = hour_epex['min']
         
         # Kostenvergleich für aktuellen Moment
         current_cost = current_consumption / 1000 * current_tariff  # €/h
@@ -80,6 +373,11 @@ def analyze_realtime(consumption_data, tariff_data, current_tariff):
         current_cost_last_hour = total_consumption_last_hour_kwh * current_tariff  # €
         epex_cost_last_hour = total_consumption_last_hour_kwh * current_epex  # €
         
+        if aligned is not None:
+            # Mit gemeinsamer Zeitachse: jedes Intervall mit seinem gültigen Preis bewerten
+            epex_costs = _epex_costs(aligned, consumption_key, price_key, current_epex, (15, 60))
+            epex_cost_last_quarter, epex_cost_last_hour = epex_costs[15], epex_costs[60]
+        
         # Einsparung
         savings = current_cost - epex_cost
         savings_percent = (savings / current_cost * 100) if current_cost > 0 else 0
@@ -130,12 +428,12 @@ def analyze_realtime(consumption_data, tariff_data, current_tariff):
             'savings_percent_last_hour': savings_percent_last_hour,
             'avg_epex_last_hour': avg_epex_last_hour,
             'max_epex_last_hour': max_epex_last_hour,
-            'min_epex_last_hour': min_epex_last_hour
+            'min_epex_last_hour': min_epex_last_hour,
+            # Alle konfigurierten Fenster (Minuten -> Kennzahlen)
+            'consumption_windows': consumption_window.all_stats(),
+            'epex_windows': price_window.all_stats()
         }
         
-        logger.info(f"Echtzeit-Analyse abgeschlossen - Letzte Stunde: {avg_consumption_last_hour:.0f} W → {total_consumption_last_hour_kwh:.3f} kWh")
-        logger.info(f"Letzte Viertelstunde: {avg_consumption_last_quarter:.0f} W → {total_consumption_last_quarter_kwh:.3f} kWh")
-        
     except Exception as e:
         logger.error(f"Fehler in Echtzeit-Analyse: {e}")
         return None
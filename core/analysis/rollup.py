@@ -0,0 +1,132 @@
+"""
+Aggregation einer Leistungsreihe auf Stunden, Tage, Wochen, Monate und Jahre in einem Durchlauf
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day", "week", "month", "year")
+
+# Kalender-Frequenzen; außer 'hour' folgen alle der Ortszeit (Sommerzeit-Wechsel inklusive)
+_FREQUENCIES = {
+    "hour": ("h", pd.Timedelta(hours=1)),
+    "day": ("D", pd.DateOffset(days=1)),
+    "week": ("W-MON", pd.DateOffset(weeks=1)),
+    "month": ("MS", pd.DateOffset(months=1)),
+    "year": ("YS", pd.DateOffset(years=1)),
+}
+
+ROLLUP_COLUMNS = ["energy_kwh", "mean_w", "min_w", "max_w", "count", "coverage"]
+
+def _period_start(timestamp, granularity):
+    """
+    Beginn der Periode, die den Zeitpunkt enthält
+    """
+    if granularity == "hour":
+        # Über UTC abrunden, damit mehrdeutige Stunden beim Sommerzeit-Wechsel kein Problem sind
+        if timestamp.tz is not None:
+            return timestamp.tz_convert("UTC").floor("h").tz_convert(timestamp.tz)
+        return timestamp.floor("h")
+    day = timestamp.normalize()
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return (day - pd.DateOffset(days=day.weekday())).normalize()
+    if granularity == "month":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+def period_edges(start_time, end_time, granularity):
+    """
+    Periodengrenzen, die [start_time, end_time] vollständig abdecken
+
+    Returns:
+        DatetimeIndex: n+1 aufsteigende Grenzen für n Perioden
+    """
+    freq, offset = _FREQUENCIES[granularity]
+    first = _period_start(start_time, granularity)
+    edges = pd.date_range(first, end_time, freq=freq)
+    return edges.append(pd.DatetimeIndex([edges[-1] + offset]))
+
+def compute_rollups(data, column="value", granularities=GRANULARITIES, integrator=None, extremes=None):
+    """
+    Berechnet Energie und Leistungskennzahlen pro Periode für mehrere Granularitäten
+
+    Die Daten werden genau einmal durchlaufen: Energie und abgedeckte Zeit kommen aus der
+    kumulierten Energie des EnergyIntegrator, Anzahl, Minimum und Maximum werden pro Stunde
+    berechnet und für gröbere Perioden aus den Stundenwerten zusammengesetzt. Das Eingabe-
+    DataFrame wird nicht verändert.
+
+    Args:
+        data (DataFrame/TimeSeries): Leistungswerte in W mit Zeitindex
+        column (str): Spalte mit den Leistungswerten
+        granularities (tuple): Auswahl aus 'hour', 'day', 'week', 'month', 'year'
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie der Daten
+        extremes (tuple): (Minimum, Maximum) je Bucket mit den Zeitpunkten von data (siehe
+                          bucket_extremes); ohne Angabe sind die Messwerte selbst die Extremwerte
+
+    Returns:
+        dict: Granularität -> DataFrame mit Periodenbeginn als Index und den Spalten
+              energy_kwh, mean_w (zeitgewichtet), min_w, max_w, count, coverage (Anteil 0..1)
+              oder None ohne Daten
+    """
+    if data is None or data.empty:
+        return None
+
+    times, values, tz = series_arrays(data, column)
+    if integrator is None:
+        integrator = EnergyIntegrator(data, column)
+    start_time, end_time = pd.Timestamp(int(times[0]), tz=tz), pd.Timestamp(int(times[-1]), tz=tz)
+
+    # Ein Durchlauf über die Messwerte: Anzahl, Summe, Minimum und Maximum pro Stunde
+    hour_edges = period_edges(start_time, end_time, "hour")
+    hour_ns = _index_ns(hour_edges)
+    bounds = np.searchsorted(integrator.times, hour_ns, side="left")
+    valid = ~np.isnan(values)
+    valid_cumulative = np.concatenate(([0], np.cumsum(valid)))
+    value_cumulative = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    hour_count = np.diff(valid_cumulative[bounds])
+    hour_sum = np.diff(value_cumulative[bounds])
+    hour_min = np.full(len(hour_edges) - 1, np.nan)
+    hour_max = np.full(len(hour_edges) - 1, np.nan)
+    filled = np.flatnonzero(np.diff(bounds) > 0)
+    if len(filled):
+        # Segmente leerer Stunden sind leer, daher reicht reduceat über die gefüllten Stunden
+        minimum, maximum = (values, values) if extremes is None else (series_arrays(part)[1] for part in extremes)
+        hour_min[filled] = np.fmin.reduceat(minimum, bounds[filled])
+        hour_max[filled] = np.fmax.reduceat(maximum, bounds[filled])
+
+    rollups = {}
+    for granularity in granularities:
+        if granularity == "hour":
+            edges, count, total, minimum, maximum = hour_edges, hour_count, hour_sum, hour_min, hour_max
+        else:
+            edges = period_edges(start_time, end_time, granularity)
+            positions = np.searchsorted(hour_ns, _index_ns(edges))[:-1]
+            count = np.add.reduceat(hour_count, positions)
+            total = np.add.reduceat(hour_sum, positions)
+            minimum = np.fmin.reduceat(hour_min, positions)
+            maximum = np.fmax.reduceat(hour_max, positions)
+
+        energy_kwh, covered_hours = integrator.energy_by_bins(edges)
+        length_hours = np.diff(_index_ns(edges)) / 3.6e12
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Zeitgewichteter Mittelwert; ohne Haltedauer (einzelner Messwert) arithmetischer Mittelwert
+            mean_w = np.where(covered_hours > 0, energy_kwh * 1000 / covered_hours, total / count)
+
+        rollups[granularity] = pd.DataFrame({
+            "energy_kwh": energy_kwh,
+            "mean_w": mean_w,
+            "min_w": minimum,
+            "max_w": maximum,
+            "count": count.astype(np.int64),
+            "coverage": covered_hours / length_hours
+        }, index=pd.DatetimeIndex(edges[:-1], name="period_start"))
+
+    return rollups
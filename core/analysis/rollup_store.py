@@ -0,0 +1,553 @@
+"""
+Persistente Stunden- und Tagesaggregate je Entität (SQLite), inkrementell fortgeschrieben
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.analysis.energy import EnergyIntegrator, _index_ns
+from core.analysis.alignment import asof, merge_times
+from core.analysis.rollup import GRANULARITIES, period_edges
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+HOUR_NS = 3_600_000_000_000
+
+# Spalten je Periode und wie sie beim Zusammenführen kombiniert werden
+_SUM_COLUMNS = ["energy_kwh", "covered_hours", "value_sum", "value_squares", "count", "cost_eur", "priced_kwh"]
+_MIN_COLUMNS = ["min_w", "first_time"]
+_MAX_COLUMNS = ["max_w", "last_time"]
+STORE_COLUMNS = _SUM_COLUMNS + _MIN_COLUMNS + _MAX_COLUMNS
+
+# Platzhalter für Perioden ohne Messwert (werden als NULL gespeichert)
+_NO_FIRST = np.iinfo(np.int64).max
+_NO_LAST = np.iinfo(np.int64).min
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    entity_id TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    period_start INTEGER NOT NULL,
+    energy_kwh REAL NOT NULL,
+    covered_hours REAL NOT NULL,
+    value_sum REAL NOT NULL,
+    value_squares REAL NOT NULL,
+    count INTEGER NOT NULL,
+    cost_eur REAL NOT NULL,
+    priced_kwh REAL NOT NULL,
+    min_w REAL,
+    first_time INTEGER,
+    max_w REAL,
+    last_time INTEGER,
+    PRIMARY KEY (entity_id, granularity, period_start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watermarks (
+    entity_id TEXT PRIMARY KEY,
+    first_time INTEGER NOT NULL,
+    last_time INTEGER NOT NULL,
+    last_value REAL
+);
+"""
+
+# Neue Beiträge werden auf bestehende Perioden addiert bzw. mit Minimum/Maximum kombiniert
+_UPSERT = f"""
+INSERT INTO rollups (entity_id, granularity, period_start, {", ".join(STORE_COLUMNS)})
+VALUES (?, ?, ?, {", ".join("?" * len(STORE_COLUMNS))})
+ON CONFLICT (entity_id, granularity, period_start) DO UPDATE SET
+    {", ".join(f"{column} = {column} + excluded.{column}" for column in _SUM_COLUMNS)},
+    {", ".join(f"{column} = MIN(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))" for column in _MIN_COLUMNS)},
+    {", ".join(f"{column} = MAX(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))" for column in _MAX_COLUMNS)}
+"""
+
+def _combine(table, starts):
+    """
+    Fasst aufeinanderfolgende Zeilen ab den Positionen starts zu je einer Zeile zusammen
+    """
+    combined = {column: np.add.reduceat(table[column], starts) for column in _SUM_COLUMNS}
+    combined.update({column: np.fmin.reduceat(table[column], starts) for column in _MIN_COLUMNS})
+    combined.update({column: np.fmax.reduceat(table[column], starts) for column in _MAX_COLUMNS})
+    return combined
+
+def _utc_arrays(data):
+    """
+    Zeitpunkte (Epoch-ns UTC) und Werte; zeitzonenlose Daten gelten in CONFIG timezone
+    """
+    times, values, tz = series_arrays(data)
+    if tz is None:
+        times = _index_ns(pd.DatetimeIndex(times.view("datetime64[ns]")).tz_localize(CONFIG["timezone"]))
+    return times, values
+
+def _group_starts(keys):
+    """
+    Anfangspositionen gleicher, aufeinanderfolgender Schlüssel
+    """
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+def hourly_aggregates(times, values, seed=None, prices=None, max_gap_seconds=None):
+    """
+    Beiträge neuer Messwerte zu den UTC-Stunden
+
+    Der Messwert seed (zuletzt gespeicherter Messwert) wird bis zum ersten neuen Messwert
+    gehalten und zählt nur zur Energie, nicht zu Anzahl, Summe oder Extremwerten. Der letzte
+    neue Messwert wird noch nicht gehalten; das übernimmt die nächste Aktualisierung.
+
+    Args:
+        times (ndarray): Neue Zeitpunkte in Epoch-ns (aufsteigend)
+        values (ndarray): Neue Leistungswerte in W
+        seed (tuple): (Zeitpunkt in Epoch-ns, Wert) des letzten gespeicherten Messwerts oder None
+        prices: EPEX Preise in €/kWh (DataFrame/TimeSeries) für die Kosten je Stunde
+        max_gap_seconds (float): Maximale Haltedauer (Standard: CONFIG max_gap_minutes)
+
+    Returns:
+        tuple: (Stundenanfänge in Epoch-ns, dict Spalte -> ndarray) nur für Stunden mit Beitrag
+    """
+    if max_gap_seconds is None:
+        max_gap_seconds = float(CONFIG["max_gap_minutes"]) * 60
+    all_times, all_values = times, values
+    if seed is not None:
+        all_times = np.concatenate(([seed[0]], times))
+        all_values = np.concatenate(([np.nan if seed[1] is None else seed[1]], values))
+    held = np.zeros(len(all_times), dtype=np.int64)
+    np.minimum(np.diff(all_times), int(max_gap_seconds * 1e9), out=held[:-1])
+    integrator = EnergyIntegrator.from_arrays(all_times, all_values, held, "UTC")
+
+    first_hour = all_times[0] - all_times[0] % HOUR_NS
+    edge_ns = np.arange(first_hour, all_times[-1] + HOUR_NS, HOUR_NS, dtype=np.int64)
+    if edge_ns[-1] <= all_times[-1]:
+        edge_ns = np.append(edge_ns, edge_ns[-1] + HOUR_NS)
+    to_index = lambda ns: pd.DatetimeIndex(ns.view("datetime64[ns]")).tz_localize("UTC")
+    energy, covered = integrator.energy_by_bins(to_index(edge_ns))
+    hours = len(edge_ns) - 1
+
+    # Kosten: Energie zwischen Stunden- und Preisgrenzen × jeweils gültiger Preis
+    cost = np.zeros(hours)
+    priced_kwh = np.zeros(hours)
+    if prices is not None and len(prices):
+        price_times, price_values = _utc_arrays(prices)
+        bins = merge_times(edge_ns, price_times[(price_times > edge_ns[0]) & (price_times < edge_ns[-1])])
+        bin_kwh, _ = integrator.energy_by_bins(to_index(bins))
+        price = asof(bins[:-1], price_times, price_values)
+        priced = ~np.isnan(price)
+        hour = (bins[:-1] - edge_ns[0]) // HOUR_NS
+        cost = np.bincount(hour, weights=np.where(priced, bin_kwh * price, 0.0), minlength=hours)
+        priced_kwh = np.bincount(hour, weights=np.where(priced, bin_kwh, 0.0), minlength=hours)
+
+    # Anzahl, Summen und Extremwerte nur über die neuen Messwerte
+    hour = (times - edge_ns[0]) // HOUR_NS
+    valid = ~np.isnan(values)
+    clean = np.where(valid, values, 0.0)
+    minimum = np.full(hours, np.nan)
+    maximum = np.full(hours, np.nan)
+    first = np.full(hours, _NO_FIRST, dtype=np.int64)
+    last = np.full(hours, _NO_LAST, dtype=np.int64)
+    if len(times):
+        starts = _group_starts(hour)
+        filled = hour[starts]
+        minimum[filled] = np.fmin.reduceat(values, starts)
+        maximum[filled] = np.fmax.reduceat(values, starts)
+        first[filled] = times[starts]
+        last[filled] = times[np.append(starts[1:], len(times)) - 1]
+
+    table = {
+        "energy_kwh": energy,
+        "covered_hours": covered,
+        "value_sum": np.bincount(hour, weights=clean, minlength=hours),
+        "value_squares": np.bincount(hour, weights=clean * clean, minlength=hours),
+        "count": np.bincount(hour[valid], minlength=hours).astype(np.int64),
+        "cost_eur": cost,
+        "priced_kwh": priced_kwh,
+        "min_w": minimum,
+        "first_time": first,
+        "max_w": maximum,
+        "last_time": last,
+    }
+    keep = (covered > 0) | (first != _NO_FIRST)
+    return edge_ns[:-1][keep], {column: aggregate[keep] for column, aggregate in table.items()}
+
+def _to_local(ns, tz=None):
+    return pd.DatetimeIndex(np.asarray(ns, dtype=np.int64).view("datetime64[ns]")).tz_localize("UTC").tz_convert(tz or CONFIG["timezone"])
+
+def _to_ns(value, tz=None):
+    """
+    Zeitpunkt in Epoch-ns; zeitzonenlose Werte gelten in CONFIG timezone
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is None:
+        timestamp = timestamp.tz_localize(tz or CONFIG["timezone"])
+    return timestamp.value
+
+def _sql_value(value, missing=None):
+    """
+    NumPy-Wert als SQLite-Parameter (NaN und Platzhalter werden NULL)
+    """
+    if missing is not None and value == missing:
+        return None
+    value = value.item()
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+class RollupStore:
+    """
+    Stunden- und Tagesaggregate je Entität in einer SQLite-Datei
+
+    Je Stunde (UTC) und je Tag (Ortszeit, CONFIG timezone) werden Energie, abgedeckte Zeit,
+    Anzahl, Summe und Quadratsumme der Messwerte, Minimum, Maximum, erster/letzter Zeitpunkt
+    sowie EPEX-Kosten gespeichert. update() verarbeitet nur Messwerte nach dem Wasserzeichen
+    der Entität und addiert deren Beiträge auf die betroffenen Perioden; ein Jahr entspricht
+    damit 8.760 Stundenzeilen statt Millionen Messwerten. Ältere Messwerte als das
+    Wasserzeichen werden ignoriert.
+
+    Args:
+        path (str): Pfad der SQLite-Datei
+        max_gap_seconds (float): Maximale Haltedauer (Standard: CONFIG max_gap_minutes)
+    """
+
+    def __init__(self, path, max_gap_seconds=None):
+        self.path = path
+        self.max_gap_seconds = max_gap_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection:
+            # WAL: Lesen aus der Web-App blockiert das Schreiben des Ingest-Workers nicht
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Eine Verbindung pro Aufruf, da Streamlit Reruns in wechselnden Threads ausführt
+        return sqlite3.connect(self.path, timeout=30)
+
+    # --- Schreiben ----------------------------------------------------------------
+
+    def watermark(self, entity_id):
+        """
+        Zuletzt gespeicherter Messwert einer Entität
+
+        Returns:
+            tuple: (Epoch-ns, Wert) oder None, wenn noch nichts gespeichert ist
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT last_time, last_value FROM watermarks WHERE entity_id = ?", (entity_id,)).fetchone()
+        return (int(row[0]), row[1]) if row else None
+
+    def update(self, entity_id, data, prices=None):
+        """
+        Schreibt die Beiträge aller Messwerte nach dem Wasserzeichen fort
+
+        Args:
+            entity_id (str): Entität
+            data (DataFrame/TimeSeries): Leistungswerte in W (darf bereits gespeicherte enthalten)
+            prices: EPEX Preise in €/kWh für die Kosten (optional)
+
+        Returns:
+            int: Anzahl neu verarbeiteter Messwerte oder None bei einem Fehler
+        """
+        if data is None or len(data) == 0:
+            return 0
+        try:
+            return self._update(entity_id, data, prices)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Fehler beim Aktualisieren des Rollup-Store ({entity_id}): {e}")
+            return None
+
+    def _update(self, entity_id, data, prices):
+        times, values = _utc_arrays(data)
+
+        with self._lock:
+            seed = self.watermark(entity_id)
+            begin = int(np.searchsorted(times, seed[0], side="right")) if seed else 0
+            if begin >= len(times):
+                return 0
+            new_times, new_values = times[begin:], values[begin:]
+            hour_starts, hourly = hourly_aggregates(new_times, new_values, seed, prices, self.max_gap_seconds)
+
+            # Tage (Ortszeit) aus den Stundenbeiträgen zusammensetzen
+            day_keys = _index_ns(_to_local(hour_starts).normalize())
+            day_starts = _group_starts(day_keys)
+            daily = _combine(hourly, day_starts)
+
+            with closing(self._connect()) as connection, connection:
+                for granularity, starts, table in (("hour", hour_starts, hourly), ("day", day_keys[day_starts], daily)):
+                    connection.executemany(_UPSERT, (
+                        (entity_id, granularity, int(start),
+                         *(_sql_value(table[column][i]) for column in _SUM_COLUMNS),
+                         _sql_value(table["min_w"][i]), _sql_value(table["first_time"][i], _NO_FIRST),
+                         _sql_value(table["max_w"][i]), _sql_value(table["last_time"][i], _NO_LAST))
+                        for i, start in enumerate(starts)))
+                last_value = float(new_values[-1])
+                connection.execute(
+                    "INSERT INTO watermarks (entity_id, first_time, last_time, last_value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (entity_id) DO UPDATE SET last_time = excluded.last_time, last_value = excluded.last_value",
+                    (entity_id, int(new_times[0]), int(new_times[-1]), None if np.isnan(last_value) else last_value))
+
+        logger.debug(f"Rollup-Store {entity_id}: {len(new_times)} Messwerte, {len(hour_starts)} Stunden aktualisiert")
+        return len(new_times)
+
+    # --- Lesen --------------------------------------------------------------------
+
+    def coverage(self, entity_id):
+        """
+        Zeitraum der gespeicherten Messwerte
+
+        Returns:
+            tuple: (erster, letzter Zeitpunkt) als Timestamps in CONFIG timezone oder None
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT first_time, last_time FROM watermarks WHERE entity_id = ?", (entity_id,)).fetchone()
+        return tuple(_to_local([row[0], row[1]])) if row else None
+
+    def covers(self, entity_id, start_time):
+        """
+        True, wenn der Store die Entität ab start_time enthält
+        """
+        coverage = self.coverage(entity_id)
+        return coverage is not None and coverage[0].value <= _to_ns(start_time)
+
+    def read(self, entity_id, granularity="hour", start_time=None, end_time=None):
+        """
+        Gespeicherte Perioden mit period_start in [start_time, end_time)
+
+        Returns:
+            tuple: (Periodenanfänge in Epoch-ns, dict Spalte -> ndarray)
+        """
+        start_ns = _to_ns(start_time) if start_time is not None else _NO_LAST
+        end_ns = _to_ns(end_time) if end_time is not None else _NO_FIRST
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT period_start, {', '.join(STORE_COLUMNS)} FROM rollups "
+                "WHERE entity_id = ? AND granularity = ? AND period_start >= ? AND period_start < ? ORDER BY period_start",
+                (entity_id, granularity, start_ns, end_ns)).fetchall()
+
+        columns = list(zip(*rows)) if rows else [()] * (len(STORE_COLUMNS) + 1)
+        table = {}
+        for column, values in zip(STORE_COLUMNS, columns[1:]):
+            if column == "first_time":
+                table[column] = np.array([_NO_FIRST if value is None else value for value in values], dtype=np.int64)
+            elif column == "last_time":
+                table[column] = np.array([_NO_LAST if value is None else value for value in values], dtype=np.int64)
+            elif column == "count":
+                table[column] = np.array(values, dtype=np.int64)
+            else:
+                table[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return np.array(columns[0], dtype=np.int64), table
+
+    def rollups(self, entity_id, start_time=None, end_time=None, granularities=GRANULARITIES):
+        """
+        Aggregate im Format von compute_rollups (nur Perioden mit gespeicherten Daten)
+
+        Es werden nur Stunden und Tage geliefert, die vollständig in [start_time, end_time)
+        liegen; Wochen, Monate und Jahre werden aus diesen Tagen zusammengesetzt. Angebrochene
+        Randperioden fehlen daher (exakte Kennzahlen beliebiger Zeiträume: StoredSeriesIndex).
+
+        Returns:
+            dict: Granularität -> DataFrame mit den Spalten von compute_rollups sowie
+                  covered_hours, cost_eur, priced_kwh, first_time, last_time oder None ohne Daten
+        """
+        end_ns = _to_ns(end_time) if end_time is not None else _NO_FIRST
+        hour_starts, hourly = self.read(entity_id, "hour", start_time, end_time) if "hour" in granularities else (None, None)
+        if hour_starts is not None:
+            inside = hour_starts <= end_ns - HOUR_NS
+            hour_starts, hourly = hour_starts[inside], {column: values[inside] for column, values in hourly.items()}
+        day_starts, daily = self.read(entity_id, "day", start_time, end_time)
+        days = _to_local(day_starts)
+        day_ends = _index_ns(days + pd.DateOffset(days=1))
+        inside = day_ends <= end_ns
+        day_starts, day_ends, days = day_starts[inside], day_ends[inside], days[inside]
+        daily = {column: values[inside] for column, values in daily.items()}
+        if not len(day_starts):
+            return None
+
+        result = {}
+        for granularity in granularities:
+            if granularity == "hour":
+                result["hour"] = _rollup_frame(_to_local(hour_starts), hourly, np.ones(len(hour_starts)))
+                continue
+            if granularity == "day":
+                starts, table = days, daily
+                lengths = (day_ends - day_starts) / HOUR_NS
+            else:
+                edges = period_edges(days[0], days[-1], granularity)
+                positions = np.searchsorted(_index_ns(edges), day_starts, side="right") - 1
+                groups = _group_starts(positions)
+                table = _combine(daily, groups)
+                starts = edges[positions[groups]]
+                lengths = np.diff(_index_ns(edges))[positions[groups]] / HOUR_NS
+            result[granularity] = _rollup_frame(starts, table, lengths)
+        return result
+
+    def hour_sums(self, entity_id, start_ns, end_ns):
+        """
+        Summen der Stundenzeilen mit period_start in [start_ns, end_ns)
+
+        Returns:
+            dict: count, energy_kwh, covered_hours, value_sum, value_squares, min_w, max_w
+        """
+        with closing(self._connect()) as connection:
+            energy_kwh, covered_hours, total, squares, count, minimum, maximum = connection.execute(
+                "SELECT TOTAL(energy_kwh), TOTAL(covered_hours), TOTAL(value_sum), TOTAL(value_squares), "
+                "TOTAL(count), MIN(min_w), MAX(max_w) FROM rollups "
+                "WHERE entity_id = ? AND granularity = 'hour' AND period_start >= ? AND period_start < ?",
+                (entity_id, start_ns, end_ns)).fetchone()
+        return {
+            "count": int(count),
+            "energy_kwh": energy_kwh,
+            "covered_hours": covered_hours,
+            "value_sum": total,
+            "value_squares": squares,
+            "min_w": float(minimum) if minimum is not None else float("nan"),
+            "max_w": float(maximum) if maximum is not None else float("nan")
+        }
+
+    def stats(self, entity_id, start_time, end_time):
+        """
+        Kennzahlen eines Zeitraums aus den Stundenzeilen (wie TimeSeriesIndex.stats)
+
+        Returns:
+            dict: Kennzahlen oder None, wenn die Grenzen nicht auf volle Stunden fallen
+        """
+        start_ns, end_ns = _to_ns(start_time), _to_ns(end_time)
+        if start_ns % HOUR_NS or end_ns % HOUR_NS:
+            return None
+        return _stats_from_sums([self.hour_sums(entity_id, start_ns, end_ns)])
+
+    def index(self, entity_id, fallback=None):
+        """
+        Zeitindex für analyze_time_period: gespeicherte volle Stunden aus dem Store, Ränder aus fallback
+        """
+        return StoredSeriesIndex(self, entity_id, fallback)
+
+def _rollup_frame(starts, table, lengths):
+    """
+    DataFrame im Format von compute_rollups aus gespeicherten Perioden
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_w = np.where(table["covered_hours"] > 0, table["energy_kwh"] * 1000 / table["covered_hours"],
+                          table["value_sum"] / table["count"])
+    has_samples = table["count"] > 0
+    return pd.DataFrame({
+        "energy_kwh": table["energy_kwh"],
+        "mean_w": mean_w,
+        "min_w": table["min_w"],
+        "max_w": table["max_w"],
+        "count": table["count"],
+        "coverage": table["covered_hours"] / lengths,
+        "covered_hours": table["covered_hours"],
+        "cost_eur": table["cost_eur"],
+        "priced_kwh": table["priced_kwh"],
+        "first_time": _to_local(np.where(has_samples, table["first_time"], 0)).where(has_samples),
+        "last_time": _to_local(np.where(has_samples, table["last_time"], 0)).where(has_samples),
+    }, index=pd.DatetimeIndex(starts, name="period_start"))
+
+def _sums_from_stats(stats):
+    """
+    Summen (wie RollupStore.hour_sums) aus den Kennzahlen eines TimeSeriesIndex
+    """
+    count = stats["count"]
+    mean = stats["sample_mean_w"] if count else 0.0
+    std = stats["std_w"] if count else 0.0
+    return {
+        "count": count,
+        "energy_kwh": stats["energy_kwh"],
+        "covered_hours": stats["covered_hours"],
+        "value_sum": mean * count,
+        "value_squares": (std * std + mean * mean) * count,
+        "min_w": stats["min_w"],
+        "max_w": stats["max_w"]
+    }
+
+def _stats_from_sums(parts):
+    """
+    Kennzahlen wie TimeSeriesIndex.stats aus den Summen aneinandergrenzender Teilzeiträume
+    """
+    count = sum(part["count"] for part in parts)
+    energy_kwh = float(sum(part["energy_kwh"] for part in parts))
+    covered_hours = float(sum(part["covered_hours"] for part in parts))
+    if count:
+        sample_mean = sum(part["value_sum"] for part in parts) / count
+        squares = sum(part["value_squares"] for part in parts)
+        std = float(np.sqrt(max(squares / count - sample_mean * sample_mean, 0.0)))
+        minimum = float(np.nanmin([part["min_w"] for part in parts if part["count"]]))
+        maximum = float(np.nanmax([part["max_w"] for part in parts if part["count"]]))
+    else:
+        sample_mean = std = minimum = maximum = float("nan")
+    return {
+        "count": count,
+        "energy_kwh": energy_kwh,
+        "covered_hours": covered_hours,
+        "mean_w": energy_kwh * 1000 / covered_hours if covered_hours > 0 else sample_mean,
+        "sample_mean_w": float(sample_mean),
+        "std_w": std,
+        "min_w": minimum,
+        "max_w": maximum
+    }
+
+class StoredSeriesIndex:
+    """
+    Bereichsabfragen über die Stundenzeilen des RollupStore (Schnittstelle wie TimeSeriesIndex.stats)
+
+    Die vollen Stunden eines Zeitraums, die der Store bereits abgeschlossen enthält, kosten eine
+    SQL-Abfrage über höchstens 8.760 Zeilen pro Jahr. Angebrochene Randstunden sowie Zeiten vor
+    bzw. nach den gespeicherten Daten kommen aus dem fallback (z.B. TimeSeriesIndex der
+    geladenen Daten), sodass jeder Zeitraum exakt ausgewertet wird.
+    """
+
+    def __init__(self, store, entity_id, fallback=None):
+        self.store = store
+        self.entity_id = entity_id
+        self.fallback = fallback
+        coverage = store.coverage(entity_id)
+        # Die Stunde des letzten Messwerts ist noch offen (er wird erst mit dem nächsten gehalten)
+        self._stored = ((coverage[0].value + HOUR_NS - 1) // HOUR_NS * HOUR_NS,
+                        coverage[1].value // HOUR_NS * HOUR_NS) if coverage else None
+
+    def _to_ns(self, value):
+        # Zeitzonenlose Grenzen wie der fallback interpretieren, damit beide Pfade übereinstimmen
+        if self.fallback is not None and self.fallback.integrator.tz is not None:
+            return int(self.fallback.integrator.to_ns(value))
+        return _to_ns(value)
+
+    def _fallback_sums(self, start_ns, end_ns):
+        if self.fallback is None:
+            raise ValueError("Zeitraum nicht vollständig im Rollup-Store und kein Rohdaten-Index vorhanden")
+        to_time = lambda ns: pd.Timestamp(ns, tz="UTC")
+        return _sums_from_stats(self.fallback.stats(to_time(start_ns), to_time(end_ns)))
+
+    def stats(self, start_time, end_time):
+        start_ns, end_ns = self._to_ns(start_time), self._to_ns(end_time)
+        lower = (start_ns + HOUR_NS - 1) // HOUR_NS * HOUR_NS
+        upper = end_ns // HOUR_NS * HOUR_NS
+        if self._stored is not None:
+            lower, upper = max(lower, self._stored[0]), min(upper, self._stored[1])
+        if self._stored is None or lower >= upper:
+            return _stats_from_sums([self._fallback_sums(start_ns, end_ns)])
+
+        parts = [self.store.hour_sums(self.entity_id, lower, upper)]
+        if start_ns < lower:
+            parts.append(self._fallback_sums(start_ns, lower))
+        if upper < end_ns:
+            parts.append(self._fallback_sums(upper, end_ns))
+        return _stats_from_sums(parts)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_rollup_store():
+    """
+    Gibt den prozessweiten Rollup-Store zurück oder None, wenn er deaktiviert ist
+    """
+    global _store
+    store_config = CONFIG["rollup_store"]
+    if not store_config["enabled"]:
+        return None
+
+    with _store_lock:
+        if _store is None or _store.path != store_config["path"]:
+            _store = RollupStore(store_config["path"])
+        return _store
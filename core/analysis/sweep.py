@@ -0,0 +1,223 @@
+"""
+Parallele Szenario-Läufe (Tarife, Speichergrößen, Annahmen) über gemeinsamen Eingangsreihen
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from core.analysis.battery import simulate_batteries
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Ausrichtung der Arrays im gemeinsamen Speicherblock in Bytes
+_ALIGNMENT = 64
+
+# Im Worker-Prozess einmal eingebundene Eingangsreihen
+_worker_memory = None
+_worker_arrays = None
+
+class SharedArrays:
+    """
+    Legt mehrere NumPy-Arrays einmalig in einen gemeinsamen Speicherblock
+
+    Worker-Prozesse binden den Block über das kleine, picklebare Layout ein und lesen die
+    Arrays ohne Kopie. Als Kontextmanager wird der Block am Ende freigegeben.
+
+    Args:
+        arrays (dict): Name -> ndarray
+    """
+
+    def __init__(self, arrays):
+        layout = []
+        offset = 0
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            layout.append((name, values.dtype.str, values.shape, offset))
+            offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        self.memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.layout = layout
+        self.arrays = _attach_arrays(self.memory, layout)
+        for name, values in arrays.items():
+            self.arrays[name][...] = values
+
+    @property
+    def descriptor(self):
+        """
+        Picklebare Beschreibung (Blockname, Layout) zum Einbinden in anderen Prozessen
+        """
+        return self.memory.name, self.layout
+
+    def close(self):
+        """
+        Gibt den Speicherblock frei
+        """
+        self.arrays = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _attach_arrays(memory, layout):
+    """
+    Sichten auf die Arrays im Speicherblock (schreibgeschützt außer beim Anlegen)
+    """
+    return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+def _init_worker(descriptor):
+    """
+    Bindet den gemeinsamen Speicherblock einmal pro Worker-Prozess ein
+    """
+    global _worker_memory, _worker_arrays
+    name, layout = descriptor
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_arrays = _attach_arrays(_worker_memory, layout)
+    for values in _worker_arrays.values():
+        values.flags.writeable = False
+
+def _run_batch(evaluate, batch):
+    """
+    Bewertet eine Gruppe von Szenarien im Worker und misst die Laufzeit
+    """
+    started = time.perf_counter()
+    metrics = evaluate(_worker_arrays, [scenario for _, scenario in batch])
+    seconds = (time.perf_counter() - started) / max(len(batch), 1)
+    return [(position, {**metric, "seconds": seconds}) for (position, _), metric in zip(batch, metrics)]
+
+def evaluate_tariffs(arrays, scenarios):
+    """
+    Kosten des Netzbezugs ohne Speicher für Tarifvarianten
+
+    Szenario-Schlüssel: flat_price (€/kWh, None = dynamisch nach 'price'), markup_eur_kwh
+    (Aufschlag auf den dynamischen Preis), feed_in_tariff (€/kWh)
+
+    Args:
+        arrays (dict): net_kwh und price (siehe prepare_battery_inputs)
+        scenarios (list): Szenarien als dicts
+
+    Returns:
+        list: dict je Szenario mit grid_import_kwh und cost_eur
+    """
+    imported = np.maximum(arrays["net_kwh"], 0.0)
+    exported = np.maximum(-arrays["net_kwh"], 0.0).sum()
+    import_kwh = imported.sum()
+    dynamic_cost = imported @ arrays["price"]
+    results = []
+    for scenario in scenarios:
+        flat_price = scenario.get("flat_price")
+        if flat_price is not None:
+            cost = import_kwh * flat_price
+        else:
+            cost = dynamic_cost + import_kwh * scenario.get("markup_eur_kwh", 0.0)
+        cost -= exported * scenario.get("feed_in_tariff", 0.0)
+        results.append({"grid_import_kwh": float(import_kwh), "cost_eur": float(cost)})
+    return results
+
+def evaluate_batteries(arrays, scenarios):
+    """
+    Speicherkonfigurationen mit dynamischem Tarif (siehe simulate_batteries)
+
+    Szenarien mit gleichem Aufschlag und gleicher Einspeisevergütung werden in einem
+    gemeinsamen Simulationslauf gerechnet.
+
+    Szenario-Schlüssel: Speicherparameter wie DEFAULT_BATTERY, markup_eur_kwh, feed_in_tariff
+
+    Returns:
+        list: dict je Szenario mit grid_import_kwh, grid_export_kwh, cycles, cost_eur, savings_eur
+    """
+    groups = {}
+    for position, scenario in enumerate(scenarios):
+        key = (scenario.get("markup_eur_kwh", 0.0), scenario.get("feed_in_tariff", 0.0))
+        groups.setdefault(key, []).append(position)
+
+    results = [None] * len(scenarios)
+    for (markup, feed_in), positions in groups.items():
+        inputs = {"net_kwh": arrays["net_kwh"], "hours": arrays["hours"], "price": arrays["price"] + markup}
+        configurations = [{key: value for key, value in scenarios[position].items()
+                           if key not in ("markup_eur_kwh", "feed_in_tariff")} for position in positions]
+        table = simulate_batteries(inputs, configurations, feed_in_tariff=feed_in)
+        columns = ["grid_import_kwh", "grid_export_kwh", "cycles", "cost_eur", "savings_eur"]
+        for position, row in zip(positions, table[columns].to_dict("records")):
+            results[position] = row
+    return results
+
+def _log_progress(done, total, elapsed):
+    """
+    Standard-Fortschrittsanzeige: etwa alle 10% eine Logzeile
+    """
+    step = max(total // 10, 1)
+    if done == total or done % step == 0:
+        rate = done / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Szenarien: {done}/{total} ({rate:.1f}/s)")
+
+def run_sweep(arrays, scenarios, evaluate=evaluate_batteries, max_workers=None, batch_size=None, progress=None):
+    """
+    Bewertet viele Szenarien parallel über denselben Eingangsreihen
+
+    Die Arrays werden einmal in gemeinsamen Speicher gelegt; pro Aufgabe werden nur die
+    Szenario-Parameter übertragen. Die Bewertungsfunktion muss auf Modulebene definiert sein
+    (picklebar) und erhält (arrays, Liste von Szenarien) und liefert je Szenario ein dict.
+
+    Args:
+        arrays (dict): Name -> ndarray, z.B. Ergebnis von prepare_battery_inputs
+        scenarios (list): Szenarien als dicts
+        evaluate (callable): Bewertungsfunktion (Standard: evaluate_batteries)
+        max_workers (int): Anzahl Prozesse (Standard: alle Kerne; 1 = ohne Prozesspool)
+        batch_size (int): Szenarien pro Aufgabe (Standard: etwa vier Aufgaben pro Prozess)
+        progress (callable): Aufruf mit (erledigt, gesamt, Sekunden) nach jeder Aufgabe
+
+    Returns:
+        DataFrame: Eine Zeile je Szenario mit den Parametern, den Kennzahlen und 'seconds'
+                   (Rechenzeit pro Szenario) in der Reihenfolge der Szenarien
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if progress is None:
+        progress = _log_progress
+    if batch_size is None:
+        batch_size = max(-(-len(scenarios) // (max_workers * 4)), 1)
+    numbered = list(enumerate(scenarios))
+    batches = [numbered[start:start + batch_size] for start in range(0, len(numbered), batch_size)]
+
+    started = time.perf_counter()
+    rows = [None] * len(scenarios)
+    done = 0
+    if max_workers == 1:
+        global _worker_arrays
+        previous, _worker_arrays = _worker_arrays, arrays
+        try:
+            for batch in batches:
+                for position, metric in _run_batch(evaluate, batch):
+                    rows[position] = metric
+                done += len(batch)
+                progress(done, len(scenarios), time.perf_counter() - started)
+        finally:
+            _worker_arrays = previous
+    else:
+        with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(shared.descriptor,)) as pool:
+            futures = {pool.submit(_run_batch, evaluate, batch): len(batch) for batch in batches}
+            for future in as_completed(futures):
+                for position, metric in future.result():
+                    rows[position] = metric
+                done += futures[future]
+                progress(done, len(scenarios), time.perf_counter() - started)
+
+    elapsed = time.perf_counter() - started
+    samples = max((len(values) for values in arrays.values()), default=0)
+    rate = len(scenarios) / elapsed if elapsed > 0 else 0.0
+    logger.info(f"Szenario-Lauf: {len(scenarios)} Szenarien in {elapsed:.2f}s mit {max_workers} Prozessen "
+                f"({rate:.1f} Szenarien/s, {rate * samples / 1e6:.1f} Mio. Intervalle/s)")
+
+    parameters = pd.DataFrame(scenarios).reset_index(drop=True)
+    return pd.concat([parameters, pd.DataFrame(rows)], axis=1)
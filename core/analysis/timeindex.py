@@ -0,0 +1,163 @@
+"""
+Zeitindex mit Präfixsummen für Bereichsabfragen in O(log n)
+"""
+
+import logging
+import numpy as np
+from core.analysis.energy import EnergyIntegrator
+from core.data.timeseries import series_arrays
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+class _BlockSparseTable:
+    """
+    Sparse Table über Blöcken fester Größe für Minimum bzw. Maximum beliebiger Indexbereiche
+
+    Eine Sparse Table über alle Werte bräuchte n·log(n) Speicher (bei einem Jahr 10-Sekunden-
+    Daten mehrere hundert MB). Über Blöcken ist sie um den Faktor block kleiner; die beiden
+    angeschnittenen Randblöcke werden pro Abfrage direkt ausgewertet.
+    """
+
+    def __init__(self, values, op, fill, block=64):
+        self.op = op
+        self.fill = fill
+        self.block = block
+        self.values = np.where(np.isnan(values), fill, values)
+
+        padded_length = -(-len(self.values) // block) * block
+        padded = np.full(padded_length, fill)
+        padded[:len(self.values)] = self.values
+        levels = [op.reduce(padded.reshape(-1, block), axis=1)]
+        width = 1
+        while 2 * width <= len(levels[0]):
+            previous = levels[-1]
+            levels.append(op(previous[:-width], previous[width:]))
+            width *= 2
+        self.levels = levels
+
+    def query(self, lower, upper):
+        """
+        Ergebnis über values[lower:upper] (nicht leer) oder NaN, wenn dort nur NaN-Werte liegen
+        """
+        block = self.block
+        first_block = lower // block
+        last_block = (upper - 1) // block
+        if first_block == last_block:
+            result = self.op.reduce(self.values[lower:upper])
+        else:
+            result = self.op(self.op.reduce(self.values[lower:(first_block + 1) * block]),
+                             self.op.reduce(self.values[last_block * block:upper]))
+            full = last_block - first_block - 1
+            if full > 0:
+                level = full.bit_length() - 1
+                table = self.levels[level]
+                result = self.op(result, self.op(table[first_block + 1], table[last_block - (1 << level)]))
+        return float("nan") if result == self.fill else float(result)
+
+class TimeSeriesIndex:
+    """
+    Einmal pro geladener Zeitreihe aufgebauter Index für beliebige Zeiträume [start, end)
+
+    Hält die sortierten Epoch-Zeitstempel sowie kumulierte Anzahl, Summe und Quadratsumme der
+    Messwerte. Energie und abgedeckte Zeit kommen aus dem EnergyIntegrator (Werte werden gehalten),
+    Minimum und Maximum aus einer Sparse Table. Jede Abfrage braucht damit nur zwei Binärsuchen
+    statt einer Maske über das gesamte DataFrame.
+
+    Args:
+        data (DataFrame/Series/TimeSeries): Leistungswerte in W mit Zeitindex
+        column (str): Spalte mit den Leistungswerten (bei DataFrames)
+        integrator (EnergyIntegrator): Bereits berechnete kumulierte Energie der Daten
+        extremes (tuple): (Minimum, Maximum) je Bucket mit den Zeitpunkten von data (siehe
+                          bucket_extremes); ohne Angabe sind die Messwerte selbst die Extremwerte
+    """
+
+    def __init__(self, data, column="value", integrator=None, extremes=None):
+        _, values, _ = series_arrays(data, column)
+        self.integrator = integrator if integrator is not None else EnergyIntegrator(data, column)
+        self.times = self.integrator.times
+
+        valid = ~np.isnan(values)
+        clean = np.where(valid, values, 0.0)
+        self.cumulative_count = np.concatenate(([0], np.cumsum(valid)))
+        self.cumulative_sum = np.concatenate(([0.0], np.cumsum(clean)))
+        self.cumulative_squares = np.concatenate(([0.0], np.cumsum(clean * clean)))
+
+        minimum, maximum = (values, values) if extremes is None else (series_arrays(part)[1] for part in extremes)
+        self._min = _BlockSparseTable(minimum, np.minimum, np.inf)
+        self._max = _BlockSparseTable(maximum, np.maximum, -np.inf)
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self, start_time, end_time):
+        """
+        Positionen der Messwerte im Zeitraum [start_time, end_time)
+
+        Returns:
+            tuple: (lower, upper) mit values[lower:upper] im Zeitraum
+        """
+        start_ns, end_ns = self.integrator.to_ns([start_time, end_time])
+        return (int(np.searchsorted(self.times, start_ns, side="left")),
+                int(np.searchsorted(self.times, end_ns, side="left")))
+
+    def count(self, start_time, end_time):
+        """
+        Anzahl gültiger Messwerte im Zeitraum
+        """
+        lower, upper = self.bounds(start_time, end_time)
+        return int(self.cumulative_count[upper] - self.cumulative_count[lower])
+
+    def energy_kwh(self, start_time, end_time):
+        """
+        Zeitgewichtete Energie in kWh im Zeitraum
+        """
+        return self.integrator.energy_between(start_time, end_time)
+
+    def min(self, start_time, end_time):
+        """
+        Kleinster Messwert im Zeitraum (NaN ohne Messwerte)
+        """
+        lower, upper = self.bounds(start_time, end_time)
+        return self._min.query(lower, upper) if upper > lower else float("nan")
+
+    def max(self, start_time, end_time):
+        """
+        Größter Messwert im Zeitraum (NaN ohne Messwerte)
+        """
+        lower, upper = self.bounds(start_time, end_time)
+        return self._max.query(lower, upper) if upper > lower else float("nan")
+
+    def stats(self, start_time, end_time):
+        """
+        Alle Kennzahlen eines Zeitraums mit einer einzigen Positionsbestimmung
+
+        Returns:
+            dict: count, energy_kwh, covered_hours, mean_w (zeitgewichtet), sample_mean_w, std_w,
+                  min_w, max_w; bei count == 0 sind die Leistungswerte NaN
+        """
+        lower, upper = self.bounds(start_time, end_time)
+        count = int(self.cumulative_count[upper] - self.cumulative_count[lower])
+        energy_kwh = self.integrator.energy_between(start_time, end_time)
+        covered_hours = self.integrator.covered_hours_between(start_time, end_time)
+
+        if count:
+            total = self.cumulative_sum[upper] - self.cumulative_sum[lower]
+            squares = self.cumulative_squares[upper] - self.cumulative_squares[lower]
+            sample_mean = total / count
+            std = float(np.sqrt(max(squares / count - sample_mean * sample_mean, 0.0)))
+            minimum = self._min.query(lower, upper)
+            maximum = self._max.query(lower, upper)
+        else:
+            sample_mean = std = minimum = maximum = float("nan")
+
+        return {
+            "count": count,
+            "energy_kwh": energy_kwh,
+            "covered_hours": covered_hours,
+            "mean_w": energy_kwh * 1000 / covered_hours if covered_hours > 0 else sample_mean,
+            "sample_mean_w": float(sample_mean),
+            "std_w": std,
+            "min_w": minimum,
+            "max_w": maximum
+        }
@@ -14,6 +14,30 @@ CONFIG = {
     "analysis_period": os.getenv("ANALYSIS_PERIOD", "30d"),  # Standard-Analysezeitraum
     "timezone": os.getenv("TIMEZONE", "Europe/Berlin"),
     "data_scaling_factor": float(os.getenv("DATA_SCALING_FACTOR", "1.0")),  # Skalierungsfaktor für Rohdaten (1.0 = W, 0.001 = kW, 1000 = Wh zu W)
+    "max_gap_minutes": float(os.getenv("ENERGY_MAX_GAP_MINUTES", "60")),  # Max. Haltedauer eines Messwerts bei der Energieberechnung
+    "realtime_windows_minutes": [int(value) for value in os.getenv("REALTIME_WINDOWS_MINUTES", "5,15,60,1440").split(",")],  # Gleitende Fenster der Echtzeit-Analyse
+    "cache": {
+        "enabled": os.getenv("CACHE_ENABLED", "true").lower() == "true",
+        "directory": os.getenv("CACHE_DIR", "./data/cache"),  # Lokaler Parquet-Cache für abgeschlossene Tage
+        "max_size_mb": float(os.getenv("CACHE_MAX_SIZE_MB", "500")),  # Größenlimit, darüber werden alte Tage entfernt
+        "settle_minutes": float(os.getenv("CACHE_SETTLE_MINUTES", "15")),  # Wartezeit, bis ein Tag als abgeschlossen gilt
+        "memo_enabled": os.getenv("CACHE_MEMO_ENABLED", "true").lower() == "true",
+        "memo_bucket_minutes": int(os.getenv("CACHE_MEMO_BUCKET_MINUTES", "60")),  # Ausgerichtete Zeitfenster im Arbeitsspeicher
+        "memo_max_size_mb": float(os.getenv("CACHE_MEMO_MAX_SIZE_MB", "200")),  # Größenlimit, darüber werden alte Fenster entfernt
+        "tail_ttl_seconds": float(os.getenv("CACHE_TAIL_TTL_SECONDS", "30"))  # Gültigkeit des offenen Endstücks
+    },
+    "rollup_store": {
+        "enabled": os.getenv("ROLLUP_STORE_ENABLED", "true").lower() == "true",
+        "path": os.getenv("ROLLUP_STORE_PATH", "./data/rollups.sqlite")  # Stunden- und Tagesaggregate (SQLite)
+    },
+    "local_store": {
+        "enabled": os.getenv("LOCAL_STORE_ENABLED", "false").lower() == "true",  # Web-App liest nur die lokale Kopie
+        "path": os.getenv("LOCAL_STORE_PATH", "./data/points.sqlite"),  # Vom Ingest-Worker gespiegelte Messwerte
+        "poll_seconds": float(os.getenv("INGEST_POLL_SECONDS", "10")),  # Abfrageintervall des Ingest-Workers
+        "backfill_days": float(os.getenv("INGEST_BACKFILL_DAYS", "30")),  # Erstbefüllung ohne lokale Daten
+        "batch_size": int(os.getenv("INGEST_BATCH_SIZE", "50000")),  # Max. Messwerte pro Abfrage beim Nachholen
+        "max_backoff_seconds": float(os.getenv("INGEST_MAX_BACKOFF_SECONDS", "300"))  # Obergrenze der Wartezeit nach Fehlern
+    },
     "data_sources": {
         "influxdb": {
             "enabled": os.getenv("INFLUXDB_ENABLED", "true").lower() == "true",
@@ -23,6 +47,12 @@ CONFIG = {
             "bucket": os.getenv("INFLUXDB_BUCKET", "homeassistant"),
             "measurement": os.getenv("INFLUXDB_MEASUREMENT", "W"),
             "entity_id": os.getenv("INFLUXDB_ENTITY_ID", "senec_house_power"),
+            "pool_size": int(os.getenv("INFLUXDB_POOL_SIZE", "10")),  # Max. gehaltene Keep-Alive Verbindungen pro Client
+            "max_points_per_series": int(os.getenv("INFLUXDB_MAX_POINTS", "5000")),  # Punktbudget für automatisches Downsampling
+            "timeout": float(os.getenv("INFLUXDB_TIMEOUT", "10")),  # Timeout pro Query in Sekunden
+            "chunk_hours": float(os.getenv("INFLUXDB_CHUNK_HOURS", "24")),  # Länge eines parallel abgefragten Abschnitts
+            "max_workers": int(os.getenv("INFLUXDB_MAX_WORKERS", "4")),  # Max. parallele Abschnittsabfragen
+            "chunk_retries": int(os.getenv("INFLUXDB_CHUNK_RETRIES", "2")),  # Wiederholungen pro fehlgeschlagenem Abschnitt
             "entity_ids": {
                 "house_power": os.getenv("INFLUXDB_ENTITY_HOUSE_POWER", "senec_house_power"),
                 "solar_generated": os.getenv("INFLUXDB_ENTITY_SOLAR_GENERATED", "senec_solar_generated_power"),
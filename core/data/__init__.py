@@ -2,21 +2,39 @@
 Datenzugriffsmodule
 """
 
-from .influxdb import get_influxdb_client, fetch_senec_house_power_data
+from .clients import get_client_registry
+from .influxdb import get_influxdb_client, fetch_senec_house_power_data, fetch_senec_entities
 from .influxdb_v1 import (get_influxdb_v1_client, fetch_senec_house_power_data_v1,
                           fetch_senec_solar_generated_power_v1,
                           fetch_senec_battery_power_v1,
-                          fetch_senec_grid_power_v1)
+                          fetch_senec_grid_power_v1,
+                          fetch_senec_entities_v1, get_entity_series)
+from .influxdb_async import fetch_all_async, fetch_dashboard_data
 from .providers import generate_sample_tariff_data, fetch_real_tariff_data
+from .timeseries import TimeSeries, to_timeseries, bucket_extremes, as_frame
+from .local_store import LocalStore, get_local_store, fetch_local_dashboard_data
 
 __all__ = [
+    'get_client_registry',
     'get_influxdb_client',
     'fetch_senec_house_power_data',
+    'fetch_senec_entities',
     'get_influxdb_v1_client',
     'fetch_senec_house_power_data_v1',
     'fetch_senec_solar_generated_power_v1',
     'fetch_senec_battery_power_v1',
     'fetch_senec_grid_power_v1',
+    'fetch_senec_entities_v1',
+    'get_entity_series',
+    'fetch_all_async',
+    'fetch_dashboard_data',
     'generate_sample_tariff_data',
-    'fetch_real_tariff_data'
+    'fetch_real_tariff_data',
+    'TimeSeries',
+    'to_timeseries',
+    'bucket_extremes',
+    'as_frame',
+    'LocalStore',
+    'get_local_store',
+    'fetch_local_dashboard_data'
 ]
\ No newline at end of file
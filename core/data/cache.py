@@ -0,0 +1,302 @@
+"""
+Lokaler Parquet-Cache für historische Zeitreihen
+Abgeschlossene Tage ändern sich nicht mehr und werden pro Entität und Tag auf der Festplatte abgelegt
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+from core.config import CONFIG
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+DAY = pd.Timedelta(days=1)
+MANIFEST_FILE = "manifest.json"
+
+def to_utc(value):
+    """
+    Konvertiert einen Zeitpunkt in einen UTC Timestamp (naive Werte gelten wie in den Queries als UTC)
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+def _safe_name(name):
+    """
+    Macht einen Namen als Verzeichnisnamen verwendbar
+    """
+    return str(name).replace(os.sep, "_").replace("/", "_")
+
+class SeriesCache:
+    """
+    Cache für Zeitreihen, partitioniert nach Namespace, Auflösung, Entität und Tag (UTC)
+
+    Ein Manifest hält fest, welche Tage vollständig abgedeckt sind. Nur abgeschlossene Tage
+    werden gespeichert; der noch offene Tag wird immer aus InfluxDB gelesen. Überschreitet der
+    Cache seine Maximalgröße, werden die am längsten nicht genutzten Tage entfernt. Lesezugriffe
+    schreiben das Manifest nicht; ihre Zugriffszeiten werden mit dem nächsten Schreiben gesichert.
+    """
+
+    def __init__(self, directory, max_size_mb=500, settle_minutes=15):
+        self.directory = directory
+        self.max_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self.settle = pd.Timedelta(minutes=float(settle_minutes))
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+
+    # --- Manifest -----------------------------------------------------------------
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Cache-Manifest unlesbar, starte mit leerem Cache: {e}")
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self._manifest}, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _key(self, namespace, resolution_key, entity_id, day):
+        return "/".join([_safe_name(namespace), _safe_name(resolution_key), _safe_name(entity_id), day.strftime("%Y-%m-%d")])
+
+    def _path(self, key):
+        return os.path.join(self.directory, *key.split("/")) + ".parquet"
+
+    # --- Abdeckung ----------------------------------------------------------------
+
+    def _closed_before(self):
+        """
+        Tage, die vor diesem Zeitpunkt enden, gelten als abgeschlossen
+        """
+        return pd.Timestamp.now(tz="UTC") - self.settle
+
+    def lookup(self, namespace, entity_ids, resolution_key, start_time, end_time):
+        """
+        Ermittelt gecachte Daten und fehlende Zeitbereiche
+
+        Args:
+            namespace (str): Datenquelle, z.B. 'senec' oder 'epex'
+            entity_ids (list): Entity IDs
+            resolution_key (str): Auflösung, z.B. 'raw' oder '300s'
+            start_time (datetime): Startzeitpunkt
+            end_time (datetime): Endzeitpunkt
+
+        Returns:
+            tuple: (DataFrame mit Spalten (entity_id, Feld) oder None,
+                    Liste fehlender (start, end) Bereiche, die aus InfluxDB geladen werden müssen)
+        """
+        start = to_utc(start_time)
+        end = to_utc(end_time)
+        closed_before = self._closed_before()
+
+        covered_days = []
+        missing = []
+        day = start.floor("D")
+        while day <= end:
+            day_end = day + DAY
+            closed = day_end <= closed_before
+            with self._lock:
+                covered = closed and all(
+                    self._key(namespace, resolution_key, entity_id, day) in self._manifest for entity_id in entity_ids
+                )
+            if covered:
+                covered_days.append(day)
+            elif closed:
+                # Fehlende abgeschlossene Tage vollständig laden, damit sie gespeichert werden können
+                self._append_range(missing, day, day_end)
+            else:
+                # Offener Tag: nur den angefragten Teil laden
+                self._append_range(missing, max(day, start), end)
+                break
+            day = day_end
+
+        cached = self._read_days(namespace, entity_ids, resolution_key, covered_days)
+        return cached, missing
+
+    @staticmethod
+    def _append_range(ranges, range_start, range_end):
+        if ranges and ranges[-1][1] >= range_start:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], range_end))
+        else:
+            ranges.append((range_start, range_end))
+
+    def _read_days(self, namespace, entity_ids, resolution_key, days):
+        if not days:
+            return None
+
+        frames = {}
+        now = time.time()
+        with self._lock:
+            for entity_id in entity_ids:
+                parts = []
+                for day in days:
+                    key = self._key(namespace, resolution_key, entity_id, day)
+                    entry = self._manifest[key]
+                    entry["last_access"] = now
+                    if entry["rows"] > 0:
+                        parts.append(pd.read_parquet(self._path(key)))
+                if parts:
+                    frames[entity_id] = pd.concat(parts) if len(parts) > 1 else parts[0]
+            # Zugriffszeiten nur im Arbeitsspeicher; gespeichert wird erst beim nächsten store()
+
+        if not frames:
+            return None
+        wide = pd.concat(frames, axis=1).sort_index()
+        wide.index.name = "time"
+        return wide
+
+    # --- Schreiben ----------------------------------------------------------------
+
+    def store(self, namespace, entity_ids, resolution_key, frame, ranges):
+        """
+        Speichert alle abgeschlossenen Tage, die vollständig in den geladenen Bereichen liegen
+
+        Args:
+            namespace (str): Datenquelle
+            entity_ids (list): Angefragte Entity IDs (auch ohne Daten als abgedeckt markiert)
+            resolution_key (str): Auflösung
+            frame (DataFrame): Geladene Daten mit Spalten (entity_id, Feld) oder None
+            ranges (list): Geladene (start, end) Bereiche
+        """
+        closed_before = self._closed_before()
+        written = 0
+        with self._lock:
+            for range_start, range_end in ranges:
+                range_start = to_utc(range_start)
+                range_end = to_utc(range_end)
+                day = range_start.ceil("D")
+                while day + DAY <= min(range_end, closed_before):
+                    for entity_id in entity_ids:
+                        self._write_day(namespace, resolution_key, entity_id, day, frame)
+                        written += 1
+                    day += DAY
+            if written:
+                self._evict()
+                self._save_manifest()
+
+    def _write_day(self, namespace, resolution_key, entity_id, day, frame):
+        key = self._key(namespace, resolution_key, entity_id, day)
+        rows = 0
+        size = 0
+        if frame is not None and entity_id in frame.columns.get_level_values(0):
+            day_data = frame[entity_id]
+            day_data = day_data[(day_data.index >= day) & (day_data.index < day + DAY)].dropna(how="all")
+            rows = len(day_data)
+            if rows:
+                path = self._path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                day_data.to_parquet(path)
+                size = os.path.getsize(path)
+        self._manifest[key] = {"rows": rows, "bytes": size, "last_access": time.time()}
+
+    def _evict(self):
+        """
+        Entfernt die am längsten nicht genutzten Tage, bis der Cache wieder unter der Maximalgröße liegt
+        """
+        total = sum(entry["bytes"] for entry in self._manifest.values())
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        removed = 0
+        for key, entry in sorted(self._manifest.items(), key=lambda item: item[1]["last_access"]):
+            if total <= target:
+                break
+            if entry["rows"] > 0:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            total -= entry["bytes"]
+            del self._manifest[key]
+            removed += 1
+        logger.info(f"Cache bereinigt: {removed} Tage entfernt, Größe jetzt {total / 1024 / 1024:.1f} MB")
+
+    # --- Komfort ------------------------------------------------------------------
+
+    def fetch(self, namespace, entity_ids, resolution_key, start_time, end_time, fetch_range, align_seconds=None):
+        """
+        Liefert Daten aus dem Cache und lädt nur fehlende bzw. offene Bereiche nach
+
+        Args:
+            fetch_range (callable): Funktion (start, end) -> DataFrame mit Spalten (entity_id, Feld) oder None
+            align_seconds (int): Bucket-Größe; der Start wird auf den Bucket-Anfang abgerundet
+
+        Returns:
+            DataFrame: Daten im angefragten Zeitraum oder None ohne Daten
+        """
+        cached, missing = self.lookup(namespace, entity_ids, resolution_key, start_time, end_time)
+        frames = [cached] if cached is not None else []
+        for range_start, range_end in missing:
+            fetched = fetch_range(range_start, range_end)
+            self.store(namespace, entity_ids, resolution_key, fetched, [(range_start, range_end)])
+            if fetched is not None:
+                frames.append(fetched)
+
+        logger.debug(f"Cache {namespace}/{resolution_key}: {len(missing)} Bereiche aus InfluxDB geladen")
+        return assemble_frames(frames, start_time, end_time, align_seconds)
+
+    def size_bytes(self):
+        """
+        Gesamtgröße aller gecachten Dateien in Bytes
+        """
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._manifest.values())
+
+def assemble_frames(frames, start_time, end_time, align_seconds=None):
+    """
+    Setzt Teilergebnisse zeitlich sortiert und ohne Duplikate zusammen und schneidet auf den Zeitraum zu
+
+    Returns:
+        DataFrame: Zusammengesetzte Daten oder None ohne Daten
+    """
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return None
+
+    result = pd.concat(frames).sort_index() if len(frames) > 1 else frames[0]
+    result = result[~result.index.duplicated(keep="first")]
+
+    start = to_utc(start_time)
+    if align_seconds:
+        # InfluxDB liefert den angeschnittenen ersten Bucket mit seinem Bucket-Anfang
+        start = start.floor(pd.Timedelta(seconds=align_seconds))
+    index = result.index if result.index.tz is not None else result.index.tz_localize("UTC")
+    result = result[(index >= start) & (index <= to_utc(end_time))]
+    return result if not result.empty else None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_series_cache():
+    """
+    Gibt den prozessweiten Zeitreihen-Cache zurück oder None, wenn er deaktiviert ist
+    """
+    global _cache
+    cache_config = CONFIG["cache"]
+    if not cache_config["enabled"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None or _cache.directory != cache_config["directory"]:
+            _cache = SeriesCache(
+                cache_config["directory"],
+                max_size_mb=cache_config["max_size_mb"],
+                settle_minutes=cache_config["settle_minutes"]
+            )
+        return _cache
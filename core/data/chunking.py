@@ -0,0 +1,169 @@
+"""
+Paralleler, in Zeitabschnitte aufgeteilter Datenabruf für lange Analysezeiträume
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from core.config import CONFIG
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+def _to_timestamp(value):
+    """
+    Konvertiert einen Zeitpunkt in einen pandas Timestamp (zeitzonenbehaftete Werte in UTC)
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert("UTC")
+    return timestamp
+
+def split_time_range(start_time, end_time, chunk_seconds):
+    """
+    Teilt einen Zeitraum in aufeinanderfolgende Abschnitte fester Länge
+
+    Die inneren Grenzen liegen auf Vielfachen der Abschnittslänge (bezogen auf UTC),
+    damit sie mit den Zeit-Buckets von InfluxDB übereinstimmen.
+
+    Args:
+        start_time (datetime): Startzeitpunkt
+        end_time (datetime): Endzeitpunkt
+        chunk_seconds (int): Länge eines Abschnitts in Sekunden
+
+    Returns:
+        list: Liste von (start, end) Tupeln in zeitlicher Reihenfolge
+    """
+    start = _to_timestamp(start_time)
+    end = _to_timestamp(end_time)
+    if end <= start:
+        return [(start, end)]
+
+    step = pd.Timedelta(seconds=chunk_seconds)
+    chunks = []
+    chunk_start = start
+    boundary = start.floor(step) + step
+    while boundary < end:
+        chunks.append((chunk_start, boundary))
+        chunk_start = boundary
+        boundary += step
+    chunks.append((chunk_start, end))
+    return chunks
+
+def _retry_delay(error, attempt, retries, chunk_start, chunk_end, label):
+    """
+    Protokolliert einen fehlgeschlagenen Abschnitt und bestimmt die Wartezeit (exponentieller Backoff)
+
+    Returns:
+        float: Sekunden bis zum nächsten Versuch oder None, wenn keine Versuche mehr übrig sind
+    """
+    if attempt >= retries:
+        logger.error(f"Abschnitt {chunk_start} bis {chunk_end} für {label} endgültig fehlgeschlagen: {error}")
+        return None
+    wait_seconds = 0.5 * (2 ** attempt)
+    logger.warning(f"Abschnitt {chunk_start} bis {chunk_end} für {label} fehlgeschlagen "
+                   f"(Versuch {attempt + 1}/{retries + 1}), neuer Versuch in {wait_seconds:.1f}s: {error}")
+    return wait_seconds
+
+def _fetch_with_retries(fetch_chunk, chunk_start, chunk_end, is_last, retries, label):
+    """
+    Ruft einen einzelnen Abschnitt ab und wiederholt nur diesen bei Fehlern
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fetch_chunk(chunk_start, chunk_end, is_last)
+        except Exception as e:
+            wait_seconds = _retry_delay(e, attempt, retries, chunk_start, chunk_end, label)
+            if wait_seconds is None:
+                raise
+            time.sleep(wait_seconds)
+
+async def _fetch_with_retries_async(fetch_chunk, chunk_start, chunk_end, is_last, retries, label):
+    """
+    Asynchrone Variante von _fetch_with_retries (fetch_chunk ist eine Coroutine-Funktion)
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await fetch_chunk(chunk_start, chunk_end, is_last)
+        except Exception as e:
+            wait_seconds = _retry_delay(e, attempt, retries, chunk_start, chunk_end, label)
+            if wait_seconds is None:
+                raise
+            await asyncio.sleep(wait_seconds)
+
+def plan_chunks(start_time, end_time, align_seconds=None):
+    """
+    Plant die Abschnitte für einen Zeitraum anhand von CONFIG (chunk_hours)
+
+    Args:
+        start_time (datetime): Startzeitpunkt
+        end_time (datetime): Endzeitpunkt
+        align_seconds (int): Optionale Bucket-Größe; die Abschnittslänge wird auf ein Vielfaches gerundet
+
+    Returns:
+        list: (start, end, is_last) Tupel; innere Abschnitte sind rechts offen [start, end),
+              nur der letzte Abschnitt enthält end
+    """
+    chunk_seconds = max(int(float(CONFIG["data_sources"]["influxdb"]["chunk_hours"]) * 3600), 1)
+    if align_seconds:
+        chunk_seconds = -(-chunk_seconds // align_seconds) * align_seconds
+    chunks = split_time_range(start_time, end_time, chunk_seconds)
+    return [(chunk_start, chunk_end, i == len(chunks) - 1) for i, (chunk_start, chunk_end) in enumerate(chunks)]
+
+def stitch_chunks(frames):
+    """
+    Setzt die Ergebnisse der Abschnitte in Reihenfolge und ohne doppelte Zeitpunkte zusammen
+
+    Returns:
+        DataFrame: Zusammengesetztes Ergebnis oder None ohne Daten
+    """
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return None
+
+    result = pd.concat(frames) if len(frames) > 1 else frames[0]
+    result = result.sort_index()
+    # Sicherheitsnetz gegen doppelte Zeitpunkte an Abschnittsgrenzen
+    return result[~result.index.duplicated(keep="first")]
+
+def fetch_in_chunks(fetch_chunk, start_time, end_time, align_seconds=None, label="Daten"):
+    """
+    Ruft einen Zeitraum in Abschnitten parallel ab und setzt die Ergebnisse wieder zusammen
+
+    Abschnittslänge, Parallelität und Wiederholungen kommen aus CONFIG
+    (chunk_hours, max_workers, chunk_retries).
+
+    Args:
+        fetch_chunk (callable): Funktion (start, end, is_last) -> DataFrame oder None.
+                                Innere Abschnitte sind rechts offen [start, end),
+                                nur der letzte Abschnitt enthält end (is_last=True).
+        start_time (datetime): Startzeitpunkt
+        end_time (datetime): Endzeitpunkt
+        align_seconds (int): Optionale Bucket-Größe; die Abschnittslänge wird auf ein Vielfaches gerundet
+        label (str): Bezeichnung für Log-Ausgaben
+
+    Returns:
+        DataFrame: Zeitlich sortiertes Ergebnis ohne doppelte Zeitpunkte oder None ohne Daten
+    """
+    influx_config = CONFIG["data_sources"]["influxdb"]
+    max_workers = max(int(influx_config["max_workers"]), 1)
+    retries = max(int(influx_config["chunk_retries"]), 0)
+
+    chunks = plan_chunks(start_time, end_time, align_seconds)
+
+    if len(chunks) == 1:
+        chunk_start, chunk_end, is_last = chunks[0]
+        frames = [_fetch_with_retries(fetch_chunk, chunk_start, chunk_end, is_last, retries, label)]
+    else:
+        logger.info(f"Rufe {label} in {len(chunks)} Abschnitten mit bis zu {max_workers} parallelen Abfragen ab")
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(_fetch_with_retries, fetch_chunk, chunk_start, chunk_end, is_last, retries, label)
+                for chunk_start, chunk_end, is_last in chunks
+            ]
+            # Ergebnisse in Abschnittsreihenfolge einsammeln
+            frames = [future.result() for future in futures]
+
+    return stitch_chunks(frames)
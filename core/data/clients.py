@@ -0,0 +1,178 @@
+"""
+Prozessweite Registry für InfluxDB Clients
+Hält die v1, v2 und async Clients samt Keep-Alive Verbindungspool über Streamlit-Reruns hinweg offen
+"""
+
+import logging
+import threading
+from urllib.parse import urlparse
+from influxdb import InfluxDBClient as InfluxDBClientV1
+from influxdb_client import InfluxDBClient
+from core.config import CONFIG
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+def _create_v1_client():
+    """
+    Erstellt einen InfluxDB v1 Client mit begrenztem Verbindungspool
+    """
+    influx_config = CONFIG["data_sources"]["influxdb"]
+
+    # Parse URL richtig
+    parsed_url = urlparse(influx_config["url"])
+    host = parsed_url.hostname
+    port = parsed_url.port if parsed_url.port else 8086
+
+    logger.info(f"Erstelle InfluxDB v1 Client für {host}:{port} (Pool: {influx_config['pool_size']})")
+
+    return InfluxDBClientV1(
+        host=host,
+        port=port,
+        username='',  # Standard für v1
+        password='',  # Standard für v1
+        database=influx_config["bucket"],  # Bucket = Database in v1
+        ssl=parsed_url.scheme == "https",
+        timeout=influx_config["timeout"],
+        pool_size=influx_config["pool_size"]
+    )
+
+def _create_v2_client():
+    """
+    Erstellt einen InfluxDB v2 Client (mit optionalem Token) mit begrenztem Verbindungspool
+    """
+    influx_config = CONFIG["data_sources"]["influxdb"]
+    kwargs = {
+        "url": influx_config["url"],
+        "org": influx_config["org"],
+        "connection_pool_maxsize": influx_config["pool_size"],
+        "timeout": int(influx_config["timeout"] * 1000)  # v2 Client erwartet Millisekunden
+    }
+    # Token-loser Zugriff für lokale InfluxDB Instanzen
+    if influx_config["token"]:
+        kwargs["token"] = influx_config["token"]
+
+    logger.info(f"Erstelle InfluxDB v2 Client für {influx_config['url']} (Pool: {influx_config['pool_size']})")
+    return InfluxDBClient(**kwargs)
+
+def _create_async_client():
+    """
+    Erstellt den asynchronen HTTP Client (httpx) mit eigener Event Loop
+    """
+    # Import erst hier: influxdb_async nutzt selbst die Registry
+    from core.data.influxdb_async import AsyncInfluxClient
+
+    influx_config = CONFIG["data_sources"]["influxdb"]
+    logger.info(f"Erstelle asynchronen InfluxDB Client für {influx_config['url']} (Pool: {influx_config['pool_size']})")
+    return AsyncInfluxClient()
+
+def _pool_counters(pools):
+    """
+    Summiert geöffnete Verbindungen und gesendete Requests über urllib3 Connection Pools
+    """
+    connections = 0
+    requests_sent = 0
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            connections += getattr(pool, "num_connections", 0)
+            requests_sent += getattr(pool, "num_requests", 0)
+    return connections, requests_sent
+
+class InfluxClientRegistry:
+    """
+    Verwaltet je einen langlebigen v1, v2 und async Client pro Prozess
+
+    Clients werden beim ersten Zugriff erstellt und danach wiederverwendet.
+    Neu verbunden wird nur, nachdem ein Aufrufer einen Fehler über invalidate() gemeldet hat.
+    """
+
+    def __init__(self, factories=None):
+        self._factories = factories or {"v1": _create_v1_client, "v2": _create_v2_client, "async": _create_async_client}
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._counters = {kind: {"created": 0, "reused": 0, "invalidated": 0} for kind in self._factories}
+
+    def get(self, kind):
+        """
+        Gibt den gemeinsamen Client der angegebenen Art ('v1', 'v2' oder 'async') zurück
+        """
+        with self._lock:
+            client = self._clients.get(kind)
+            if client is not None:
+                self._counters[kind]["reused"] += 1
+                return client
+
+            client = self._factories[kind]()
+            self._clients[kind] = client
+            self._counters[kind]["created"] += 1
+            return client
+
+    def invalidate(self, kind):
+        """
+        Verwirft den Client nach einem Fehler; der nächste Zugriff verbindet neu
+        """
+        with self._lock:
+            client = self._clients.pop(kind, None)
+            if client is None:
+                return
+            self._counters[kind]["invalidated"] += 1
+
+        logger.warning(f"InfluxDB {kind} Client wird nach Fehler neu aufgebaut")
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug(f"Fehler beim Schließen des InfluxDB {kind} Clients: {e}")
+
+    def stats(self):
+        """
+        Gibt die Wiederverwendungszähler pro Client-Art zurück
+
+        Returns:
+            dict: Pro Art 'created', 'reused', 'invalidated' sowie (falls verfügbar)
+                  'connections' (geöffnete TCP-Verbindungen) und 'requests' (gesendete HTTP-Requests)
+        """
+        with self._lock:
+            stats = {kind: dict(counters) for kind, counters in self._counters.items()}
+            clients = dict(self._clients)
+
+        for kind, client in clients.items():
+            try:
+                if kind == "v1":
+                    pools = [adapter.poolmanager.pools for adapter in client._session.adapters.values()]
+                elif kind == "v2":
+                    pools = [client.api_client.rest_client.pool_manager.pools]
+                else:
+                    continue
+                connections, requests_sent = 0, 0
+                for pool in pools:
+                    pool_connections, pool_requests = _pool_counters(pool)
+                    connections += pool_connections
+                    requests_sent += pool_requests
+                stats[kind]["connections"] = connections
+                stats[kind]["requests"] = requests_sent
+            except Exception:
+                # Interna der HTTP-Bibliotheken nicht verfügbar - nur Client-Zähler melden
+                pass
+        return stats
+
+    def close_all(self):
+        """
+        Schließt alle offenen Clients (z.B. beim Beenden des Prozesses)
+        """
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for kind, client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"Fehler beim Schließen des InfluxDB {kind} Clients: {e}")
+
+_registry = InfluxClientRegistry()
+
+def get_client_registry():
+    """
+    Gibt die prozessweite Client Registry zurück
+    """
+    return _registry
@@ -0,0 +1,88 @@
+"""
+Spaltenweise Dekodierung von InfluxDB Query-Ergebnissen (v1 JSON und Flux CSV)
+v1: erwartet Zeitstempel als Epoch-Millisekunden (Query mit epoch='ms')
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+def decode_series_v1(series):
+    """
+    Wandelt eine Serie aus der JSON-Antwort von /query direkt in ein DataFrame um
+
+    Die Werte werden ohne Umweg über Dicts pro Zeile als float64-Matrix übernommen,
+    die Zeitspalte als int64 Epoch-Millisekunden. Dadurch entfällt das Parsen von
+    ISO-Zeitstrings vollständig.
+
+    Args:
+        series (dict): Serie aus ResultSet.raw['series'] mit 'columns' und 'values'
+
+    Returns:
+        DataFrame: Daten mit UTC-Zeitindex 'time' und float64 Spalten oder None ohne Daten
+    """
+    columns = series.get("columns") or []
+    values = series.get("values") or []
+    if not values or not columns or columns[0] != "time":
+        return None
+
+    try:
+        # None (z.B. leere Buckets) wird dabei zu NaN
+        matrix = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Nicht-numerische Werte: spaltenweise konvertieren, ungültige Werte werden NaN
+        logger.debug(f"Nicht-numerische Werte in Serie {series.get('name')}, verwende langsamen Pfad")
+        raw = np.array(values, dtype=object)
+        matrix = np.column_stack([pd.to_numeric(raw[:, i], errors="coerce") for i in range(raw.shape[1])]).astype(np.float64)
+
+    epochs = matrix[:, 0].astype(np.int64)
+    index = pd.DatetimeIndex(pd.to_datetime(epochs, unit="ms", utc=True), name="time")
+    return pd.DataFrame({column: matrix[:, i] for i, column in enumerate(columns) if i > 0}, index=index)
+
+def iter_series_v1(result):
+    """
+    Liefert (tags, DataFrame) für alle Serien eines InfluxDB v1 ResultSets
+
+    Args:
+        result (ResultSet): Ergebnis von InfluxDBClient.query(..., epoch='ms')
+    """
+    for series in (result.raw or {}).get("series", []):
+        df = decode_series_v1(series)
+        if df is not None:
+            yield series.get("tags") or {}, df
+
+def decode_flux_pivot(table, entity_ids):
+    """
+    Wandelt eine gepivotete Flux-Tabelle (Spalten _time und je eine Spalte pro entity_id) spaltenweise um
+
+    Args:
+        table (DataFrame): Rohtabelle aus dem CSV-Ergebnis (Werte als Strings oder Zahlen)
+        entity_ids (list): Erwartete Entity-Spalten
+
+    Returns:
+        DataFrame: Breites DataFrame mit Spalten (entity_id, 'value') und UTC-Zeitindex 'time' oder None ohne Daten
+    """
+    if table is None or table.empty or "_time" not in table.columns:
+        return None
+
+    # Mehrere Tabellen im CSV wiederholen ihre Kopfzeile
+    table = table[table["_time"] != "_time"]
+    if table.empty:
+        return None
+
+    index = pd.DatetimeIndex(pd.to_datetime(table["_time"].to_numpy(), utc=True, format="ISO8601"), name="time")
+    frames = {
+        entity_id: pd.DataFrame(
+            {"value": pd.to_numeric(table[entity_id], errors="coerce").to_numpy(dtype=np.float64)}, index=index
+        )
+        for entity_id in entity_ids if entity_id in table.columns
+    }
+    if not frames:
+        return None
+
+    wide = pd.concat(frames, axis=1).sort_index()
+    wide.index.name = "time"
+    return wide
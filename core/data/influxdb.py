@@ -2,102 +2,124 @@
 InfluxDB Datenzugriffsmodul
 """
 
-from influxdb_client import InfluxDBClient
-from core.config import CONFIG
 import logging
+import re
+from influxdb_client import Dialect
+from core.config import CONFIG
+from core.data.cache import to_utc
+from core.data.clients import get_client_registry
+from core.data.decoding import decode_flux_pivot
+from core.data.influxdb_v1 import get_entity_series
+import pandas as pd
 
 # Logging konfigurieren
 logger = logging.getLogger(__name__)
 
 def get_influxdb_client():
     """
-    Erstellt und gibt einen InfluxDB Client zurück (mit optionalem Token)
+    Gibt den gemeinsamen InfluxDB Client (mit optionalem Token) aus der Client Registry zurück
     
     Returns:
         InfluxDBClient: Initialisierter InfluxDB Client oder None bei Fehler
     """
     try:
-        influx_config = CONFIG["data_sources"]["influxdb"]
-        token = influx_config["token"]
-        
-        if token:
-            client = InfluxDBClient(
-                url=influx_config["url"],
-                token=token,
-                org=influx_config["org"]
-            )
-        else:
-            # Token-loser Zugriff für lokale InfluxDB Instanzen
-            client = InfluxDBClient(
-                url=influx_config["url"],
-                org=influx_config["org"]
-            )
-        
-        logger.info("InfluxDB Client erfolgreich erstellt")
-        return client
+        return get_client_registry().get("v2")
         
     except Exception as e:
         logger.error(f"Fehler beim Erstellen des InfluxDB Clients: {e}")
         return None
 
-def fetch_senec_house_power_data(start_time, end_time):
+def _flux_time(value):
     """
-    Ruft die SENEC House Power Daten aus InfluxDB ab
+    Formatiert einen Zeitpunkt als RFC3339 UTC für Flux (naive Werte gelten als UTC)
+    """
+    return to_utc(value).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _build_entities_flux_query(start_time, end_time, entity_ids, every="1h"):
+    """
+    Baut eine Flux Query, die alle Entitäten mit pivot() als Spalten einer einzigen Tabelle liefert
+    (auch vom asynchronen Datenzugriff verwendet)
+    
+    Args:
+        entity_ids (list): Entity IDs, die als Spalten geliefert werden
+        every (str): Intervall für aggregateWindow (z.B. '5m', '1h') oder None für Rohdaten
+    """
+    influx_config = CONFIG["data_sources"]["influxdb"]
+    # Regex-Filter statt contains(), damit der Filter an den Storage-Layer übergeben wird;
+    # '/' muss im Flux-Regex-Literal maskiert werden
+    entity_pattern = '|'.join(re.escape(entity_id).replace('/', '\\/') for entity_id in entity_ids)
+    aggregate = f"\n          |> aggregateWindow(every: {every}, fn: mean, createEmpty: false)" if every else ""
+    return f'''
+        from(bucket: "{influx_config["bucket"]}")
+          |> range(start: {_flux_time(start_time)}, stop: {_flux_time(end_time)})
+          |> filter(fn: (r) => r["_measurement"] == "{influx_config["measurement"]}")
+          |> filter(fn: (r) => r["entity_id"] =~ /^({entity_pattern})$/){aggregate}
+          |> keep(columns: ["_time", "_value", "entity_id"])
+          |> group()
+          |> pivot(rowKey: ["_time"], columnKey: ["entity_id"], valueColumn: "_value")
+        '''
+
+def _read_flux_csv(rows):
+    """
+    Liest die Zeilen eines CSV-Ergebnisses (ohne Annotationen) in eine Rohtabelle ein
+    """
+    header = None
+    data = []
+    for row in rows:
+        if not row:
+            continue
+        if header is None:
+            header = row
+        else:
+            data.append(row)
+    if header is None:
+        return None
+    return pd.DataFrame(data, columns=header)
+
+def fetch_senec_entities(start_time, end_time, entity_ids, every="1h"):
+    """
+    Ruft mehrere SENEC Entitäten mit einer einzigen Flux Query ab (InfluxDB 2.x)
+    
+    Das Ergebnis wird als CSV gestreamt und spaltenweise dekodiert, statt
+    jeden Datensatz einzeln als FluxRecord zu verarbeiten.
     
     Args:
         start_time (datetime): Startzeitpunkt für die Abfrage
         end_time (datetime): Endzeitpunkt für die Abfrage
+        entity_ids (list): Entity IDs, die abgefragt werden sollen
+        every (str): Intervall für aggregateWindow (z.B. '5m', '1h') oder None für Rohdaten
         
     Returns:
-        DataFrame: Daten mit Zeitindex und Verbrauchswerten oder None bei Fehler
+        DataFrame: Breites DataFrame mit Spalten (entity_id, 'value') wie fetch_senec_entities_v1
+                   oder None bei Fehler bzw. ohne Daten
     """
+    entity_ids = list(dict.fromkeys(entity_ids))
     try:
         client = get_influxdb_client()
         if client is None:
             return None
         
-        influx_config = CONFIG["data_sources"]["influxdb"]
         query_api = client.query_api()
+        flux_query = _build_entities_flux_query(start_time, end_time, entity_ids, every)
         
-        # Flux Query für SENEC House Power Daten
-        flux_query = f'''
-        from(bucket: "{influx_config["bucket"]}")
-          |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
-          |> filter(fn: (r) => r["_measurement"] == "{influx_config["measurement"]}")
-          |> filter(fn: (r) => r["entity_id"] == "{influx_config["entity_id"]}")
-          |> aggregateWindow(every: 1h, fn: mean, createEmpty: false)
-          |> yield(name: "mean")
-        '''
-        
-        logger.info(f"Führe InfluxDB Query aus für Zeitraum: {start_time} bis {end_time}")
-        
-        # Query ausführen
-        result = query_api.query(flux_query)
+        logger.info(f"Führe InfluxDB Query aus für {', '.join(entity_ids)} im Zeitraum: {start_time} bis {end_time}")
         
-        # Ergebnisse in DataFrame konvertieren
-        import pandas as pd
-        data = []
-        for table in result:
-            for record in table.records:
-                data.append({
-                    "time": record.get_time(),
-                    "value": record.get_value(),
-                    "measurement": record.get_measurement()
-                })
+        # Query ausführen und CSV ohne Annotationen streamen
+        rows = query_api.query_csv(flux_query, dialect=Dialect(header=True, annotations=[]))
+        wide = decode_flux_pivot(_read_flux_csv(rows), entity_ids)
         
-        if not data:
+        if wide is None:
             logger.warning("Keine Daten gefunden für den angegebenen Zeitraum")
             return None
         
-        df = pd.DataFrame(data)
-        df.set_index("time", inplace=True)
-        df.index = pd.to_datetime(df.index)
-        
-        logger.info(f"Erfolgreich {len(df)} Datensätze abgerufen")
-        return df
+        for entity_id in entity_ids:
+            if entity_id not in wide.columns.get_level_values(0):
+                logger.warning(f"Keine Datensätze gefunden für {entity_id}")
+        logger.info(f"Erfolgreich {len(wide)} Zeitpunkte abgerufen")
+        return wide
         
     except Exception as e:
-        logger.error(f"Fehler beim Abrufen der SENEC House Power Daten: {e}")
+        logger.error(f"Fehler beim Abrufen der SENEC Daten: {e}")
         
         # Spezifische Fehlerbehandlung für Flux
         if "Flux query service disabled" in str(e):
@@ -108,7 +130,21 @@ def fetch_senec_house_power_data(start_time, end_time):
             logger.error("   3. Setzen Sie flux-enabled = true")
             logger.error("   4. Starten Sie InfluxDB neu")
         
+        # Verbindung beim nächsten Aufruf neu aufbauen
+        get_client_registry().invalidate("v2")
         return None
-    finally:
-        if 'client' in locals():
-            client.close()
\ No newline at end of file
+
+def fetch_senec_house_power_data(start_time, end_time, every="1h"):
+    """
+    Ruft die SENEC House Power Daten aus InfluxDB ab
+    
+    Args:
+        start_time (datetime): Startzeitpunkt für die Abfrage
+        end_time (datetime): Endzeitpunkt für die Abfrage
+        every (str): Intervall für aggregateWindow oder None für Rohdaten
+        
+    Returns:
+        DataFrame: Daten mit Zeitindex und Verbrauchswerten oder None bei Fehler
+    """
+    entity_id = CONFIG["data_sources"]["influxdb"]["entity_id"]
+    return get_entity_series(fetch_senec_entities(start_time, end_time, [entity_id], every), entity_id)
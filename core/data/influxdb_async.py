@@ -0,0 +1,313 @@
+"""
+Asynchroner Datenzugriff auf InfluxDB über die HTTP-Endpunkte /query (v1) und /api/v2/query (Flux)
+Alle Abfragen einer Seite laufen nebenläufig auf einer Event Loop, sodass die Ladezeit
+der langsamsten einzelnen Abfrage entspricht statt der Summe aller Abfragen.
+"""
+
+import asyncio
+import io
+import logging
+import threading
+import httpx
+import pandas as pd
+from core.config import CONFIG
+from core.data.chunking import _fetch_with_retries_async, plan_chunks, stitch_chunks
+from core.data.clients import get_client_registry
+from core.data.decoding import decode_flux_pivot, decode_series_v1
+from core.data.influxdb import _build_entities_flux_query
+from core.data.influxdb_market import _build_market_query, _series_to_prices
+from core.data.influxdb_v1 import (_build_entities_query_v1, _cache_resolution_key, _finalize_entities,
+                                   _series_to_wide, get_entity_series, resolve_resolution)
+from core.data.windows import fetch_tiered_async
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+class AsyncInfluxSession:
+    """
+    Gemeinsamer httpx.AsyncClient für alle Abfragen einer Event Loop
+
+    Die Anzahl gleichzeitiger Requests ist auf pool_size begrenzt; jeder Request
+    hat ein eigenes Timeout (CONFIG timeout). failures zählt Abfragen, die endgültig
+    fehlgeschlagen sind (siehe fetch_dashboard_data).
+    """
+
+    def __init__(self, transport=None):
+        influx_config = CONFIG["data_sources"]["influxdb"]
+        self.url = influx_config["url"].rstrip("/")
+        self.timeout = float(influx_config["timeout"])
+        pool_size = max(int(influx_config["pool_size"]), 1)
+        headers = {}
+        if influx_config["token"]:
+            headers["Authorization"] = f"Token {influx_config['token']}"
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(pool_size)
+        self.failures = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def query_v1(self, query):
+        """
+        Führt eine InfluxQL Query über /query aus
+
+        Returns:
+            list: (tags, DataFrame) pro Serie, Zeitstempel als Epoch-Millisekunden dekodiert
+        """
+        params = {"db": CONFIG["data_sources"]["influxdb"]["bucket"], "q": query, "epoch": "ms"}
+        async with self._semaphore:
+            response = await self._client.get(f"{self.url}/query", params=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        series = []
+        for result in response.json().get("results", []):
+            if "error" in result:
+                raise RuntimeError(f"InfluxDB Fehler: {result['error']}")
+            for raw_series in result.get("series", []):
+                df = decode_series_v1(raw_series)
+                if df is not None:
+                    series.append((raw_series.get("tags") or {}, df))
+        return series
+
+    async def query_flux(self, flux_query):
+        """
+        Führt eine Flux Query über /api/v2/query aus
+
+        Returns:
+            DataFrame: Rohtabelle des CSV-Ergebnisses (z.B. _time und gepivotete Spalten) oder None ohne Daten
+        """
+        influx_config = CONFIG["data_sources"]["influxdb"]
+        payload = {
+            "query": flux_query,
+            "type": "flux",
+            "dialect": {"header": True, "delimiter": ",", "annotations": []}
+        }
+        async with self._semaphore:
+            response = await self._client.post(
+                f"{self.url}/api/v2/query",
+                params={"org": influx_config["org"]},
+                json=payload,
+                headers={"Accept": "application/csv"},
+                timeout=self.timeout
+            )
+        response.raise_for_status()
+
+        text = response.text.strip()
+        if not text:
+            return None
+        # Wiederholte Kopfzeilen mehrerer Tabellen entfernt decode_flux_pivot
+        return pd.read_csv(io.StringIO(text), dtype=str)
+
+class AsyncInfluxClient:
+    """
+    Langlebige AsyncInfluxSession mit eigener Event Loop in einem Hintergrundthread
+
+    Wird über die Client Registry (Art 'async') einmal pro Prozess erstellt. Streamlit-Reruns
+    nutzen damit denselben httpx Verbindungspool (Keep-Alive), statt bei jedem Aufruf eine
+    neue Event Loop samt Session aufzubauen.
+
+    Args:
+        transport: Optionaler httpx Transport (z.B. für Tests)
+    """
+
+    def __init__(self, transport=None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="influx-async", daemon=True)
+        self._thread.start()
+        self.session = self.run(self._open(transport))
+
+    @staticmethod
+    async def _open(transport):
+        # Session auf der eigenen Event Loop erstellen, an die httpx und der Semaphor gebunden werden
+        return AsyncInfluxSession(transport=transport)
+
+    def run(self, coroutine):
+        """
+        Führt eine Coroutine auf der Event Loop des Clients aus und wartet auf das Ergebnis
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self):
+        """
+        Schließt die Session und beendet die Event Loop
+        """
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self.session.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+async def _fetch_in_chunks_async(fetch_chunk, start_time, end_time, align_seconds=None, label="Daten"):
+    """
+    Asynchrone Variante von fetch_in_chunks: Abschnitte laufen nebenläufig,
+    fehlgeschlagene Abschnitte werden einzeln mit Backoff wiederholt
+    """
+    retries = max(int(CONFIG["data_sources"]["influxdb"]["chunk_retries"]), 0)
+    chunks = plan_chunks(start_time, end_time, align_seconds)
+    frames = await asyncio.gather(*(_fetch_with_retries_async(fetch_chunk, *chunk, retries, label) for chunk in chunks))
+    return stitch_chunks(frames)
+
+async def fetch_senec_entities_async(session, start_time, end_time, entity_ids, resolution=None):
+    """
+    Asynchrone Variante von fetch_senec_entities_v1 (gleiches Ergebnisformat)
+
+    Args:
+        session (AsyncInfluxSession): Gemeinsame HTTP-Session
+        start_time (datetime): Startzeitpunkt für die Abfrage
+        end_time (datetime): Endzeitpunkt für die Abfrage
+        entity_ids (list): Entity IDs, die abgefragt werden sollen
+        resolution: Zielauflösung, siehe resolve_resolution ('raw' für Rohdaten)
+
+    Returns:
+        DataFrame: Breites DataFrame mit Spalten (entity_id, Feld) oder None bei Fehler bzw. ohne Daten
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    label = ', '.join(entity_ids)
+    try:
+        bucket_seconds = resolve_resolution(start_time, end_time, resolution)
+        logger.info(f"Führe asynchrone InfluxDB v1 Query aus für {label} im Zeitraum: {start_time} bis {end_time}")
+
+        async def fetch_chunk(chunk_start, chunk_end, is_last):
+            query = _build_entities_query_v1(chunk_start, chunk_end, entity_ids, bucket_seconds, end_inclusive=is_last)
+            return _series_to_wide(await session.query_v1(query))
+
+        async def fetch_range(range_start, range_end):
+            return await _fetch_in_chunks_async(fetch_chunk, range_start, range_end, bucket_seconds, label)
+
+        wide = await fetch_tiered_async("senec", entity_ids, _cache_resolution_key(bucket_seconds),
+                                        start_time, end_time, fetch_range, align_seconds=bucket_seconds)
+        if wide is None:
+            logger.warning(f"Keine Daten gefunden für {label}")
+            return None
+
+        return _finalize_entities(wide, bucket_seconds, entity_ids)
+
+    except Exception as e:
+        logger.error(f"Fehler beim asynchronen Abrufen der Daten für {label}: {e}")
+        session.failures += 1
+        return None
+
+async def fetch_market_prices_async(session, start_time, end_time):
+    """
+    Asynchrone Variante von fetch_market_prices (gleiches Ergebnisformat)
+    """
+    try:
+        logger.info(f"Lade EPEX Spot Daten asynchron im Zeitraum: {start_time} bis {end_time}")
+        entity_id = CONFIG["data_sources"]["influxdb"]["market_entity_ids"]["total_price"]
+
+        async def fetch_chunk(chunk_start, chunk_end, is_last):
+            query = _build_market_query(chunk_start, chunk_end, end_inclusive=is_last)
+            return _series_to_prices(await session.query_v1(query))
+
+        async def fetch_range(range_start, range_end):
+            df = await _fetch_in_chunks_async(fetch_chunk, range_start, range_end, label="EPEX Spot")
+            return pd.concat({entity_id: df}, axis=1) if df is not None else None
+
+        wide = await fetch_tiered_async("epex", [entity_id], "raw", start_time, end_time, fetch_range)
+        df = wide[entity_id].dropna(how='all') if wide is not None else None
+
+        if df is None or df.empty:
+            logger.warning("Keine EPEX Spot Daten gefunden")
+            return None
+
+        logger.info(f"✅ EPEX Spot Daten geladen: {len(df)} Datensätze")
+        return df
+
+    except Exception as e:
+        logger.error(f"Fehler beim asynchronen Laden der EPEX Spot Daten: {e}")
+        session.failures += 1
+        return None
+
+async def fetch_senec_entities_flux_async(session, start_time, end_time, entity_ids, every="1h"):
+    """
+    Asynchrone Variante von fetch_senec_entities über den Flux Endpunkt (InfluxDB 2.x, gleiches Ergebnisformat)
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    try:
+        table = await session.query_flux(_build_entities_flux_query(start_time, end_time, entity_ids, every))
+        wide = decode_flux_pivot(table, entity_ids)
+        if wide is None:
+            logger.warning("Keine Daten gefunden für den angegebenen Zeitraum")
+            return None
+
+        logger.info(f"Erfolgreich {len(wide)} Zeitpunkte abgerufen")
+        return wide
+
+    except Exception as e:
+        logger.error(f"Fehler beim asynchronen Abrufen der SENEC Daten: {e}")
+        session.failures += 1
+        return None
+
+async def fetch_senec_house_power_data_async(session, start_time, end_time, every="1h"):
+    """
+    Asynchrone Variante von fetch_senec_house_power_data über den Flux Endpunkt (InfluxDB 2.x)
+    """
+    entity_id = CONFIG["data_sources"]["influxdb"]["entity_id"]
+    wide = await fetch_senec_entities_flux_async(session, start_time, end_time, [entity_id], every)
+    return get_entity_series(wide, entity_id)
+
+async def fetch_all_async(start_time, end_time, entity_ids=None, resolution=None, transport=None, tail_start=None,
+                          session=None):
+    """
+    Lädt SENEC Entitäten und EPEX Spot Preise nebenläufig über eine gemeinsame Session
+
+    Args:
+        entity_ids (list): Entity IDs (Standard: alle SENEC Entitäten aus CONFIG)
+        transport: Optionaler httpx Transport (z.B. für Tests)
+        tail_start (datetime): Zusätzlich die Entitäten ab tail_start bis end_time in Rohauflösung
+                               laden (z.B. für die Echtzeit-Analyse)
+        session (AsyncInfluxSession): Bestehende Session (Standard: eigene Session für diesen Aufruf)
+
+    Returns:
+        dict: 'power' (breites DataFrame oder None), 'market_prices' (DataFrame oder None) und
+              'power_tail' (breites DataFrame in Rohauflösung oder None)
+    """
+    if entity_ids is None:
+        entity_ids = list(CONFIG["data_sources"]["influxdb"]["entity_ids"].values())
+    if session is None:
+        async with AsyncInfluxSession(transport=transport) as own_session:
+            return await fetch_all_async(start_time, end_time, entity_ids, resolution, tail_start=tail_start,
+                                         session=own_session)
+
+    queries = [fetch_senec_entities_async(session, start_time, end_time, entity_ids, resolution),
+               fetch_market_prices_async(session, start_time, end_time)]
+    if tail_start is not None:
+        queries.append(fetch_senec_entities_async(session, tail_start, end_time, entity_ids, "raw"))
+    power, market_prices, *tail = await asyncio.gather(*queries)
+    return {"power": power, "market_prices": market_prices, "power_tail": tail[0] if tail else None}
+
+def fetch_dashboard_data(start_time, end_time, entity_ids=None, resolution=None, tail_start=None):
+    """
+    Synchroner Einstiegspunkt für web_app.py: führt fetch_all_async auf dem prozessweiten
+    AsyncInfluxClient aus (Client Registry, Art 'async')
+
+    Schlägt eine Abfrage endgültig fehl, wird der Client verworfen und beim nächsten Aufruf neu aufgebaut.
+    """
+    registry = get_client_registry()
+    try:
+        client = registry.get("async")
+        failures = client.session.failures
+        result = client.run(fetch_all_async(start_time, end_time, entity_ids, resolution, tail_start=tail_start,
+                                            session=client.session))
+        if client.session.failures > failures:
+            # Verbindung beim nächsten Aufruf neu aufbauen
+            registry.invalidate("async")
+        return result
+    except Exception as e:
+        logger.error(f"Fehler beim asynchronen Laden der Dashboard-Daten: {e}")
+        registry.invalidate("async")
+        return {"power": None, "market_prices": None, "power_tail": None}
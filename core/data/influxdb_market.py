@@ -4,76 +4,87 @@ InfluxDB Integration für echte Marktdaten (EPEX Spot)
 
 import pandas as pd
 from datetime import datetime
-from influxdb import InfluxDBClient
 from core.config import CONFIG
+from core.data.chunking import fetch_in_chunks
+from core.data.clients import get_client_registry
+from core.data.decoding import iter_series_v1
+from core.data.influxdb_v1 import get_influxdb_v1_client
+from core.data.windows import fetch_tiered
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _query_market_prices(start_time, end_time, end_inclusive=True):
+    """
+    Führt eine einzelne Query für EPEX Spot Daten aus (Fehler werden weitergereicht)
+    """
+    client = get_influxdb_v1_client()
+    if client is None:
+        raise ConnectionError("InfluxDB v1 Client nicht verfügbar")
+    
+    query = _build_market_query(start_time, end_time, end_inclusive)
+    logger.debug(f"Lade EPEX Spot Daten: {query}")
+    
+    # Query ausführen (Epoch-Zeitstempel für die spaltenweise Dekodierung)
+    result = client.query(query, epoch='ms')
+    return _series_to_prices(iter_series_v1(result))
+
+def _build_market_query(start_time, end_time, end_inclusive=True):
+    """
+    Baut die InfluxQL Query für EPEX Spot Daten
+    """
+    # Query für EPEX Spot Daten - Verwende den korrekten Total Price
+    # Genau wie in Grafana: SELECT distinct("value") FROM "€/kWh" WHERE ("entity_id"::tag = 'epex_spot_data_total_price')
+    return f'''
+    SELECT "value" 
+    FROM "€/kWh" 
+    WHERE "entity_id" = '{CONFIG["data_sources"]["influxdb"]["market_entity_ids"]["total_price"]}' 
+    AND time >= '{start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}' 
+    AND time {'<=' if end_inclusive else '<'} '{end_time.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    '''
+
+def _series_to_prices(series):
+    """
+    Fasst dekodierte (tags, DataFrame) Serien zu einem Preis-DataFrame zusammen (Preis in €/kWh)
+    """
+    frames = [df for _, df in series]
+    if not frames:
+        return None
+    return pd.concat(frames).sort_index() if len(frames) > 1 else frames[0]
+
 def fetch_market_prices(start_time, end_time):
     """
     Ruft echte EPEX Spot-Marktdaten aus InfluxDB ab
+    (lange Zeiträume in parallelen Abschnitten, siehe fetch_in_chunks)
     """
     try:
-        influx_config = CONFIG["data_sources"]["influxdb"]
-        
-        # Parse URL
-        from urllib.parse import urlparse
-        parsed_url = urlparse(influx_config["url"])
-        host = parsed_url.hostname
-        port = parsed_url.port if parsed_url.port else 8086
-        
-        # Verbindung herstellen
-        client = InfluxDBClient(
-            host=host,
-            port=port,
-            database=influx_config["bucket"]
-        )
+        logger.info(f"Lade EPEX Spot Daten im Zeitraum: {start_time} bis {end_time}")
         
-        # Query für EPEX Spot Daten - Verwende den korrekten Total Price
-        # Genau wie in Grafana: SELECT distinct("value") FROM "€/kWh" WHERE ("entity_id"::tag = 'epex_spot_data_total_price')
-        query = f'''
-        SELECT "value" 
-        FROM "€/kWh" 
-        WHERE "entity_id" = '{CONFIG["data_sources"]["influxdb"]["market_entity_ids"]["total_price"]}' 
-        AND time >= '{start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}' 
-        AND time <= '{end_time.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-        '''
+        entity_id = CONFIG["data_sources"]["influxdb"]["market_entity_ids"]["total_price"]
         
-        logger.info(f"Lade EPEX Spot Daten: {query}")
+        def fetch_range(range_start, range_end):
+            df = fetch_in_chunks(
+                lambda chunk_start, chunk_end, is_last: _query_market_prices(chunk_start, chunk_end, end_inclusive=is_last),
+                range_start, range_end, label="EPEX Spot"
+            )
+            return pd.concat({entity_id: df}, axis=1) if df is not None else None
         
-        # Query ausführen
-        result = client.query(query)
+        # Abgeschlossene Fenster aus dem Arbeitsspeicher bzw. lokalen Cache, nur Lücken und offenes Endstück aus InfluxDB
+        wide = fetch_tiered("epex", [entity_id], "raw", start_time, end_time, fetch_range)
+        df = wide[entity_id].dropna(how='all') if wide is not None else None
         
-        if not result:
+        if df is None or df.empty:
             logger.warning("Keine EPEX Spot Daten gefunden")
             return None
         
-        # Daten verarbeiten
-        data = []
-        for point in result.get_points():
-            data.append({
-                "time": point['time'],
-                "value": point['value']  # Preis in €/kWh
-            })
-        
-        if not data:
-            return None
-        
-        df = pd.DataFrame(data)
-        df['time'] = pd.to_datetime(df['time'], format='mixed', errors='coerce')
-        df = df.dropna(subset=['time'])
-        df.set_index('time', inplace=True)
-        
         logger.info(f"✅ EPEX Spot Daten geladen: {len(df)} Datensätze")
         return df
         
     except Exception as e:
         logger.error(f"Fehler beim Laden der EPEX Spot Daten: {e}")
+        # Verbindung beim nächsten Aufruf neu aufbauen
+        get_client_registry().invalidate("v1")
         return None
-    finally:
-        if 'client' in locals():
-            client.close()
 
 # Test
 if __name__ == "__main__":
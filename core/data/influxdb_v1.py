@@ -4,138 +4,286 @@ Für InfluxDB 1.x Systeme
 """
 
 import logging
+import re
 from datetime import datetime
-from influxdb import InfluxDBClient as InfluxDBClientV1
 from core.config import CONFIG
+from core.data.chunking import fetch_in_chunks
+from core.data.clients import get_client_registry
+from core.data.decoding import iter_series_v1
+from core.data.windows import fetch_tiered
 import pandas as pd
 
 # Logging konfigurieren
 logger = logging.getLogger(__name__)
 
+# "Runde" Bucket-Größen in Sekunden für das automatische Downsampling
+RESOLUTION_STEPS = [10, 30, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400]
+
 def get_influxdb_v1_client():
     """
-    Erstellt einen InfluxDB v1 Client
+    Gibt den gemeinsamen InfluxDB v1 Client aus der Client Registry zurück
+    (Keep-Alive Verbindungen werden über Aufrufe hinweg wiederverwendet)
     """
     try:
-        influx_config = CONFIG["data_sources"]["influxdb"]
-        
-        # Parse URL richtig
-        from urllib.parse import urlparse
-        parsed_url = urlparse(influx_config["url"])
-        host = parsed_url.hostname
-        port = parsed_url.port if parsed_url.port else 8086
-        
-        logger.info(f"Versuche Verbindung zu InfluxDB v1: {host}:{port}")
-        
-        # InfluxDB v1 Client erstellen
-        client = InfluxDBClientV1(
-            host=host,
-            port=port,
-            username='',  # Standard für v1
-            password='',  # Standard für v1
-            database=influx_config["bucket"],  # Bucket = Database in v1
-            ssl=False,
-            timeout=10
-        )
-        
-        # Testverbindung
-        try:
-            databases = client.get_list_database()
-            logger.info(f"Verbindung erfolgreich! Verfügbare Datenbanken: {databases}")
-        except Exception as test_e:
-            logger.error(f"Testverbindung fehlgeschlagen: {test_e}")
-        
-        return client
+        return get_client_registry().get("v1")
     except Exception as e:
         logger.error(f"Fehler beim Erstellen des InfluxDB v1 Clients: {e}")
         return None
 
-def fetch_senec_house_power_data_v1(start_time, end_time):
+def fetch_senec_house_power_data_v1(start_time, end_time, resolution=None):
     """
     Ruft SENEC House Power Daten über InfluxDB v1 API ab
     """
-    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['house_power'])
+    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['house_power'], resolution)
 
-def fetch_senec_solar_generated_power_v1(start_time, end_time):
+def fetch_senec_solar_generated_power_v1(start_time, end_time, resolution=None):
     """
     Ruft SENEC Solar Generated Power Daten über InfluxDB v1 API ab
     """
-    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['solar_generated'])
+    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['solar_generated'], resolution)
 
-def fetch_senec_battery_power_v1(start_time, end_time):
+def fetch_senec_battery_power_v1(start_time, end_time, resolution=None):
     """
     Ruft SENEC Battery Power Daten über InfluxDB v1 API ab
     """
-    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['battery_power'])
+    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['battery_power'], resolution)
 
-def fetch_senec_grid_power_v1(start_time, end_time):
+def fetch_senec_grid_power_v1(start_time, end_time, resolution=None):
     """
     Ruft SENEC Grid Power Daten über InfluxDB v1 API ab
     """
-    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['grid_power'])
+    return fetch_senec_power_data_v1(start_time, end_time, CONFIG['data_sources']['influxdb']['entity_ids']['grid_power'], resolution)
 
-def fetch_senec_power_data_v1(start_time, end_time, entity_id):
+def fetch_senec_power_data_v1(start_time, end_time, entity_id, resolution=None):
     """
     Generische Funktion zum Abrufen von SENEC Power Daten über InfluxDB v1 API
+    (Sicht auf eine einzelne Entität von fetch_senec_entities_v1)
+    
+    Args:
+        start_time (datetime): Startzeitpunkt für die Abfrage
+        end_time (datetime): Endzeitpunkt für die Abfrage
+        entity_id (str): Entity ID
+        resolution: Zielauflösung, siehe resolve_resolution (Standard: automatisch)
     """
-    try:
-        client = get_influxdb_v1_client()
-        if client is None:
-            return None
+    wide = fetch_senec_entities_v1(start_time, end_time, [entity_id], resolution)
+    return get_entity_series(wide, entity_id)
+
+def get_entity_series(wide, entity_id):
+    """
+    Extrahiert die Daten einer Entität aus dem breiten Ergebnis von fetch_senec_entities_v1
+    
+    Args:
+        wide (DataFrame): Breites Ergebnis mit Spalten (entity_id, Feld)
+        entity_id (str): Gewünschte Entität
+        
+    Returns:
+        DataFrame: Daten mit Zeitindex und 'value' Spalte oder None, wenn keine Daten vorhanden sind
+    """
+    if wide is None or entity_id not in wide.columns.get_level_values(0):
+        return None
+    
+    df = wide[entity_id].dropna(how='all')
+    if df.empty:
+        return None
+    return df
+
+def resolve_resolution(start_time, end_time, resolution=None):
+    """
+    Bestimmt die Bucket-Größe für das serverseitige Downsampling
+    
+    Args:
+        start_time (datetime): Startzeitpunkt
+        end_time (datetime): Endzeitpunkt
+        resolution: 'raw' für Rohdaten, None/'auto' für automatische Wahl anhand des
+                    Punktbudgets (CONFIG max_points_per_series), sonst Sekunden,
+                    timedelta oder Dauer-String wie '15min'
         
-        # Query für v1 API - genau wie Grafana!
-        # Einfache Query ohne GROUP BY für bessere Kompatibilität
-        time_format = "%Y-%m-%dT%H:%M:%SZ"
-        query = f'''
-        SELECT "value" 
+    Returns:
+        int: Bucket-Größe in Sekunden oder None für Rohdaten
+    """
+    if resolution == 'raw':
+        return None
+    
+    if resolution is None or resolution == 'auto':
+        max_points = max(int(CONFIG['data_sources']['influxdb']['max_points_per_series']), 1)
+        span_seconds = max((end_time - start_time).total_seconds(), 0)
+        target_seconds = span_seconds / max_points
+        # Nächstgrößere "runde" Bucket-Größe, damit Buckets über Reruns stabil bleiben
+        for step in RESOLUTION_STEPS:
+            if step >= target_seconds:
+                return step
+        return int(-(-target_seconds // RESOLUTION_STEPS[-1]) * RESOLUTION_STEPS[-1])
+    
+    if isinstance(resolution, (int, float)):
+        seconds = int(resolution)
+    else:
+        seconds = int(pd.to_timedelta(resolution).total_seconds())
+    if seconds <= 0:
+        raise ValueError(f"Ungültige Auflösung: {resolution}")
+    return seconds
+
+def _build_entities_query_v1(start_time, end_time, entity_ids, bucket_seconds=None, end_inclusive=True):
+    """
+    Baut die InfluxQL Query für mehrere Entitäten (ein Round Trip, GROUP BY entity_id)
+    
+    Mit bucket_seconds werden Mittelwert, Minimum und Maximum pro Zeit-Bucket
+    direkt in InfluxDB berechnet (GROUP BY time()). Mit end_inclusive=False ist das
+    Intervall rechts offen (für aneinandergrenzende Abschnitte).
+    """
+    time_format = "%Y-%m-%dT%H:%M:%SZ"
+    # Regex für alle Entitäten; '/' muss im InfluxQL-Regex-Literal maskiert werden
+    pattern = "|".join(re.escape(entity_id).replace("/", "\\/") for entity_id in entity_ids)
+    
+    if bucket_seconds is None:
+        select = 'SELECT "value"'
+        group_by = 'GROUP BY "entity_id"'
+    else:
+        select = 'SELECT mean("value") AS "value", min("value") AS "min", max("value") AS "max", last("value") AS "last"'
+        # fill(null) liefert leere Buckets mit, damit sie clientseitig gehalten werden können
+        group_by = f'GROUP BY time({bucket_seconds}s), "entity_id" fill(null)'
+    
+    return f'''
+        {select} 
         FROM "{CONFIG['data_sources']['influxdb']['measurement']}" 
-        WHERE "entity_id" = '{entity_id}' 
+        WHERE "entity_id" =~ /^({pattern})$/ 
         AND time >= '{start_time.strftime(time_format)}' 
-        AND time <= '{end_time.strftime(time_format)}'
+        AND time {'<=' if end_inclusive else '<'} '{end_time.strftime(time_format)}' 
+        {group_by}
         '''
+
+def _hold_empty_buckets(df):
+    """
+    Füllt leere Buckets mit dem zuletzt geschriebenen Wert
+    
+    Home Assistant schreibt nur bei Änderungen; ein Bucket ohne Messwert hatte daher
+    durchgehend den letzten Wert des vorherigen Buckets. Dadurch gehen lange konstante
+    Phasen mit ihrer tatsächlichen Dauer in Mittelwerte und Energie ein.
+    """
+    df = df.astype(float)
+    held = df['last'].ffill()
+    empty = df['value'].isna()
+    for column in ('value', 'min', 'max'):
+        df.loc[empty, column] = held[empty]
+    return df.drop(columns=['last']).dropna(subset=['value'])
+
+def _query_entities_v1(start_time, end_time, entity_ids, bucket_seconds=None, end_inclusive=True):
+    """
+    Führt eine einzelne InfluxQL Query für mehrere Entitäten aus
+    
+    Fehler werden an den Aufrufer weitergereicht, damit einzelne Abschnitte wiederholt werden können.
+    
+    Returns:
+        DataFrame: Breites DataFrame mit Spalten (entity_id, Feld) oder None ohne Daten
+    """
+    client = get_influxdb_v1_client()
+    if client is None:
+        raise ConnectionError("InfluxDB v1 Client nicht verfügbar")
+    
+    query = _build_entities_query_v1(start_time, end_time, entity_ids, bucket_seconds, end_inclusive)
+    # Epoch-Zeitstempel statt ISO-Strings: spaltenweise Dekodierung ohne String-Parsing
+    result = client.query(query, epoch='ms')
+    return _series_to_wide(iter_series_v1(result))
+
+def _series_to_wide(series):
+    """
+    Fasst dekodierte (tags, DataFrame) Serien zu einem breiten DataFrame pro entity_id zusammen
+    
+    Returns:
+        DataFrame: Breites DataFrame mit Spalten (entity_id, Feld) oder None ohne Daten
+    """
+    frames = {}
+    for tags, df in series:
+        entity_id = tags.get('entity_id')
+        if entity_id is not None:
+            frames[entity_id] = df
+    
+    if not frames:
+        return None
+    
+    # Gemeinsamer Zeitindex für alle Entitäten (fehlende Werte = NaN)
+    wide = pd.concat(frames, axis=1).sort_index()
+    wide.index.name = 'time'
+    return wide
+
+def _cache_resolution_key(bucket_seconds):
+    """
+    Schlüssel der Auflösung im Tages-Cache oder None, wenn Buckets nicht in ganze Tage passen
+    """
+    if bucket_seconds is None:
+        return "raw"
+    if 86400 % bucket_seconds == 0:
+        return f"{bucket_seconds}s"
+    return None
+
+def _finalize_entities(wide, bucket_seconds, entity_ids):
+    """
+    Nachbearbeitung nach dem Zusammensetzen: leere Buckets halten, Skalierung anwenden
+    """
+    if bucket_seconds is not None:
+        # Leere Buckets erst nach dem Zusammensetzen füllen, damit Werte über Abschnittsgrenzen gehalten werden
+        entities = wide.columns.get_level_values(0).unique()
+        wide = pd.concat({entity_id: _hold_empty_buckets(wide[entity_id]) for entity_id in entities}, axis=1)
+        wide.index.name = 'time'
+    
+    # Skalierungsfaktor anwenden (falls Daten in Wh statt W gespeichert sind)
+    scaling_factor = float(CONFIG.get("data_scaling_factor", 1.0))
+    if scaling_factor != 1.0:
+        wide = wide * scaling_factor
+        logger.info(f"Daten skaliert mit Faktor {scaling_factor} (z.B. Wh zu W)")
+    
+    found = set(wide.columns.get_level_values(0))
+    for entity_id in entity_ids:
+        if entity_id not in found:
+            logger.warning(f"Keine Datensätze gefunden für {entity_id}")
+    logger.info(f"Erfolgreich {len(wide)} Zeitpunkte für {len(found)} Entitäten abgerufen")
+    return wide
+
+def fetch_senec_entities_v1(start_time, end_time, entity_ids, resolution=None):
+    """
+    Ruft mehrere SENEC Entitäten mit einer einzigen InfluxDB v1 Query ab
+    
+    Ohne Angabe einer Auflösung wird die Bucket-Größe aus Zeitraum und Punktbudget
+    abgeleitet, sodass Datenmenge und Dekodierzeit unabhängig vom Zeitraum bleiben.
+    Lange Zeiträume werden in Abschnitten parallel abgefragt (siehe fetch_in_chunks).
+    
+    Args:
+        start_time (datetime): Startzeitpunkt für die Abfrage
+        end_time (datetime): Endzeitpunkt für die Abfrage
+        entity_ids (list): Entity IDs, die abgefragt werden sollen
+        resolution: Zielauflösung, siehe resolve_resolution ('raw' für Rohdaten)
         
-        logger.info(f"Ausführende Query für {entity_id}: {query}")
-        
-        logger.info(f"Führe InfluxDB v1 Query aus für {entity_id} im Zeitraum: {start_time} bis {end_time}")
+    Returns:
+        DataFrame: Breites, zeitlich ausgerichtetes DataFrame mit Spalten (entity_id, Feld);
+                   Felder 'value' (Rohdaten) bzw. 'value', 'min', 'max' (Buckets)
+                   oder None bei Fehler bzw. ohne Daten
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    label = ', '.join(entity_ids)
+    try:
+        bucket_seconds = resolve_resolution(start_time, end_time, resolution)
         
-        # Query ausführen
-        result = client.query(query)
+        resolution_label = "Rohdaten" if bucket_seconds is None else f"{bucket_seconds}s Buckets"
+        logger.info(f"Führe InfluxDB v1 Query aus für {label} im Zeitraum: {start_time} bis {end_time} ({resolution_label})")
         
-        if not result:
-            logger.warning(f"Keine Daten gefunden für {entity_id}")
-            return None
+        def fetch_range(range_start, range_end):
+            return fetch_in_chunks(
+                lambda chunk_start, chunk_end, is_last: _query_entities_v1(
+                    chunk_start, chunk_end, entity_ids, bucket_seconds, end_inclusive=is_last),
+                range_start, range_end, align_seconds=bucket_seconds, label=label
+            )
         
-        # Ergebnisse in DataFrame konvertieren
-        data = []
-        for point in result.get_points():
-            data.append({
-                "time": point['time'],
-                "value": point['value']  # Direkt den Wert nehmen, nicht mean
-            })
+        # Abgeschlossene Fenster aus dem Arbeitsspeicher bzw. lokalen Cache, nur Lücken und offenes Endstück aus InfluxDB
+        wide = fetch_tiered("senec", entity_ids, _cache_resolution_key(bucket_seconds), start_time, end_time,
+                            fetch_range, align_seconds=bucket_seconds)
         
-        if not data:
-            logger.warning(f"Keine Datensätze gefunden für {entity_id}")
+        if wide is None:
+            logger.warning(f"Keine Daten gefunden für {label}")
             return None
         
-        df = pd.DataFrame(data)
-        # Flexibles Zeitstempel-Parsing für verschiedene Formate
-        df['time'] = pd.to_datetime(df['time'], format='mixed', errors='coerce')
-        # Filtere ungültige Zeitstempel
-        df = df.dropna(subset=['time'])
-        df.set_index('time', inplace=True)
-        
-        # Skalierungsfaktor anwenden (falls Daten in Wh statt W gespeichert sind)
-        scaling_factor = float(CONFIG.get("data_scaling_factor", 1.0))
-        if scaling_factor != 1.0:
-            df['value'] = df['value'] * scaling_factor
-            logger.info(f"Daten skaliert mit Faktor {scaling_factor} (z.B. Wh zu W)")
-        
-        logger.info(f"Erfolgreich {len(df)} Datensätze abgerufen für {entity_id}")
-        return df
+        return _finalize_entities(wide, bucket_seconds, entity_ids)
         
     except Exception as e:
-        logger.error(f"Fehler beim Abrufen der Daten für {entity_id} mit v1 API: {e}")
+        logger.error(f"Fehler beim Abrufen der Daten für {label} mit v1 API: {e}")
+        # Verbindung beim nächsten Aufruf neu aufbauen
+        get_client_registry().invalidate("v1")
         return None
-    finally:
-        if 'client' in locals():
-            client.close()
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Lokale Kopie der InfluxDB Messwerte (SQLite), befüllt vom Ingest-Worker (siehe core/ingest.py)
+Die Web-App liest mit aktiviertem Store nur noch lokal und ist damit unabhängig von der Last des InfluxDB Servers
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.data.cache import to_utc
+from core.data.influxdb_v1 import _hold_empty_buckets, resolve_resolution
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    entity_id TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (entity_id, time)
+) WITHOUT ROWID;
+"""
+
+class LocalStore:
+    """
+    Messwerte je Entität (Epoch-ns UTC, Wert) in einer SQLite-Datei
+
+    Der jüngste Zeitpunkt je Entität ist zugleich ihr Wasserzeichen für die nächste
+    Abfrage (time > Wasserzeichen). Bereits vorhandene Zeitpunkte werden beim Anhängen
+    ignoriert, wiederholte Abfragen sind daher unschädlich.
+
+    Args:
+        path (str): Pfad der SQLite-Datei
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection:
+            # WAL: Die Web-App liest, während der Worker schreibt
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Eine Verbindung pro Aufruf, da Streamlit Reruns in wechselnden Threads ausführt
+        return sqlite3.connect(self.path, timeout=30)
+
+    def watermark(self, entity_id):
+        """
+        Jüngster gespeicherter Zeitpunkt einer Entität in Epoch-ns oder None
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT MAX(time) FROM points WHERE entity_id = ?", (entity_id,)).fetchone()
+        return int(row[0]) if row[0] is not None else None
+
+    def append(self, entity_id, times, values):
+        """
+        Hängt Messwerte an (bereits vorhandene Zeitpunkte werden ignoriert)
+
+        Args:
+            times (ndarray): Zeitpunkte in Epoch-ns
+            values (ndarray): Messwerte (NaN wird als NULL gespeichert)
+
+        Returns:
+            int: Anzahl neu gespeicherter Messwerte
+        """
+        if not len(times):
+            return 0
+        rows = ((entity_id, time, None if np.isnan(value) else value)
+                for time, value in zip(np.asarray(times, dtype=np.int64).tolist(), np.asarray(values, dtype=np.float64).tolist()))
+        with closing(self._connect()) as connection, connection:
+            before = connection.total_changes
+            connection.executemany("INSERT OR IGNORE INTO points (entity_id, time, value) VALUES (?, ?, ?)", rows)
+            return connection.total_changes - before
+
+    def read(self, entity_id, start_ns=None, end_ns=None, include_previous=False):
+        """
+        Messwerte mit start_ns <= time <= end_ns
+
+        Args:
+            include_previous (bool): Zusätzlich den letzten Messwert vor start_ns liefern
+                                     (gilt bis zum ersten Messwert im Zeitraum)
+
+        Returns:
+            tuple: (Zeitpunkte in Epoch-ns, Werte als float64)
+        """
+        lower = start_ns if start_ns is not None else np.iinfo(np.int64).min
+        upper = end_ns if end_ns is not None else np.iinfo(np.int64).max
+        with closing(self._connect()) as connection:
+            if include_previous and start_ns is not None:
+                previous = connection.execute(
+                    "SELECT MAX(time) FROM points WHERE entity_id = ? AND time < ?", (entity_id, start_ns)).fetchone()[0]
+                if previous is not None:
+                    lower = previous
+            rows = connection.execute(
+                "SELECT time, value FROM points WHERE entity_id = ? AND time >= ? AND time <= ? ORDER BY time",
+                (entity_id, lower, upper)).fetchall()
+
+        times = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((np.nan if row[1] is None else row[1] for row in rows), dtype=np.float64, count=len(rows))
+        return times, values
+
+    def read_frame(self, entity_id, start_time, end_time, bucket_seconds=None):
+        """
+        Messwerte einer Entität im Format der InfluxDB Abfragen
+
+        Mit bucket_seconds werden wie bei GROUP BY time() Mittelwert, Minimum und Maximum je
+        Bucket (ausgerichtet auf die Epoche) gebildet; leere Buckets halten den letzten Wert.
+
+        Returns:
+            DataFrame: UTC-Zeitindex 'time' mit 'value' (bzw. 'value', 'min', 'max') oder None
+        """
+        start_ns, end_ns = to_utc(start_time).value, to_utc(end_time).value
+        times, values = self.read(entity_id, start_ns, end_ns)
+        if not len(times):
+            return None
+
+        if bucket_seconds is None:
+            index = pd.DatetimeIndex(times.view("datetime64[ns]"), name="time").tz_localize("UTC")
+            return pd.DataFrame({"value": values}, index=index)
+
+        bucket_ns = bucket_seconds * 1_000_000_000
+        first = start_ns - start_ns % bucket_ns
+        buckets = (end_ns - first) // bucket_ns + 1
+        # Wie mean(), min(), max() und last() in InfluxDB: NULL-Werte werden übersprungen
+        valid = ~np.isnan(values)
+        times, values = times[valid], values[valid]
+        bucket = (times - first) // bucket_ns
+        count = np.bincount(bucket, minlength=buckets)
+        starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1]))) if len(bucket) else bucket
+        filled = bucket[starts]
+        frame = {column: np.full(buckets, np.nan) for column in ("value", "min", "max", "last")}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frame["value"] = np.bincount(bucket, weights=values, minlength=buckets) / count
+        if len(values):
+            frame["min"][filled] = np.minimum.reduceat(values, starts)
+            frame["max"][filled] = np.maximum.reduceat(values, starts)
+            frame["last"][filled] = values[np.append(starts[1:], len(values)) - 1]
+        index = pd.DatetimeIndex((first + np.arange(buckets, dtype=np.int64) * bucket_ns).view("datetime64[ns]"), name="time")
+        return _hold_empty_buckets(pd.DataFrame(frame, index=index.tz_localize("UTC")))
+
+    def fetch_entities(self, start_time, end_time, entity_ids, resolution=None):
+        """
+        Lokales Gegenstück zu fetch_senec_entities_v1 (gleiches breites Format)
+
+        Returns:
+            DataFrame: Spalten (entity_id, Feld) oder None ohne Daten
+        """
+        bucket_seconds = resolve_resolution(to_utc(start_time), to_utc(end_time), resolution)
+        frames = {}
+        for entity_id in dict.fromkeys(entity_ids):
+            frame = self.read_frame(entity_id, start_time, end_time, bucket_seconds)
+            if frame is None:
+                logger.warning(f"Keine lokalen Datensätze gefunden für {entity_id}")
+            else:
+                frames[entity_id] = frame
+        if not frames:
+            return None
+        wide = pd.concat(frames, axis=1).sort_index()
+        wide.index.name = "time"
+        return wide
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_local_store():
+    """
+    Gibt den prozessweiten lokalen Store zurück oder None, wenn er deaktiviert ist
+    """
+    global _store
+    store_config = CONFIG["local_store"]
+    if not store_config["enabled"]:
+        return None
+
+    with _store_lock:
+        if _store is None or _store.path != store_config["path"]:
+            _store = LocalStore(store_config["path"])
+        return _store
+
+def fetch_local_dashboard_data(start_time, end_time, entity_ids=None, resolution=None, tail_start=None):
+    """
+    Lokales Gegenstück zu fetch_dashboard_data: SENEC Leistungen und EPEX Preise aus dem LocalStore
+
+    Args:
+        tail_start (datetime): Zusätzlich die Entitäten ab tail_start bis end_time in Rohauflösung
+
+    Returns:
+        dict: 'power' (breites DataFrame), 'market_prices' (DataFrame mit 'value') und
+              'power_tail' (breites DataFrame in Rohauflösung oder None)
+    """
+    try:
+        store = get_local_store()
+        if store is None:
+            raise RuntimeError("Lokaler Store ist deaktiviert (LOCAL_STORE_ENABLED)")
+        influx_config = CONFIG["data_sources"]["influxdb"]
+        if entity_ids is None:
+            entity_ids = list(influx_config["entity_ids"].values())
+        power = store.fetch_entities(start_time, end_time, entity_ids, resolution)
+        prices = store.read_frame(influx_config["market_entity_ids"]["total_price"], start_time, end_time)
+        tail = store.fetch_entities(tail_start, end_time, entity_ids, "raw") if tail_start is not None else None
+        return {"power": power, "market_prices": prices, "power_tail": tail}
+    except Exception as e:
+        logger.error(f"Fehler beim Lesen des lokalen Stores: {e}")
+        return {"power": None, "market_prices": None, "power_tail": None}
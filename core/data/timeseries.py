@@ -0,0 +1,182 @@
+"""
+Kompakte, array-basierte Messreihe (int64 Epoch-ns und float32/float64 Werte)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Nanosekunden pro Einheit eines DatetimeIndex
+_UNIT_NS = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+class TimeSeries:
+    """
+    Messreihe einer Entität als zwei zusammenhängende Arrays plus Metadaten
+
+    Gegenüber einem DataFrame mit DatetimeIndex entfallen Index-Objekte und Spalten pro Zeile;
+    mit float32 Werten belegt ein Messwert 12 statt 16+ Bytes. Zeitliche Ausschnitte sind
+    Sichten ohne Kopie, pandas-Objekte entstehen erst bei to_pandas (z.B. für Diagramme).
+
+    Args:
+        times (ndarray): Zeitpunkte in Epoch-ns (aufsteigend)
+        values (ndarray): Messwerte (float32 oder float64, NaN = kein Messwert)
+        unit (str): Einheit der Werte (z.B. 'W', '€/kWh')
+        entity_id (str): Home Assistant Entity ID bzw. Bezeichnung der Reihe
+        tz: Zeitzone für die Umwandlung in pandas (None = zeitzonenlos)
+    """
+
+    __slots__ = ("times", "values", "unit", "entity_id", "tz")
+
+    def __init__(self, times, values, unit=None, entity_id=None, tz="UTC"):
+        times = np.ascontiguousarray(times, dtype=np.int64)
+        values = np.ascontiguousarray(values)
+        if values.dtype not in (np.float32, np.float64):
+            values = values.astype(np.float64)
+        if len(times) != len(values):
+            raise ValueError(f"Zeitpunkte ({len(times)}) und Werte ({len(values)}) sind unterschiedlich lang")
+        self.times = times
+        self.values = values
+        self.unit = unit
+        self.entity_id = entity_id
+        self.tz = tz
+
+    @classmethod
+    def from_pandas(cls, data, column="value", unit=None, entity_id=None, dtype=np.float32):
+        """
+        Übernimmt eine Reihe aus einem DataFrame (Spalte column) oder einer Series
+
+        Args:
+            dtype: float32 (Standard, halber Speicher) oder float64
+        """
+        times, values, tz = series_arrays(data, column)
+        return cls(times, values.astype(dtype, copy=False), unit, entity_id, tz)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return (f"TimeSeries(entity_id={self.entity_id!r}, unit={self.unit!r}, points={len(self)}, "
+                f"dtype={self.values.dtype}, nbytes={self.nbytes})")
+
+    @property
+    def empty(self):
+        return len(self.times) == 0
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    def timestamp(self, position):
+        """
+        Zeitpunkt an einer Position als pd.Timestamp in der Zeitzone der Reihe
+        """
+        return pd.Timestamp(int(self.times[position]), tz=self.tz)
+
+    @property
+    def start(self):
+        return self.timestamp(0) if len(self) else None
+
+    @property
+    def end(self):
+        return self.timestamp(-1) if len(self) else None
+
+    @property
+    def last_value(self):
+        return float(self.values[-1]) if len(self) else None
+
+    def mean(self):
+        """
+        Arithmetischer Mittelwert der gültigen Messwerte (in float64 summiert)
+        """
+        return float(np.nanmean(self.values, dtype=np.float64)) if len(self) else np.nan
+
+    def to_ns(self, value):
+        """
+        Zeitpunkt in Epoch-ns; zeitzonenlose Werte gelten in der Zeitzone der Reihe
+        """
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is None and self.tz is not None:
+            timestamp = timestamp.tz_localize(self.tz)
+        elif timestamp.tz is not None and self.tz is None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        return timestamp.value
+
+    def between(self, start_time=None, end_time=None):
+        """
+        Ausschnitt [start_time, end_time) als Sicht auf dieselben Arrays (ohne Kopie)
+        """
+        lower = int(np.searchsorted(self.times, self.to_ns(start_time), side="left")) if start_time is not None else 0
+        upper = int(np.searchsorted(self.times, self.to_ns(end_time), side="left")) if end_time is not None else len(self)
+        return TimeSeries(self.times[lower:upper], self.values[lower:upper], self.unit, self.entity_id, self.tz)
+
+    def tail(self, duration):
+        """
+        Ausschnitt der letzten duration (Timedelta oder Dauer-String) bis einschließlich zum letzten Messwert
+        """
+        if not len(self):
+            return self
+        lower = int(np.searchsorted(self.times, self.times[-1] - pd.Timedelta(duration).value, side="left"))
+        return TimeSeries(self.times[lower:], self.values[lower:], self.unit, self.entity_id, self.tz)
+
+    @property
+    def index(self):
+        """
+        Zeitpunkte als DatetimeIndex (wird bei jedem Zugriff neu erzeugt)
+        """
+        index = pd.DatetimeIndex(self.times.view("datetime64[ns]"), name="time")
+        return index.tz_localize("UTC").tz_convert(self.tz) if self.tz is not None else index
+
+    def to_pandas(self, column="value"):
+        """
+        DataFrame mit Zeitindex und float64 Spalte (nur für Diagramme und pandas-basierte Auswertungen)
+        """
+        return pd.DataFrame({column: self.values.astype(np.float64)}, index=self.index)
+
+def series_arrays(data, column="value"):
+    """
+    Zeitpunkte (Epoch-ns, aufsteigend), Werte (float64) und Zeitzone einer Messreihe
+
+    Args:
+        data: TimeSeries, DataFrame (Spalte column) oder Series mit Zeitindex
+
+    Returns:
+        tuple: (times, values, tz); für TimeSeries sind die Zeitpunkte eine Sicht ohne Kopie
+    """
+    if isinstance(data, TimeSeries):
+        return data.times, data.values.astype(np.float64, copy=False), data.tz
+    series = data[column] if isinstance(data, pd.DataFrame) else data
+    if not series.index.is_monotonic_increasing:
+        series = series.sort_index()
+    index = series.index
+    return index.asi8 * np.int64(_UNIT_NS[index.unit]), series.to_numpy(dtype=np.float64), index.tz
+
+def to_timeseries(data, column="value", unit=None, entity_id=None, dtype=np.float32):
+    """
+    Wandelt ein DataFrame in eine TimeSeries um (None bzw. leere Daten ergeben None)
+    """
+    if data is None or len(data) == 0:
+        return None
+    if isinstance(data, TimeSeries):
+        return data
+    return TimeSeries.from_pandas(data, column, unit, entity_id, dtype)
+
+def bucket_extremes(data, unit=None, entity_id=None, dtype=np.float32):
+    """
+    Minimum und Maximum je Bucket als Paar von TimeSeries (gleiche Zeitpunkte wie 'value')
+
+    Abfragen mit Auflösung liefern neben dem Mittelwert die Spalten 'min' und 'max'. Bei Rohdaten
+    fehlen sie (die Messwerte sind selbst die Extremwerte), dann ist das Ergebnis None.
+    """
+    if data is None or len(data) == 0 or isinstance(data, TimeSeries) or not {"min", "max"} <= set(data.columns):
+        return None
+    return (TimeSeries.from_pandas(data, "min", unit, entity_id, dtype),
+            TimeSeries.from_pandas(data, "max", unit, entity_id, dtype))
+
+def as_frame(data, column="value"):
+    """
+    pandas-Sicht für Auswertungen, die ein DataFrame benötigen (DataFrames bleiben unverändert)
+    """
+    return data.to_pandas(column) if isinstance(data, TimeSeries) else data
@@ -0,0 +1,273 @@
+"""
+Normalisierung von Abfragezeiträumen auf ausgerichtete Zeitfenster
+Abgeschlossene Fenster werden im Arbeitsspeicher gehalten, nur das offene Endstück wird neu geladen
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from core.config import CONFIG
+from core.data.cache import assemble_frames, get_series_cache, to_utc
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+def split_window(start_time, end_time, bucket_seconds, closed_before):
+    """
+    Teilt einen Zeitraum in ausgerichtete, abgeschlossene Fenster und ein offenes Endstück
+
+    Args:
+        start_time (datetime): Startzeitpunkt
+        end_time (datetime): Endzeitpunkt
+        bucket_seconds (int): Fensterlänge in Sekunden (Grenzen auf Vielfachen bezogen auf UTC)
+        closed_before (Timestamp): Fenster, die bis zu diesem Zeitpunkt enden, ändern sich nicht mehr
+
+    Returns:
+        tuple: (Liste der Fensteranfänge, (start, end) des offenen Endstücks oder None)
+    """
+    step = pd.Timedelta(seconds=bucket_seconds)
+    start = to_utc(start_time)
+    end = to_utc(end_time)
+
+    first = start.floor(step)
+    # Das Fenster, das end enthält, wird vollständig geladen (end ist inklusive)
+    limit = min(end.floor(step) + step, to_utc(closed_before).floor(step))
+
+    buckets = []
+    bucket = first
+    while bucket + step <= limit:
+        buckets.append(bucket)
+        bucket += step
+
+    # Nicht abgedeckter Rest ab dem ersten offenen Fenster
+    tail = (bucket, end) if bucket <= end else None
+    return buckets, tail
+
+class WindowMemo:
+    """
+    LRU-Speicher für abgeschlossene Zeitfenster im Arbeitsspeicher
+
+    Abgeschlossene Fenster sind unveränderlich und werden bis zur Verdrängung wiederverwendet.
+    Das offene Endstück eines Zeitraums wird nur für tail_ttl_seconds wiederverwendet.
+    """
+
+    def __init__(self, bucket_seconds=3600, max_size_mb=200, tail_ttl_seconds=30, settle_minutes=15):
+        self.bucket_seconds = int(bucket_seconds)
+        self.max_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self.tail_ttl = float(tail_ttl_seconds)
+        self.settle = pd.Timedelta(minutes=float(settle_minutes))
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self._tails = {}
+        self._bytes = 0
+
+    def _bucket_seconds_for(self, align_seconds):
+        """
+        Fensterlänge als Vielfaches der Auflösung, damit kein Zeit-Bucket zwei Fenster überspannt
+        """
+        if align_seconds:
+            return math.lcm(self.bucket_seconds, int(align_seconds))
+        return self.bucket_seconds
+
+    def _closed_before(self):
+        return pd.Timestamp.now(tz="UTC") - self.settle
+
+    def lookup(self, namespace, entity_ids, resolution_key, start_time, end_time, align_seconds=None):
+        """
+        Ermittelt gespeicherte Fenster und die noch zu ladenden Bereiche
+
+        Returns:
+            tuple: (Liste gespeicherter DataFrames, Liste fehlender (start, end) Bereiche)
+        """
+        bucket_seconds = self._bucket_seconds_for(align_seconds)
+        step = pd.Timedelta(seconds=bucket_seconds)
+        buckets, tail = split_window(start_time, end_time, bucket_seconds, self._closed_before())
+        series_key = (namespace, tuple(entity_ids), resolution_key, bucket_seconds)
+
+        frames = []
+        missing = []
+        with self._lock:
+            for bucket in buckets:
+                key = series_key + (bucket,)
+                if key in self._buckets:
+                    self._buckets.move_to_end(key)
+                    frame = self._buckets[key][0]
+                    if frame is not None:
+                        frames.append(frame)
+                elif missing and missing[-1][1] == bucket:
+                    missing[-1] = (missing[-1][0], bucket + step)
+                else:
+                    missing.append((bucket, bucket + step))
+
+            if tail is not None:
+                entry = self._tails.get(series_key + (tail[0],))
+                if entry is not None and time.monotonic() - entry[0] < self.tail_ttl:
+                    if entry[1] is not None:
+                        frames.append(entry[1])
+                else:
+                    missing.append(tail)
+
+        return frames, missing
+
+    def store(self, namespace, entity_ids, resolution_key, frame, ranges, align_seconds=None):
+        """
+        Zerlegt geladene Bereiche in Fenster und speichert abgeschlossene Fenster sowie das offene Endstück
+
+        Args:
+            frame (DataFrame): Geladene Daten mit Spalten (entity_id, Feld) oder None
+            ranges (list): Geladene (start, end) Bereiche
+        """
+        bucket_seconds = self._bucket_seconds_for(align_seconds)
+        step = pd.Timedelta(seconds=bucket_seconds)
+        closed_before = self._closed_before()
+        series_key = (namespace, tuple(entity_ids), resolution_key, bucket_seconds)
+        index = frame.index if frame is not None else None
+
+        with self._lock:
+            for range_start, range_end in ranges:
+                range_start = to_utc(range_start)
+                range_end = to_utc(range_end)
+                bucket = range_start
+                while bucket + step <= range_end and bucket + step <= closed_before:
+                    self._put(series_key + (bucket,), self._slice(frame, index, bucket, bucket + step))
+                    bucket += step
+                if bucket < range_end:
+                    # Offenes Endstück: nur kurz gültig, ältere Endstücke derselben Reihe verwerfen
+                    self._tails = {key: entry for key, entry in self._tails.items() if key[:-1] != series_key}
+                    tail = frame[index >= bucket] if frame is not None else None
+                    self._tails[series_key + (bucket,)] = (time.monotonic(), tail if tail is None or not tail.empty else None)
+            self._evict()
+
+    @staticmethod
+    def _slice(frame, index, bucket_start, bucket_end):
+        if frame is None:
+            return None
+        lower, upper = index.searchsorted([bucket_start, bucket_end])
+        return frame.iloc[lower:upper] if upper > lower else None
+
+    def _put(self, key, frame):
+        size = int(frame.memory_usage(index=True).sum()) if frame is not None else 0
+        previous = self._buckets.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._buckets[key] = (frame, size)
+        self._bytes += size
+
+    def _evict(self):
+        """
+        Entfernt die am längsten nicht genutzten Fenster, bis die Maximalgröße wieder eingehalten wird
+        """
+        removed = 0
+        while self._bytes > self.max_bytes and self._buckets:
+            _, (_, size) = self._buckets.popitem(last=False)
+            self._bytes -= size
+            removed += 1
+        if removed:
+            logger.debug(f"Fenster-Cache bereinigt: {removed} Fenster entfernt")
+
+    def size_bytes(self):
+        """
+        Geschätzter Speicherbedarf aller gehaltenen Fenster in Bytes
+        """
+        with self._lock:
+            return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._tails.clear()
+            self._bytes = 0
+
+_memo = None
+_memo_lock = threading.Lock()
+
+def get_window_memo():
+    """
+    Gibt den prozessweiten Fenster-Cache zurück oder None, wenn er deaktiviert ist
+    """
+    global _memo
+    cache_config = CONFIG["cache"]
+    if not cache_config["memo_enabled"]:
+        return None
+
+    with _memo_lock:
+        if _memo is None:
+            _memo = WindowMemo(
+                bucket_seconds=int(cache_config["memo_bucket_minutes"]) * 60,
+                max_size_mb=cache_config["memo_max_size_mb"],
+                tail_ttl_seconds=cache_config["tail_ttl_seconds"],
+                settle_minutes=cache_config["settle_minutes"]
+            )
+        return _memo
+
+def fetch_tiered(namespace, entity_ids, resolution_key, start_time, end_time, fetch_range, align_seconds=None):
+    """
+    Lädt einen Zeitraum über Fenster-Cache, Parquet-Cache und zuletzt InfluxDB
+
+    Args:
+        namespace (str): Datenquelle, z.B. 'senec' oder 'epex'
+        entity_ids (list): Entity IDs
+        resolution_key (str): Auflösung ('raw', '300s', ...) oder None, wenn nicht gecacht werden kann
+        fetch_range (callable): Funktion (start, end) -> DataFrame mit Spalten (entity_id, Feld) oder None
+        align_seconds (int): Bucket-Größe der Abfrage
+
+    Returns:
+        DataFrame: Daten im angefragten Zeitraum oder None ohne Daten
+    """
+    cache = get_series_cache()
+    if cache is not None and resolution_key is not None:
+        def load(range_start, range_end):
+            return cache.fetch(namespace, entity_ids, resolution_key, range_start, range_end, fetch_range, align_seconds)
+    else:
+        load = fetch_range
+
+    memo = get_window_memo()
+    if memo is None or resolution_key is None:
+        return load(start_time, end_time)
+
+    frames, missing = memo.lookup(namespace, entity_ids, resolution_key, start_time, end_time, align_seconds)
+    for range_start, range_end in missing:
+        fetched = load(range_start, range_end)
+        memo.store(namespace, entity_ids, resolution_key, fetched, [(range_start, range_end)], align_seconds)
+        frames.append(fetched)
+
+    logger.debug(f"Fenster-Cache {namespace}/{resolution_key}: {len(missing)} Bereiche nachgeladen")
+    return assemble_frames(frames, start_time, end_time, align_seconds)
+
+async def _load_from_disk_async(cache, namespace, entity_ids, resolution_key, start_time, end_time, fetch_range, align_seconds=None):
+    """
+    Asynchrone Variante von SeriesCache.fetch: Dateizugriffe im Thread, fehlende Bereiche nebenläufig
+    """
+    cached, missing = await asyncio.to_thread(cache.lookup, namespace, entity_ids, resolution_key, start_time, end_time)
+    fetched = await asyncio.gather(*(fetch_range(range_start, range_end) for range_start, range_end in missing))
+    for (range_start, range_end), frame in zip(missing, fetched):
+        await asyncio.to_thread(cache.store, namespace, entity_ids, resolution_key, frame, [(range_start, range_end)])
+    return assemble_frames([cached, *fetched], start_time, end_time, align_seconds)
+
+async def fetch_tiered_async(namespace, entity_ids, resolution_key, start_time, end_time, fetch_range, align_seconds=None):
+    """
+    Asynchrone Variante von fetch_tiered; fetch_range ist eine Coroutine-Funktion (start, end)
+    """
+    cache = get_series_cache()
+    if cache is not None and resolution_key is not None:
+        async def load(range_start, range_end):
+            return await _load_from_disk_async(cache, namespace, entity_ids, resolution_key,
+                                               range_start, range_end, fetch_range, align_seconds)
+    else:
+        load = fetch_range
+
+    memo = get_window_memo()
+    if memo is None or resolution_key is None:
+        return await load(start_time, end_time)
+
+    frames, missing = memo.lookup(namespace, entity_ids, resolution_key, start_time, end_time, align_seconds)
+    fetched = await asyncio.gather(*(load(range_start, range_end) for range_start, range_end in missing))
+    for (range_start, range_end), frame in zip(missing, fetched):
+        memo.store(namespace, entity_ids, resolution_key, frame, [(range_start, range_end)], align_seconds)
+
+    logger.debug(f"Fenster-Cache {namespace}/{resolution_key}: {len(missing)} Bereiche nachgeladen")
+    return assemble_frames([*frames, *fetched], start_time, end_time, align_seconds)
@@ -0,0 +1,196 @@
+"""
+Ingest-Worker: spiegelt die SENEC und EPEX Entitäten aus InfluxDB in den lokalen Store
+
+Start mit: python main.py ingest
+Pro Zyklus wird je Entität nur abgefragt, was nach ihrem Wasserzeichen liegt (time > zuletzt
+gesehener Zeitpunkt); anschließend werden die Stunden- und Tagesaggregate fortgeschrieben.
+"""
+
+import logging
+import time
+import numpy as np
+import pandas as pd
+from core.config import CONFIG
+from core.data.clients import get_client_registry
+from core.data.decoding import iter_series_v1
+from core.data.influxdb_v1 import get_influxdb_v1_client
+from core.data.local_store import LocalStore
+from core.analysis.rollup_store import get_rollup_store
+
+# Logging konfigurieren
+logger = logging.getLogger(__name__)
+
+# Measurement der EPEX Preise (wie in influxdb_market)
+MARKET_MEASUREMENT = "€/kWh"
+
+# Abfragen liefern Epoch-Millisekunden, das nächste Fenster beginnt daher 1 ms nach dem Wasserzeichen
+_MS_NS = 1_000_000
+
+def query_new_points(measurement, entity_id, after_ns, limit):
+    """
+    Fragt die ältesten limit Messwerte einer Entität nach after_ns ab (Fehler werden weitergereicht)
+
+    Returns:
+        tuple: (Zeitpunkte in Epoch-ns, Werte als float64)
+    """
+    client = get_influxdb_v1_client()
+    if client is None:
+        raise ConnectionError("InfluxDB v1 Client nicht verfügbar")
+
+    query = f'''
+        SELECT "value"
+        FROM "{measurement}"
+        WHERE "entity_id" = '{entity_id}'
+        AND time >= {after_ns + _MS_NS}
+        ORDER BY time ASC
+        LIMIT {int(limit)}
+        '''
+    frames = [df for _, df in iter_series_v1(client.query(query, epoch='ms'))]
+    if not frames:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    df = pd.concat(frames).sort_index() if len(frames) > 1 else frames[0]
+    return df.index.as_unit("ns").asi8, df["value"].to_numpy(dtype=np.float64)
+
+class IngestWorker:
+    """
+    Pollt die konfigurierten Entitäten und hängt neue Messwerte an den LocalStore an
+
+    Die Wasserzeichen sind die jüngsten lokal gespeicherten Zeitpunkte je Entität; ein
+    Neustart setzt damit genau dort fort. Ohne lokale Daten wird ab backfill_days vor jetzt
+    begonnen, große Rückstände werden in Blöcken von batch_size Messwerten nachgeholt.
+    Nach Fehlern verlängert sich die Wartezeit exponentiell bis max_backoff_seconds.
+
+    Args:
+        store (LocalStore): Lokaler Store (Standard: CONFIG local_store path)
+        rollup_store (RollupStore): Aggregate, die mitgeführt werden (Standard: get_rollup_store())
+        query (callable): query(measurement, entity_id, after_ns, limit) -> (times, values)
+    """
+
+    def __init__(self, store=None, rollup_store=None, query=query_new_points):
+        self.config = CONFIG["local_store"]
+        self.store = store if store is not None else LocalStore(self.config["path"])
+        self.rollup_store = rollup_store if rollup_store is not None else get_rollup_store()
+        self.query = query
+        self.failures = 0
+        self.cycles = 0
+
+        influx_config = CONFIG["data_sources"]["influxdb"]
+        self.price_entity = influx_config["market_entity_ids"]["total_price"]
+        self.power_entities = list(dict.fromkeys(influx_config["entity_ids"].values()))
+        # Preise zuerst, damit neue Leistungswerte bereits mit dem gültigen Preis bewertet werden
+        self.sources = [(MARKET_MEASUREMENT, self.price_entity)] + [
+            (influx_config["measurement"], entity_id) for entity_id in self.power_entities]
+
+    def _ingest_entity(self, measurement, entity_id):
+        """
+        Holt alle Messwerte nach dem Wasserzeichen einer Entität
+
+        Returns:
+            int: Anzahl neu gespeicherter Messwerte
+        """
+        after = self.store.watermark(entity_id)
+        if after is None:
+            after = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=self.config["backfill_days"])).value
+        scaling_factor = float(CONFIG.get("data_scaling_factor", 1.0)) if entity_id != self.price_entity else 1.0
+
+        added = 0
+        while True:
+            times, values = self.query(measurement, entity_id, after, self.config["batch_size"])
+            if not len(times):
+                return added
+            added += self.store.append(entity_id, times, values * scaling_factor)
+            after = int(times[-1])
+            if len(times) < self.config["batch_size"]:
+                return added
+
+    def _update_rollups(self, entity_id):
+        """
+        Schreibt die Aggregate einer Leistungs-Entität ab ihrem Rollup-Wasserzeichen fort
+        """
+        seed = self.rollup_store.watermark(entity_id)
+        start_ns = seed[0] + 1 if seed else None
+        times, values = self.store.read(entity_id, start_ns)
+        if not len(times):
+            return 0
+        # Preise ab dem gehaltenen Messwert seed (gilt bereits vor times[0]) samt dem dann gültigen Preis
+        price_start = seed[0] if seed else int(times[0])
+        price_times, price_values = self.store.read(self.price_entity, price_start, include_previous=True)
+        prices = pd.DataFrame({"value": price_values},
+                              index=pd.DatetimeIndex(price_times.view("datetime64[ns]"), name="time").tz_localize("UTC"))
+        power = pd.DataFrame({"value": values},
+                             index=pd.DatetimeIndex(times.view("datetime64[ns]"), name="time").tz_localize("UTC"))
+        return self.rollup_store.update(entity_id, power, prices=prices)
+
+    def run_cycle(self):
+        """
+        Ein Abfragezyklus über alle Entitäten
+
+        Returns:
+            dict: Kennzahlen des Zyklus (points, entities, rollups, errors, lag_seconds, duration_ms)
+        """
+        started = time.perf_counter()
+        metrics = {"points": 0, "entities": 0, "rollups": 0, "errors": 0, "lag_seconds": 0.0}
+
+        for measurement, entity_id in self.sources:
+            try:
+                added = self._ingest_entity(measurement, entity_id)
+            except Exception as e:
+                metrics["errors"] += 1
+                logger.warning(f"Abfrage für {entity_id} fehlgeschlagen: {e}")
+                continue
+            metrics["points"] += added
+            metrics["entities"] += added > 0
+
+        if self.rollup_store is not None:
+            for entity_id in self.power_entities:
+                try:
+                    updated = self._update_rollups(entity_id)
+                except Exception as e:
+                    logger.warning(f"Rollup-Aktualisierung für {entity_id} fehlgeschlagen: {e}")
+                    updated = None
+                if updated is None:
+                    metrics["errors"] += 1
+                else:
+                    metrics["rollups"] += updated > 0
+
+        # Rückstand: Alter des ältesten Wasserzeichens der Leistungs-Entitäten
+        now_ns = pd.Timestamp.now(tz="UTC").value
+        watermarks = [self.store.watermark(entity_id) for entity_id in self.power_entities]
+        known = [watermark for watermark in watermarks if watermark is not None]
+        metrics["lag_seconds"] = (now_ns - min(known)) / 1e9 if known else float("nan")
+        metrics["duration_ms"] = (time.perf_counter() - started) * 1000
+        return metrics
+
+    def next_delay(self, metrics):
+        """
+        Wartezeit bis zum nächsten Zyklus (exponentieller Backoff nach Fehlern)
+        """
+        interval = float(self.config["poll_seconds"])
+        if metrics["errors"]:
+            self.failures += 1
+            # Verbindung beim nächsten Zyklus neu aufbauen
+            get_client_registry().invalidate("v1")
+            return min(interval * 2 ** self.failures, float(self.config["max_backoff_seconds"]))
+        self.failures = 0
+        return interval
+
+    def run(self, max_cycles=None, sleep=time.sleep):
+        """
+        Führt Zyklen aus, bis max_cycles erreicht ist (None = endlos) oder abgebrochen wird
+        """
+        logger.info(f"Ingest-Worker gestartet: {len(self.sources)} Entitäten, Intervall {self.config['poll_seconds']} s, "
+                    f"Store {self.store.path}")
+        try:
+            while max_cycles is None or self.cycles < max_cycles:
+                metrics = self.run_cycle()
+                self.cycles += 1
+                delay = self.next_delay(metrics)
+                logger.info(f"Ingest-Zyklus {self.cycles}: {metrics['points']} neue Punkte "
+                            f"({metrics['entities']}/{len(self.sources)} Entitäten), "
+                            f"Rollups {metrics['rollups']}, Rückstand {metrics['lag_seconds']:.1f} s, "
+                            f"Dauer {metrics['duration_ms']:.0f} ms, Fehler {metrics['errors']}, "
+                            f"nächster Lauf in {delay:.0f} s")
+                if max_cycles is None or self.cycles < max_cycles:
+                    sleep(delay)
+        except KeyboardInterrupt:
+            logger.info("Ingest-Worker beendet")
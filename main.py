@@ -1,21 +1,40 @@
 #!/usr/bin/env python3
 """
 Haupt-Eintrittspunkt für die Dynamische Stromtarif-Analyse
-Reine Streamlit-Lösung - keine CLI mehr
+Die Weboberfläche läuft über Streamlit, hier gibt es nur den Ingest-Worker (python main.py ingest)
 """
 
+import argparse
+import logging
 import sys
 import os
 
 # Füge das Projektverzeichnis zum Python-Pfad hinzu
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-print("❌ FEHLER: Diese Datei kann nicht direkt ausgeführt werden!")
-print()
-print("🚀 Bitte starten Sie die Weboberfläche mit:")
-print("   streamlit run web_app.py")
-print()
-print("💡 Warum? Streamlit kann nicht als Modul importiert werden")
-print("   und muss immer als Hauptskript gestartet werden.")
+def main():
+    parser = argparse.ArgumentParser(description="Dynamische Stromtarif-Analyse")
+    subparsers = parser.add_subparsers(dest="command")
+    ingest = subparsers.add_parser("ingest", help="InfluxDB fortlaufend in den lokalen Store spiegeln")
+    ingest.add_argument("--cycles", type=int, default=None, help="Anzahl Zyklen (Standard: endlos)")
+    args = parser.parse_args()
 
-sys.exit(1)
\ No newline at end of file
+    if args.command == "ingest":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        from core.ingest import IngestWorker
+        IngestWorker().run(max_cycles=args.cycles)
+        return 0
+
+    print("❌ FEHLER: Die Weboberfläche kann nicht über diese Datei gestartet werden!")
+    print()
+    print("🚀 Bitte starten Sie die Weboberfläche mit:")
+    print("   streamlit run web_app.py")
+    print()
+    print("💡 Warum? Streamlit kann nicht als Modul importiert werden")
+    print("   und muss immer als Hauptskript gestartet werden.")
+    print()
+    print("🔄 Ingest-Worker (InfluxDB → lokaler Store): python main.py ingest")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,9 @@ setup(
         "python-dotenv",
         "influxdb-client",
         "influxdb",
+        "pyarrow",
+        "httpx",
+        "scipy",
         "homeassistant-api",
         "streamlit",
         "plotly",
@@ -0,0 +1,63 @@
+"""
+Integration tests for the data layer against the local InfluxDB stand-in server
+"""
+
+import os
+import sys
+import pytest
+import pandas as pd
+from core.config import CONFIG
+from core.data import (fetch_dashboard_data, fetch_senec_entities, fetch_senec_entities_v1, get_client_registry,
+                       get_entity_series)
+from core.data.influxdb_market import fetch_market_prices
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'benchmarks'))
+from fake_influxdb import FakeInfluxServer, SyntheticDataset
+
+START = pd.Timestamp('2024-01-01')
+END = pd.Timestamp('2024-01-03')
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setitem(CONFIG['cache'], 'enabled', False)
+    monkeypatch.setitem(CONFIG['cache'], 'memo_enabled', False)
+    with FakeInfluxServer(SyntheticDataset(interval_seconds=60)) as fake:
+        monkeypatch.setitem(CONFIG['data_sources']['influxdb'], 'url', fake.url)
+        get_client_registry().close_all()
+        yield fake
+    get_client_registry().close_all()
+
+
+def _entity_ids():
+    return list(CONFIG['data_sources']['influxdb']['entity_ids'].values())
+
+
+def test_v1_entities_over_http(server):
+    """Raw and bucketed v1 fetches return all entities on the expected grid"""
+    raw = fetch_senec_entities_v1(START, END, _entity_ids(), 'raw')
+    assert len(raw) == 2 * 24 * 60 + 1
+    assert set(raw.columns.get_level_values(0)) == set(_entity_ids())
+
+    bucketed = fetch_senec_entities_v1(START, END, _entity_ids(), '15min')
+    house = get_entity_series(bucketed, _entity_ids()[0])
+    assert list(house.columns) == ['value', 'min', 'max']
+    assert (house.index[1] - house.index[0]) == pd.Timedelta(minutes=15)
+
+
+def test_market_prices_over_http(server):
+    """EPEX prices are served hourly"""
+    prices = fetch_market_prices(START, END)
+    assert len(prices) == 49
+    assert prices['value'].between(0, 1).all()
+
+
+def test_flux_and_async_paths_agree(server):
+    """The Flux and async paths see the same synthetic data"""
+    flux = fetch_senec_entities(START, END, _entity_ids(), every='1h')
+    assert len(flux) == 48
+    assert set(flux.columns.get_level_values(0)) == set(_entity_ids())
+
+    dashboard = fetch_dashboard_data(START, END, _entity_ids(), 'raw')
+    pd.testing.assert_frame_equal(dashboard['power'], fetch_senec_entities_v1(START, END, _entity_ids(), 'raw'))
+    assert len(dashboard['market_prices']) == 49
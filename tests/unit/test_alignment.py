@@ -0,0 +1,58 @@
+"""
+Unit tests for the shared time-axis alignment
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.alignment import align_series
+from core.analysis.energy import EnergyIntegrator
+from core.analysis.realtime import analyze_realtime
+
+
+def _series(values, start='2024-03-01 00:00', freq='10min'):
+    index = pd.date_range(start, periods=len(values), freq=freq, tz='Europe/Berlin', name='time')
+    return pd.DataFrame({'value': np.asarray(values, dtype=float)}, index=index)
+
+
+def test_step_linear_and_staleness():
+    """Union grid with step-hold, linear interpolation and per-series staleness"""
+    power = _series([0.0, 600.0, 1200.0])
+    prices = _series([0.1, 0.3], start='2024-03-01 00:05', freq='1h')
+
+    aligned = align_series({'power': power, 'price': prices}, method={'power': 'linear'},
+                           max_staleness_seconds={'price': None}, max_gap_seconds=900)
+
+    assert len(aligned) == 5
+    assert aligned['power'][:4].tolist() == pytest.approx([0.0, 300.0, 600.0, 1200.0])
+    # The last power sample is 55 minutes old at the second price and therefore stale
+    assert np.isnan(aligned['power'][4])
+    assert np.isnan(aligned['price'][0])
+    assert aligned['price'][1:].tolist() == pytest.approx([0.1, 0.1, 0.1, 0.3])
+    assert aligned.values['power'].flags['C_CONTIGUOUS']
+
+
+def test_shared_axis_energy_matches_integrator():
+    """Integrator and period sums over the shared axis agree with the per-series integrator"""
+    rng = np.random.default_rng(5)
+    consumption = _series(rng.uniform(0, 3000, 500), freq='7min')
+    prices = _series(rng.uniform(0.05, 0.4, 60), start='2024-02-29 23:00', freq='1h')
+    aligned = align_series({'consumption': consumption, 'price': prices}, max_staleness_seconds={'price': None})
+
+    edges = pd.date_range('2024-03-01', periods=5, freq='13h', tz='Europe/Berlin')
+    expected, _ = EnergyIntegrator(consumption).energy_by_bins(edges)
+    shared, _ = aligned.integrator('consumption').energy_by_bins(edges)
+    binned = aligned.sum_by_bins({'kwh': aligned.energy_kwh('consumption')}, edges)['kwh']
+    assert shared == pytest.approx(expected)
+    assert binned == pytest.approx(expected)
+
+    # Realtime costs use the price valid in each interval and ignore the future price samples
+    result = analyze_realtime(None, None, 0.3, aligned=aligned)
+    assert result['current_consumption'] == pytest.approx(consumption['value'].iloc[-1])
+    now = consumption.index[-1]
+    hours = prices.index[(prices.index > now - pd.Timedelta(hours=1)) & (prices.index < now)]
+    bounds = [now - pd.Timedelta(hours=1), *hours, now]
+    integrator = EnergyIntegrator(consumption)
+    expected_cost = sum(integrator.energy_between(begin, end) * prices['value'].asof(begin)
+                        for begin, end in zip(bounds[:-1], bounds[1:]))
+    assert result['epex_cost_last_hour'] == pytest.approx(expected_cost)
@@ -0,0 +1,65 @@
+"""
+Unit tests for the blocked-scan home battery simulator
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.battery import prepare_battery_inputs, simulate_batteries
+
+
+def _reference(inputs, capacity, charge_kw, discharge_kw, efficiency, min_soc):
+    """Plain per-sample loop used as ground truth"""
+    root = np.sqrt(efficiency)
+    soc = capacity * min_soc
+    imported = cost = 0.0
+    for net, hours, price in zip(inputs['net_kwh'], inputs['hours'], inputs['price']):
+        delta = min(max(-net, 0), charge_kw * hours) * root - min(max(net, 0), discharge_kw * hours) / root
+        new = min(max(soc + delta, capacity * min_soc), capacity)
+        change = new - soc
+        grid = net + (change / root if change > 0 else change * root)
+        imported += max(grid, 0)
+        cost += max(grid, 0) * price
+        soc = new
+    return imported, cost
+
+
+def test_batched_configurations_match_sequential_loop():
+    """Every configuration of one batched run equals the sequential SoC recursion"""
+    rng = np.random.default_rng(5)
+    index = pd.date_range('2024-06-01', periods=3001, freq='10s', tz='UTC')
+    house = pd.DataFrame({'value': rng.uniform(200, 3000, len(index))}, index=index)
+    solar = pd.DataFrame({'value': np.clip(rng.normal(1500, 2000, len(index)), 0, None)}, index=index + pd.Timedelta('4s'))
+    prices = pd.DataFrame({'value': rng.uniform(0.05, 0.4, 10)}, index=pd.date_range('2024-06-01', periods=10, freq='15min', tz='UTC'))
+    inputs = prepare_battery_inputs(house, solar, prices)
+
+    configurations = [
+        {'capacity_kwh': 0.5},
+        {'capacity_kwh': 2.0, 'charge_power_kw': 1.0, 'efficiency': 0.8, 'min_soc': 0.2},
+        {'capacity_kwh': 0.0}
+    ]
+    result = simulate_batteries(inputs, configurations)
+
+    for row, configuration in zip(result.itertuples(), configurations):
+        imported, cost = _reference(inputs, row.capacity_kwh, row.charge_power_kw, row.discharge_power_kw,
+                                    row.efficiency, row.min_soc)
+        assert row.grid_import_kwh == pytest.approx(imported)
+        assert row.cost_eur == pytest.approx(cost)
+    # Without capacity nothing changes
+    assert result.loc[2, 'savings_eur'] == pytest.approx(0.0, abs=1e-9)
+    assert result.loc[0, 'savings_eur'] > 0
+
+
+def test_battery_shifts_surplus_to_evening():
+    """Midday surplus charges the battery and covers the evening load"""
+    index = pd.date_range('2024-06-01 10:00', periods=5, freq='h', tz='UTC')
+    house = pd.DataFrame({'value': [0.0, 0.0, 2000.0, 2000.0, 0.0]}, index=index)
+    solar = pd.DataFrame({'value': [2000.0, 2000.0, 0.0, 0.0, 0.0]}, index=index)
+    inputs = prepare_battery_inputs(house, solar, max_gap_seconds=3600)
+
+    result, series = simulate_batteries(inputs, [{'capacity_kwh': 10.0, 'efficiency': 1.0, 'min_soc': 0.0}],
+                                        return_series=True)
+
+    assert result.loc[0, 'grid_import_kwh'] == pytest.approx(0.0)
+    assert result.loc[0, 'grid_export_kwh'] == pytest.approx(0.0)
+    assert series['soc_kwh'][0].tolist() == pytest.approx([0.0, 2.0, 4.0, 2.0, 0.0])
@@ -0,0 +1,74 @@
+"""
+Unit tests for chunked, parallel time-range fetching
+"""
+
+import pytest
+import pandas as pd
+from core.config import CONFIG
+from core.data.chunking import split_time_range, fetch_in_chunks
+
+
+@pytest.fixture
+def chunk_config(monkeypatch):
+    influx_config = CONFIG['data_sources']['influxdb']
+    monkeypatch.setitem(influx_config, 'chunk_hours', 24)
+    monkeypatch.setitem(influx_config, 'max_workers', 4)
+    monkeypatch.setitem(influx_config, 'chunk_retries', 1)
+    monkeypatch.setattr('core.data.chunking.time.sleep', lambda seconds: None)
+    return influx_config
+
+
+def test_split_time_range_aligned_boundaries():
+    """Inner boundaries fall on day boundaries and the chunks cover the range"""
+    chunks = split_time_range(pd.Timestamp('2023-01-01 06:00'), pd.Timestamp('2023-01-03 12:00'), 86400)
+
+    assert chunks == [
+        (pd.Timestamp('2023-01-01 06:00'), pd.Timestamp('2023-01-02')),
+        (pd.Timestamp('2023-01-02'), pd.Timestamp('2023-01-03')),
+        (pd.Timestamp('2023-01-03'), pd.Timestamp('2023-01-03 12:00')),
+    ]
+
+
+def test_fetch_in_chunks_stitches_in_order(chunk_config):
+    """Chunks are fetched separately and stitched without duplicate boundary rows"""
+    calls = []
+
+    def fetch_chunk(start, end, is_last):
+        calls.append((start, end, is_last))
+        # Inclusive end on every chunk simulates duplicated boundary rows
+        index = pd.date_range(start, end, freq='6h')
+        return pd.DataFrame({'value': range(len(index))}, index=index)
+
+    result = fetch_in_chunks(fetch_chunk, pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-04'))
+
+    assert len(calls) == 3
+    assert [is_last for _, _, is_last in calls] == [False, False, True]
+    assert result.index.is_monotonic_increasing
+    assert not result.index.duplicated().any()
+    assert len(result) == 13
+
+
+def test_failed_chunk_is_retried_alone(chunk_config):
+    """Only the failing chunk is fetched again"""
+    attempts = {}
+
+    def fetch_chunk(start, end, is_last):
+        attempts[start] = attempts.get(start, 0) + 1
+        if start == pd.Timestamp('2023-01-02') and attempts[start] == 1:
+            raise ConnectionError("timeout")
+        return pd.DataFrame({'value': [1.0]}, index=[start])
+
+    result = fetch_in_chunks(fetch_chunk, pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-03 12:00'))
+
+    assert attempts[pd.Timestamp('2023-01-02')] == 2
+    assert attempts[pd.Timestamp('2023-01-01')] == 1
+    assert len(result) == 3
+
+
+def test_fetch_in_chunks_raises_after_retries(chunk_config):
+    """A chunk that keeps failing fails the whole fetch"""
+    def fetch_chunk(start, end, is_last):
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        fetch_in_chunks(fetch_chunk, pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02 12:00'))
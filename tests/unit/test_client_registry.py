@@ -0,0 +1,59 @@
+"""
+Unit tests for the process-wide InfluxDB client registry
+"""
+
+import pytest
+from core.data.clients import InfluxClientRegistry
+
+
+class FakeClient:
+    """Client stand-in that only tracks whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry():
+    return InfluxClientRegistry(factories={"v1": FakeClient, "v2": FakeClient})
+
+
+def test_client_is_reused(registry):
+    """Repeated lookups return the same client and count as reuse"""
+    first = registry.get("v1")
+    second = registry.get("v1")
+
+    assert first is second
+    assert registry.stats()["v1"]["created"] == 1
+    assert registry.stats()["v1"]["reused"] == 1
+
+
+def test_clients_are_kept_per_kind(registry):
+    """v1 and v2 clients are managed independently"""
+    assert registry.get("v1") is not registry.get("v2")
+    assert registry.stats()["v2"]["created"] == 1
+
+
+def test_invalidate_reconnects_after_failure(registry):
+    """A reported failure closes the client and the next lookup reconnects"""
+    first = registry.get("v1")
+    registry.invalidate("v1")
+    second = registry.get("v1")
+
+    assert first.closed
+    assert second is not first
+    stats = registry.stats()["v1"]
+    assert stats["created"] == 2
+    assert stats["invalidated"] == 1
+
+
+def test_close_all(registry):
+    """close_all closes every open client"""
+    v1 = registry.get("v1")
+    v2 = registry.get("v2")
+    registry.close_all()
+
+    assert v1.closed and v2.closed
@@ -98,4 +98,26 @@ def test_cost_calculation_timezone_handling():
     # Should handle timezone conversion without error
     costs = calculate_costs(consumption_data, tariff_data)
     assert costs is not None
-    assert 'Tiwatt' in costs
\ No newline at end of file
+    assert 'Tiwatt' in costs
+
+
+def test_costs_align_energy_to_price_intervals():
+    """15-minute consumption is priced against hourly step prices, naive prices use the data timezone"""
+    time_range = pd.date_range(start='2023-01-01', periods=8 * 4 + 1, freq='15min', tz='Europe/Berlin')
+    consumption_data = pd.DataFrame({'value': [1000.0] * len(time_range)}, index=time_range)
+
+    price_index = pd.date_range(start='2023-01-01', periods=8, freq='h')
+    tariff_data = pd.DataFrame({
+        'Flat': [0.30] * 8,
+        'Night': [0.10] * 4 + [0.50] * 4,
+        'Gaps': [0.20, np.nan, 0.40, np.nan, np.nan, 0.10, np.nan, np.nan]
+    }, index=price_index)
+
+    costs = calculate_costs(consumption_data, tariff_data)
+
+    # 1 kW for 8 hours = 8 kWh
+    assert costs['Aktueller Tarif'] == pytest.approx(8 * 0.30)
+    assert costs['Flat'] == pytest.approx(8 * 0.30)
+    assert costs['Night'] == pytest.approx(4 * 0.10 + 4 * 0.50)
+    # Missing prices hold the last known price
+    assert costs['Gaps'] == pytest.approx(0.20 * 2 + 0.40 * 3 + 0.10 * 3)
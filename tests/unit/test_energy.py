@@ -0,0 +1,78 @@
+"""
+Unit tests for the time-weighted energy integrator and the analyses built on it
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.consumption import analyze_historical_consumption, analyze_monthly_consumption, analyze_time_period
+from core.analysis.energy import EnergyIntegrator, cumulative_energy
+
+
+def _power(times, values, tz='UTC'):
+    return pd.DataFrame({'value': values}, index=pd.DatetimeIndex(pd.to_datetime(times), name='time').tz_localize(tz))
+
+
+def test_values_are_held_until_next_sample():
+    """Irregular samples are weighted by how long they were valid, not equally"""
+    data = _power(['2023-01-01 00:00', '2023-01-01 00:10', '2023-01-01 01:00'], [6000.0, 0.0, 100.0])
+
+    integrator = EnergyIntegrator(data)
+
+    # 6 kW for 10 minutes + 0 W for 50 minutes; the last sample has no duration
+    assert integrator.total_kwh() == pytest.approx(1.0)
+    assert integrator.total_hours() == pytest.approx(1.0)
+    assert cumulative_energy(data).tolist() == pytest.approx([0.0, 1.0, 1.0])
+
+
+def test_gaps_are_capped():
+    """Outages longer than max_gap_seconds do not count as consumption"""
+    data = _power(['2023-01-01 00:00', '2023-01-01 05:00'], [1000.0, 1000.0])
+
+    integrator = EnergyIntegrator(data, max_gap_seconds=3600)
+
+    assert integrator.total_kwh() == pytest.approx(1.0)
+
+
+def test_missing_values_and_partial_intervals():
+    """NaN samples contribute nothing; queries inside a hold interval are prorated"""
+    data = _power(['2023-01-01 00:00', '2023-01-01 01:00', '2023-01-01 02:00', '2023-01-01 03:00'],
+                  [1000.0, np.nan, 2000.0, 0.0])
+    integrator = EnergyIntegrator(data)
+
+    assert integrator.total_kwh() == pytest.approx(3.0)
+    assert integrator.energy_between('2023-01-01 00:30', '2023-01-01 02:30') == pytest.approx(1.5)
+    energy, hours = integrator.energy_by_bins(pd.date_range('2023-01-01', periods=4, freq='h', tz='UTC'))
+    assert energy.tolist() == pytest.approx([1.0, 0.0, 2.0])
+    assert hours.tolist() == pytest.approx([1.0, 0.0, 1.0])
+
+
+def test_year_of_ten_second_data_integrates_in_one_pass():
+    """A year of 10 second samples integrates to the exact constant-power energy"""
+    index = pd.date_range('2023-01-01', '2024-01-01', freq='10s', tz='UTC', inclusive='left')
+    data = pd.DataFrame({'value': np.full(len(index), 500.0)}, index=index)
+
+    integrator = EnergyIntegrator(data, end_time=pd.Timestamp('2024-01-01', tz='UTC'))
+
+    assert integrator.total_kwh() == pytest.approx(0.5 * 365 * 24)
+
+
+def test_analyses_use_time_weighted_energy():
+    """Historical, monthly and period analyses agree on the integrated energy"""
+    data = _power(['2023-01-31 23:00', '2023-02-01 00:00', '2023-02-01 00:15', '2023-02-01 01:00'],
+                  [1000.0, 4000.0, 0.0, 0.0])
+
+    historical = analyze_historical_consumption(data)
+    assert historical['total_consumption_kwh'] == pytest.approx(2.0)
+    assert historical['average_power_w'] == pytest.approx(1000.0)
+
+    monthly = analyze_monthly_consumption(data)
+    assert monthly['2023-01']['total_consumption_kwh'] == pytest.approx(1.0)
+    assert monthly['2023-02']['total_consumption_kwh'] == pytest.approx(1.0)
+    assert 'month' not in data.columns
+
+    period = analyze_time_period(data, pd.Timestamp('2023-02-01'), pd.Timestamp('2023-02-01 23:59'), 'Tag', tariff=0.5)
+    assert period['total_consumption_kwh'] == pytest.approx(1.0)
+    assert period['cost'] == pytest.approx(0.5)
+    assert period['data_points'] == 3
+    assert analyze_time_period(data, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02'), 'leer') is None
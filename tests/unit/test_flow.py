@@ -0,0 +1,48 @@
+"""
+Unit tests for the per-interval energy-flow decomposition
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.flow import FLOW_COLUMNS, aggregate_energy_flows, split_power_flows, summarize_energy_flows
+
+
+def _power(values, start='2024-06-01 10:00', freq='30min'):
+    index = pd.date_range(start, periods=len(values), freq=freq, tz='Europe/Berlin')
+    return pd.DataFrame({'value': np.asarray(values, dtype=float)}, index=index)
+
+
+def test_split_power_flows_signs():
+    """Battery > 0 charges, grid > 0 imports; flows are non-negative and balance"""
+    house = np.array([1000.0, 1000.0, 2000.0, 500.0])
+    solar = np.array([3000.0, 0.0, 500.0, 0.0])
+    battery = np.array([1500.0, -800.0, -1000.0, 1000.0])
+    grid = house + battery - solar
+
+    flows = split_power_flows(house, solar, battery, grid)
+
+    assert flows['solar_to_house'].tolist() == [1000.0, 0.0, 500.0, 0.0]
+    assert flows['solar_to_battery'].tolist() == [1500.0, 0.0, 0.0, 0.0]
+    assert flows['solar_to_grid'].tolist() == [500.0, 0.0, 0.0, 0.0]
+    assert flows['battery_to_house'].tolist() == [0.0, 800.0, 1000.0, 0.0]
+    assert flows['grid_to_house'].tolist() == [0.0, 200.0, 500.0, 500.0]
+    assert flows['grid_to_battery'].tolist() == [0.0, 0.0, 0.0, 1000.0]
+    assert all((flows[name] >= 0).all() for name in FLOW_COLUMNS)
+
+
+def test_ratios_follow_timing_not_averages():
+    """Midday solar exported while the evening load imports gives zero self-sufficiency"""
+    house = _power([0.0, 0.0, 2000.0, 2000.0, 0.0])
+    solar = _power([2000.0, 2000.0, 0.0, 0.0, 0.0])
+    grid = _power([-2000.0, -2000.0, 2000.0, 2000.0, 0.0])
+
+    hourly = aggregate_energy_flows(house, solar, None, grid, 'hour', max_gap_seconds=3600)
+    totals = summarize_energy_flows(hourly)
+
+    assert totals['house_kwh'] == pytest.approx(2.0)
+    assert totals['solar_kwh'] == pytest.approx(2.0)
+    assert totals['self_sufficiency'] == pytest.approx(0.0)
+    assert totals['self_consumption'] == pytest.approx(0.0)
+    # The averages-based formula would have claimed 100 % self-consumption
+    assert hourly['grid_import_kwh'].tolist() == pytest.approx([0.0, 2.0, 0.0])
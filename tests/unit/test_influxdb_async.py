@@ -0,0 +1,123 @@
+"""
+Unit tests for the asynchronous InfluxDB data access layer
+"""
+
+import asyncio
+import httpx
+import pytest
+import pandas as pd
+import core.data.influxdb_async as influxdb_async
+from core.data.clients import InfluxClientRegistry
+from core.data.influxdb_async import (AsyncInfluxClient, AsyncInfluxSession, fetch_all_async, fetch_dashboard_data,
+                                      fetch_senec_house_power_data_async)
+from core.data.influxdb_v1 import get_entity_series
+
+
+def _series(name, tags, rows):
+    return {'name': name, 'tags': tags, 'columns': ['time', 'value'], 'values': rows}
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    monkeypatch.setitem(influxdb_async.CONFIG['cache'], 'enabled', False)
+    monkeypatch.setitem(influxdb_async.CONFIG['cache'], 'memo_enabled', False)
+    monkeypatch.setitem(influxdb_async.CONFIG['data_sources']['influxdb'], 'chunk_retries', 0)
+
+
+def test_fetch_all_runs_queries_concurrently():
+    """SENEC and EPEX queries are in flight at the same time"""
+    in_flight = 0
+    max_in_flight = 0
+    queries = []
+
+    async def handler(request):
+        nonlocal in_flight, max_in_flight
+        assert request.url.path == '/query'
+        assert request.url.params['epoch'] == 'ms'
+        query = request.url.params['q']
+        queries.append(query)
+
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+
+        if '€/kWh' in query:
+            series = [_series('€/kWh', {}, [[1672531200000, 0.3]])]
+        else:
+            series = [_series('W', {'entity_id': 'house'}, [[1672531200000, 500.0], [1672531210000, 520.0]])]
+        return httpx.Response(200, json={'results': [{'statement_id': 0, 'series': series}]})
+
+    result = asyncio.run(fetch_all_async(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 12:00'),
+                                         ['house'], 'raw', transport=httpx.MockTransport(handler)))
+
+    assert len(queries) == 2
+    assert max_in_flight == 2
+    assert get_entity_series(result['power'], 'house')['value'].tolist() == [500.0, 520.0]
+    assert result['market_prices']['value'].tolist() == [0.3]
+
+
+def test_failed_query_returns_none():
+    """HTTP errors are logged and mapped to None like the sync API"""
+    def handler(request):
+        return httpx.Response(500, text='boom')
+
+    result = asyncio.run(fetch_all_async(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 12:00'),
+                                         ['house'], 'raw', transport=httpx.MockTransport(handler)))
+
+    assert result == {'power': None, 'market_prices': None, 'power_tail': None}
+
+
+def test_dashboard_reuses_the_registry_client_and_rebuilds_after_failures(monkeypatch):
+    """Reruns share one long-lived async client; a failed query makes the next call reconnect"""
+    status = {'code': 200}
+
+    def handler(request):
+        if status['code'] != 200:
+            return httpx.Response(status['code'], text='boom')
+        series = [_series('W', {'entity_id': 'house'}, [[1672531200000, 500.0]])]
+        return httpx.Response(200, json={'results': [{'statement_id': 0, 'series': series}]})
+
+    registry = InfluxClientRegistry(factories={'async': lambda: AsyncInfluxClient(transport=httpx.MockTransport(handler))})
+    monkeypatch.setattr(influxdb_async, 'get_client_registry', lambda: registry)
+    start, end = pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 12:00')
+    try:
+        first = fetch_dashboard_data(start, end, ['house'], 'raw')
+        client = registry.get('async')
+        fetch_dashboard_data(start, end, ['house'], 'raw', tail_start=pd.Timestamp('2023-01-01 11:00'))
+        assert registry.get('async') is client
+        assert registry.stats()['async'] == {'created': 1, 'reused': 3, 'invalidated': 0}
+        assert get_entity_series(first['power'], 'house')['value'].tolist() == [500.0]
+
+        status['code'] = 500
+        failed = fetch_dashboard_data(start, end, ['house'], 'raw')
+        assert failed['power'] is None
+        assert client._loop.is_closed()
+        status['code'] = 200
+        assert fetch_dashboard_data(start, end, ['house'], 'raw')['power'] is not None
+        assert registry.stats()['async']['created'] == 2
+        assert registry.stats()['async']['invalidated'] == 1
+    finally:
+        registry.close_all()
+
+
+def test_flux_csv_is_parsed():
+    """The v2 endpoint is queried with a pivoting Flux query and the CSV answer is decoded"""
+    csv = ('result,table,_time,senec_house_power\n'
+           ',0,2023-01-01T00:00:00Z,500.5\n'
+           ',0,2023-01-01T01:00:00Z,480\n')
+
+    def handler(request):
+        assert request.url.path == '/api/v2/query'
+        assert b'pivot(' in request.content
+        return httpx.Response(200, text=csv)
+
+    async def run():
+        async with AsyncInfluxSession(transport=httpx.MockTransport(handler)) as session:
+            return await fetch_senec_house_power_data_async(session, pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'))
+
+    df = asyncio.run(run())
+
+    assert list(df.columns) == ['value']
+    assert df['value'].tolist() == [500.5, 480.0]
+    assert str(df.index.tz) == 'UTC'
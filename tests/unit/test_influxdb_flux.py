@@ -0,0 +1,82 @@
+"""
+Unit tests for the InfluxDB v2 (Flux) data access functions
+"""
+
+import csv
+import io
+import pandas as pd
+import core.data.influxdb as influxdb
+from core.data.influxdb import fetch_senec_entities, fetch_senec_house_power_data
+
+
+class FakeQueryApi:
+    """Returns a canned CSV answer and records all Flux queries"""
+
+    def __init__(self, text):
+        self.text = text
+        self.queries = []
+
+    def query_csv(self, query, dialect=None):
+        assert dialect.annotations == []
+        self.queries.append(query)
+        return csv.reader(io.StringIO(self.text))
+
+
+class FakeV2Client:
+    def __init__(self, text):
+        self.api = FakeQueryApi(text)
+
+    def query_api(self):
+        return self.api
+
+
+def _install(monkeypatch, text):
+    client = FakeV2Client(text)
+    monkeypatch.setattr(influxdb, 'get_influxdb_client', lambda: client)
+    return client.api
+
+
+def test_entities_are_pivoted_into_one_query(monkeypatch):
+    """One pivoted Flux query returns all entities as columns of a wide frame"""
+    api = _install(monkeypatch, (
+        ',result,table,_time,house,grid\r\n'
+        ',_result,0,2023-01-01T00:00:00Z,500,\r\n'
+        ',_result,0,2023-01-01T00:05:00Z,520,100.5\r\n'
+        '\r\n'
+    ))
+
+    wide = fetch_senec_entities(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), ['house', 'grid'], every='5m')
+
+    assert len(api.queries) == 1
+    assert 'aggregateWindow(every: 5m' in api.queries[0]
+    assert 'pivot(rowKey: ["_time"], columnKey: ["entity_id"]' in api.queries[0]
+    assert 'range(start: 2023-01-01T00:00:00Z, stop: 2023-01-02T00:00:00Z)' in api.queries[0]
+    assert list(wide.columns) == [('house', 'value'), ('grid', 'value')]
+    assert wide[('house', 'value')].tolist() == [500.0, 520.0]
+    assert str(wide.index.tz) == 'UTC'
+
+
+def test_raw_query_and_house_power_view(monkeypatch):
+    """Without an interval no aggregateWindow is added; the house view has a single value column"""
+    entity_id = influxdb.CONFIG['data_sources']['influxdb']['entity_id']
+    api = _install(monkeypatch, f',result,table,_time,{entity_id}\n,_result,0,2023-01-01T00:00:01.5Z,300\n')
+
+    house = fetch_senec_house_power_data(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), every=None)
+
+    assert 'aggregateWindow' not in api.queries[0]
+    assert list(house.columns) == ['value']
+    assert house['value'].tolist() == [300.0]
+
+
+def test_empty_result(monkeypatch):
+    """Empty answers map to None"""
+    _install(monkeypatch, '')
+
+    assert fetch_senec_house_power_data(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02')) is None
+
+
+def test_entity_ids_with_slash_are_escaped_in_the_regex_literal():
+    """A '/' inside an entity id must not terminate the /.../ regex literal"""
+    query = influxdb._build_entities_flux_query(pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02'),
+                                                ['sensor/a', 'sensor.b'])
+    assert r'=~ /^(sensor\/a|sensor\.b)$/' in query
@@ -0,0 +1,120 @@
+"""
+Unit tests for the InfluxDB v1 data access functions
+"""
+
+import pytest
+import pandas as pd
+from influxdb.resultset import ResultSet
+import core.data.influxdb_v1 as influxdb_v1
+from core.data.influxdb_v1 import (fetch_senec_entities_v1, fetch_senec_power_data_v1, get_entity_series,
+                                   resolve_resolution)
+
+
+class FakeV1Client:
+    """Minimal stand-in for the InfluxDB v1 client that records all queries"""
+
+    def __init__(self, series):
+        self.series = series
+        self.queries = []
+
+    def query(self, query, epoch=None, **kwargs):
+        assert epoch == 'ms'
+        self.queries.append(query)
+        return ResultSet({'series': self.series})
+
+    def close(self):
+        pass
+
+
+def _series(entity_id, rows, columns=('time', 'value')):
+    return {
+        'name': 'W',
+        'tags': {'entity_id': entity_id},
+        'columns': list(columns),
+        'values': rows
+    }
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    monkeypatch.setitem(influxdb_v1.CONFIG['cache'], 'enabled', False)
+    monkeypatch.setitem(influxdb_v1.CONFIG['cache'], 'memo_enabled', False)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeV1Client([
+        _series('house', [[1672531200000, 500.0], [1672531210000, 520.0]]),
+        _series('grid', [[1672531205000, 100.0]])
+    ])
+    monkeypatch.setattr(influxdb_v1, 'get_influxdb_v1_client', lambda: client)
+    return client
+
+
+def test_fetch_entities_single_query(fake_client):
+    """All entities are fetched with one regex query grouped by entity_id"""
+    wide = fetch_senec_entities_v1(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), ['house', 'grid'], 'raw')
+
+    assert len(fake_client.queries) == 1
+    assert '=~ /^(house|grid)$/' in fake_client.queries[0]
+    assert 'GROUP BY "entity_id"' in fake_client.queries[0]
+
+    # Shared, sorted time index for all entities
+    assert list(wide.columns) == [('house', 'value'), ('grid', 'value')]
+    assert wide.index.is_monotonic_increasing
+    assert len(wide) == 3
+
+
+def test_entity_view_matches_single_entity_layout(fake_client):
+    """Per-entity views only contain the samples of that entity"""
+    wide = fetch_senec_entities_v1(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), ['house', 'grid'], 'raw')
+
+    grid = get_entity_series(wide, 'grid')
+    assert list(grid.columns) == ['value']
+    assert grid.index.name == 'time'
+    assert grid['value'].tolist() == [100.0]
+
+    house = fetch_senec_power_data_v1(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), 'house', 'raw')
+    assert house['value'].tolist() == [500.0, 520.0]
+
+
+def test_entity_view_missing_entity(fake_client):
+    """Unknown entities and empty results map to None"""
+    wide = fetch_senec_entities_v1(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), ['house'], 'raw')
+
+    assert get_entity_series(wide, 'battery') is None
+    assert get_entity_series(None, 'house') is None
+
+
+def test_resolve_resolution():
+    """Explicit resolutions are honoured, automatic ones respect the point budget"""
+    start = pd.Timestamp('2023-01-01')
+
+    assert resolve_resolution(start, start + pd.Timedelta(days=1), 'raw') is None
+    assert resolve_resolution(start, start + pd.Timedelta(days=1), '15min') == 900
+    assert resolve_resolution(start, start + pd.Timedelta(days=1), 60) == 60
+
+    for days in (1, 7, 30, 90, 365):
+        end = start + pd.Timedelta(days=days)
+        bucket = resolve_resolution(start, end)
+        assert (end - start).total_seconds() / bucket <= influxdb_v1.CONFIG['data_sources']['influxdb']['max_points_per_series']
+
+
+def test_bucketed_query_holds_empty_buckets(monkeypatch):
+    """Downsampling is pushed to InfluxDB and empty buckets keep the last written value"""
+    columns = ('time', 'value', 'min', 'max', 'last')
+    client = FakeV1Client([
+        _series('house', [
+            [1672531200000, 450.0, 400.0, 500.0, 480.0],
+            [1672531500000, None, None, None, None],
+            [1672531800000, 300.0, 300.0, 300.0, 300.0],
+        ], columns)
+    ])
+    monkeypatch.setattr(influxdb_v1, 'get_influxdb_v1_client', lambda: client)
+
+    house = fetch_senec_power_data_v1(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-01 00:15'), 'house', '5min')
+
+    assert 'GROUP BY time(300s), "entity_id" fill(null)' in client.queries[0]
+    assert list(house.columns) == ['value', 'min', 'max']
+    assert house['value'].tolist() == [450.0, 480.0, 300.0]
+    assert house['max'].tolist() == [500.0, 480.0, 300.0]
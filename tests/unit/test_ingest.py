@@ -0,0 +1,160 @@
+"""
+Unit tests for the ingestion worker and the local store it fills
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.config import CONFIG
+from core.analysis import analyze_historical_consumption
+from core.analysis.rollup import compute_rollups
+from core.analysis.rollup_store import RollupStore
+from core.analysis.timeindex import TimeSeriesIndex
+from core.data.influxdb_v1 import get_entity_series
+from core.data.local_store import LocalStore, fetch_local_dashboard_data
+from core.data.timeseries import bucket_extremes, to_timeseries
+from core.ingest import IngestWorker
+
+
+@pytest.fixture
+def ingest_config(monkeypatch):
+    monkeypatch.setitem(CONFIG['local_store'], 'batch_size', 500)
+    monkeypatch.setitem(CONFIG['local_store'], 'poll_seconds', 10)
+    monkeypatch.setitem(CONFIG['local_store'], 'max_backoff_seconds', 60)
+    monkeypatch.setitem(CONFIG, 'data_scaling_factor', 1.0)
+    monkeypatch.setattr('core.ingest.get_client_registry', lambda: type('Registry', (), {'invalidate': lambda self, kind: None})())
+
+
+class FakeInflux:
+    """Serves points after the requested watermark, like `time > last_seen ... LIMIT n`"""
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, measurement, entity_id, after_ns, limit):
+        self.calls.append((entity_id, after_ns))
+        if self.fail:
+            raise ConnectionError('down')
+        times, values = self.series.get(entity_id, (np.empty(0, dtype=np.int64), np.empty(0)))
+        selected = times > after_ns
+        return times[selected][:limit], values[selected][:limit]
+
+
+def _series(start, periods, freq, seed):
+    times = pd.date_range(start, periods=periods, freq=freq, tz='UTC').as_unit('ns').asi8
+    return times, np.random.default_rng(seed).uniform(100, 3000, periods)
+
+
+def test_worker_mirrors_new_points_and_keeps_rollups_current(tmp_path, ingest_config):
+    """Each cycle only fetches after the watermark; local reads and rollups match the source"""
+    now = pd.Timestamp.now(tz='UTC').floor('h')
+    grid = CONFIG['data_sources']['influxdb']['entity_ids']['grid_power']
+    price = CONFIG['data_sources']['influxdb']['market_entity_ids']['total_price']
+    grid_times, grid_values = _series(now - pd.Timedelta(hours=6), 6 * 360, '10s', 0)
+    price_times, price_values = _series(now - pd.Timedelta(hours=7), 8 * 4, '15min', 1)
+    source = FakeInflux({grid: (grid_times[:1000], grid_values[:1000]), price: (price_times, price_values / 10000)})
+
+    store = LocalStore(str(tmp_path / 'points.sqlite'))
+    rollups = RollupStore(str(tmp_path / 'rollups.sqlite'))
+    worker = IngestWorker(store, rollups, query=source)
+
+    first = worker.run_cycle()
+    # 1000 grid points arrive in two batches of at most 500
+    assert first['points'] == 1000 + len(price_times)
+    assert store.watermark(grid) == grid_times[999]
+
+    source.series[grid] = (grid_times, grid_values)
+    second = worker.run_cycle()
+    assert second['points'] == len(grid_times) - 1000
+    assert second['errors'] == 0
+    assert (grid, int(grid_times[999])) in source.calls
+
+    frame = store.read_frame(grid, pd.Timestamp(grid_times[0], tz='UTC'), pd.Timestamp(grid_times[-1], tz='UTC'))
+    assert frame['value'].to_numpy() == pytest.approx(grid_values)
+    stored = rollups.rollups(grid, granularities=('hour',))['hour']
+    expected = compute_rollups(frame, granularities=('hour',))['hour']
+    assert stored['energy_kwh'].to_numpy() == pytest.approx(expected['energy_kwh'].to_numpy())
+    assert stored['count'].tolist() == expected['count'].tolist()
+    assert (stored['cost_eur'] > 0).all()
+
+
+def test_worker_backs_off_after_errors(tmp_path, ingest_config):
+    """Failed cycles double the delay up to the cap; a successful cycle resets it"""
+    source = FakeInflux({})
+    source.fail = True
+    worker = IngestWorker(LocalStore(str(tmp_path / 'points.sqlite')), RollupStore(str(tmp_path / 'rollups.sqlite')),
+                          query=source)
+    delays = []
+    worker.run(max_cycles=4, sleep=delays.append)
+    assert delays == [20.0, 40.0, 60.0]
+    source.fail = False
+    assert worker.next_delay(worker.run_cycle()) == 10.0
+
+
+def test_rollups_price_the_held_interval_and_errors_do_not_stop_the_cycle(tmp_path, ingest_config, monkeypatch):
+    """Prices are read from the rollup watermark; a failing rollup is counted instead of raised"""
+    grid = CONFIG['data_sources']['influxdb']['entity_ids']['grid_power']
+    price = CONFIG['data_sources']['influxdb']['market_entity_ids']['total_price']
+    start = pd.Timestamp.now(tz='UTC').floor('h') - pd.Timedelta(hours=2)
+    minute = pd.Timedelta(minutes=1).value
+    grid_times = np.array([start.value, start.value + 10 * minute], dtype=np.int64)
+    # Prices change twice while the first sample is held
+    price_times = np.array([start.value - minute, start.value + 5 * minute, start.value + 8 * minute], dtype=np.int64)
+    source = FakeInflux({grid: (grid_times[:1], np.array([1000.0])), price: (price_times, np.array([0.1, 0.2, 0.3]))})
+    rollups = RollupStore(str(tmp_path / 'rollups.sqlite'))
+    worker = IngestWorker(LocalStore(str(tmp_path / 'points.sqlite')), rollups, query=source)
+
+    worker.run_cycle()
+    source.series[grid] = (grid_times, np.array([1000.0, 1000.0]))
+    worker.run_cycle()
+    hour = rollups.rollups(grid, granularities=('hour',))['hour'].iloc[0]
+    assert hour['priced_kwh'] == pytest.approx(hour['energy_kwh'])
+    assert hour['cost_eur'] == pytest.approx((5 * 0.1 + 3 * 0.2 + 2 * 0.3) / 60)
+
+    def broken(self, data, prices=None):
+        raise ValueError('bad data')
+    monkeypatch.setattr(RollupStore, 'update', broken)
+    source.series[grid] = (np.append(grid_times, start.value + 20 * minute), np.full(3, 1000.0))
+    metrics = worker.run_cycle()
+    assert metrics['errors'] == 1
+    assert metrics['points'] == 1
+
+
+def test_bucket_mean_skips_null_points(tmp_path):
+    """Like InfluxDB mean()/min()/max()/last(), NULL points do not affect a bucket"""
+    store = LocalStore(str(tmp_path / 'points.sqlite'))
+    times = pd.date_range('2024-05-01', periods=4, freq='10s', tz='UTC').as_unit('ns').asi8
+    store.append('sensor.grid', times, np.array([100.0, np.nan, 300.0, np.nan]))
+    frame = store.read_frame('sensor.grid', pd.Timestamp('2024-05-01'), pd.Timestamp('2024-05-01 00:00:50'), bucket_seconds=60)
+    assert frame[['value', 'min', 'max']].iloc[0].tolist() == [200.0, 100.0, 300.0]
+
+
+def test_bucketed_dashboard_keeps_extremes_and_a_raw_tail(tmp_path, monkeypatch):
+    """Max/min statistics use the bucket extremes; the realtime tail comes back at raw resolution"""
+    monkeypatch.setitem(CONFIG['local_store'], 'enabled', True)
+    monkeypatch.setitem(CONFIG['local_store'], 'path', str(tmp_path / 'points.sqlite'))
+    grid = CONFIG['data_sources']['influxdb']['entity_ids']['grid_power']
+    times, values = _series('2024-05-01', 6 * 360, '10s', 2)
+    LocalStore(CONFIG['local_store']['path']).append(grid, times, values)
+
+    start, end = pd.Timestamp('2024-05-01', tz='UTC'), pd.Timestamp('2024-05-01 05:59:59', tz='UTC')
+    data = fetch_local_dashboard_data(start, end, [grid], resolution='15min', tail_start=end - pd.Timedelta(hours=1))
+    frame = get_entity_series(data['power'], grid)
+    consumption = to_timeseries(frame)
+    extremes = bucket_extremes(frame)
+
+    assert len(consumption) == 24
+    result = analyze_historical_consumption(consumption, extremes=extremes)
+    assert (result['max_power_w'], result['min_power_w']) == pytest.approx((values.max(), values.min()), rel=1e-6)
+    index = TimeSeriesIndex(consumption, extremes=extremes)
+    assert index.max(start, end) == pytest.approx(values.max(), rel=1e-6)
+    hours = compute_rollups(consumption, granularities=('hour',), extremes=extremes)['hour']
+    expected = pd.Series(values, index=pd.DatetimeIndex(times, tz='UTC')).resample('h').agg(['min', 'max'])
+    np.testing.assert_allclose(hours[['min_w', 'max_w']].to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+    tail = get_entity_series(data['power_tail'], grid)
+    assert list(tail.columns) == ['value']
+    np.testing.assert_array_equal(tail['value'].to_numpy(), values[-360:])
+    assert bucket_extremes(tail) is None
@@ -0,0 +1,57 @@
+"""
+Unit tests for the price-aware load-shifting optimizer
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.cost import calculate_costs
+from core.analysis.loadshift import apply_schedule, optimize_load_shifting
+
+
+def _prices(days=3):
+    index = pd.date_range('2024-03-04', periods=days * 24, freq='h', tz='Europe/Berlin')
+    # Cheapest at 03:00, then rising with the distance to 03:00
+    return pd.DataFrame({'value': 0.10 + 0.01 * np.abs(index.hour - 3)}, index=index)
+
+
+def test_greedy_fills_cheapest_allowed_hours():
+    """Each day's budget goes into the cheapest hours inside the window"""
+    result = optimize_load_shifting(_prices(), [{'name': 'Spülmaschine', 'energy_kwh': 3.0, 'power_kw': 2.0, 'window': (8, 22)}])
+
+    schedule = result['schedule']['Spülmaschine']
+    day = schedule.loc['2024-03-05']
+    assert day[day > 0].index.hour.tolist() == [8, 9]
+    assert day.sum() == pytest.approx(3000.0)
+    summary = result['summary'].loc['Spülmaschine']
+    assert summary['energy_kwh'] == pytest.approx(9.0)
+    assert summary['savings_eur'] == pytest.approx(0.0)
+
+
+def test_lp_respects_shared_power_limit():
+    """With a shared connection limit the LP splits the cheap hours between loads"""
+    loads = [
+        {'name': 'E-Auto', 'energy_kwh': 6.0, 'power_kw': 3.0, 'window': (0, 24)},
+        {'name': 'Wärmepumpe', 'energy_kwh': 4.0, 'power_kw': 2.0, 'window': (0, 24)}
+    ]
+    limited = optimize_load_shifting(_prices(), loads, max_total_kw=3.0)
+    free = optimize_load_shifting(_prices(), loads, method='greedy')
+
+    total = limited['schedule'].sum(axis=1)
+    assert total.max() <= 3000.0 + 1e-6
+    assert limited['summary']['unserved_kwh'].sum() == pytest.approx(0.0)
+    assert limited['summary']['cost_optimized_eur'].sum() >= free['summary']['cost_optimized_eur'].sum()
+
+
+def test_shifted_consumption_feeds_cost_comparison():
+    """Moving a load from the evening into the night lowers the EPEX cost"""
+    prices = _prices(1)
+    consumption = pd.DataFrame({'value': 500.0}, index=pd.date_range('2024-03-04', periods=25, freq='h', tz='Europe/Berlin'))
+    consumption.loc[consumption.index.hour == 20, 'value'] += 2000.0
+    result = optimize_load_shifting(prices, [{'name': 'Last', 'energy_kwh': 2.0, 'power_kw': 2.0, 'window': (20, 6)}])
+
+    before = calculate_costs(consumption, prices.rename(columns={'value': 'EPEX'}))
+    after = calculate_costs(apply_schedule(consumption, result), prices.rename(columns={'value': 'EPEX'}))
+
+    assert after['EPEX'] == pytest.approx(before['EPEX'] - result['summary']['savings_eur'].sum())
+    assert result['summary'].loc['Last', 'savings_eur'] == pytest.approx(2.0 * (0.27 - 0.10))
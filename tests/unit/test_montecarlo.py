@@ -0,0 +1,42 @@
+"""
+Unit tests for the bootstrapped price-day Monte Carlo cost engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.montecarlo import bootstrap_price_matrix, daily_price_profiles, simulate_cost_distribution
+
+
+def _weekday_prices(days=56):
+    """Hourly prices that only depend on the weekday (Monday 0.10 ... Sunday 0.16)"""
+    index = pd.date_range('2024-01-01', periods=days * 24, freq='h', tz='Europe/Berlin')
+    return pd.DataFrame({'value': 0.10 + 0.01 * index.weekday}, index=index)
+
+
+def test_blocks_keep_weekday_alignment():
+    """Every synthetic day carries the price profile of its own weekday"""
+    days, profiles = daily_price_profiles(_weekday_prices())
+    target = pd.date_range('2024-02-07', periods=30, freq='D', tz='Europe/Berlin')
+
+    matrix = bootstrap_price_matrix(days, profiles, target, 50, block_days=7, rng=np.random.default_rng(0))
+
+    assert matrix.shape == (50, 30 * 24)
+    expected = np.repeat(0.10 + 0.01 * target.weekday.to_numpy(), 24)
+    np.testing.assert_allclose(matrix, np.broadcast_to(expected, matrix.shape), rtol=1e-6)
+
+
+def test_cost_distribution_quantiles():
+    """Savings quantiles are ordered and reproducible for a fixed seed"""
+    rng = np.random.default_rng(2)
+    prices = _weekday_prices()
+    prices['value'] += rng.normal(0, 0.02, len(prices))
+    consumption = pd.DataFrame({'value': 1000.0}, index=pd.date_range('2024-02-01', periods=14 * 24 + 1, freq='h', tz='Europe/Berlin'))
+
+    first = simulate_cost_distribution(consumption, prices, n_scenarios=500, current_tariff=0.30, seed=7, chunk_size=128)
+    second = simulate_cost_distribution(consumption, prices, n_scenarios=500, current_tariff=0.30, seed=7, chunk_size=128)
+
+    assert first['current_cost_eur'] == pytest.approx(14 * 24 * 0.30)
+    assert first['savings_quantiles'].is_monotonic_increasing
+    assert first['probability_savings'] == 1.0
+    np.testing.assert_allclose(first['costs_eur'], second['costs_eur'], rtol=1e-6)
@@ -0,0 +1,49 @@
+"""
+Unit tests for the calendar-code load-profile engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.consumption import get_consumption_by_hour
+from core.analysis.profile import LoadProfile, calendar_codes
+
+
+def _power(values, start='2024-03-04', freq='15min'):
+    index = pd.date_range(start, periods=len(values), freq=freq, tz='UTC', name='time')
+    return pd.DataFrame({'value': np.asarray(values, dtype=float)}, index=index)
+
+
+def test_profiles_are_energy_weighted_in_local_time():
+    """Uneven sampling does not bias the hourly energy; hours follow Europe/Berlin"""
+    # One week at 1 kW, sampled every minute from 06:00 to 07:00 UTC and every 15 min otherwise
+    dense = _power(np.full(60, 1000.0), start='2024-03-04 06:00', freq='1min')
+    sparse = _power(np.full(7 * 96, 1000.0))
+    data = pd.concat([sparse[~sparse.index.isin(dense.index)], dense]).sort_index()
+
+    profile = LoadProfile(data, tz='Europe/Berlin')
+    by_hour = get_consumption_by_hour(data, profile=profile)
+    # 07:00 local (06:00 UTC) carries 1 kWh per day like every other hour; the last sample
+    # (23:45 UTC = 00:45 local) is not held
+    expected = np.full(24, 7.0)
+    expected[0] = 6.75
+    assert by_hour.to_numpy() == pytest.approx(expected)
+
+    table = profile.profile('weekday', 'hour', statistic='power')
+    assert table.shape == (7, 24)
+    assert np.nanmax(np.abs(table.to_numpy() - 1.0)) < 1e-9
+    assert profile.typical_day().loc[7] == pytest.approx(1.0)
+    # Codes are cached per (start, hours, time zone)
+    assert calendar_codes(int(profile.edge_ns[0]), len(profile), 'Europe/Berlin') is profile.codes
+
+
+def test_cost_by_hour_uses_quarter_hour_prices():
+    """15 minute prices inside an hour are weighted by the energy drawn in each quarter"""
+    data = _power([4000.0, 0.0, 0.0, 0.0, 0.0], freq='15min')
+    prices = _power([0.4, 0.1, 0.1, 0.1, 0.1], freq='15min')
+
+    cost = LoadProfile(data, prices=prices, tz='UTC').cost_by_hour()
+
+    assert cost.loc[0, 'priced_kwh'] == pytest.approx(1.0)
+    assert cost.loc[0, 'cost_eur'] == pytest.approx(0.4)
+    assert cost.loc[0, 'price_eur_kwh'] == pytest.approx(0.4)
@@ -0,0 +1,56 @@
+"""
+Unit tests for the incremental rolling-window state behind analyze_realtime
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.realtime import RealtimeWindow, analyze_realtime, create_realtime_windows
+
+
+def _series(start, periods, freq, values):
+    index = pd.date_range(start, periods=periods, freq=freq, tz='Europe/Berlin', name='time')
+    return pd.DataFrame({'value': values}, index=index)
+
+
+def test_windows_match_time_based_slicing():
+    """Running sums and monotonic queues agree with masks over the trailing windows"""
+    rng = np.random.default_rng(3)
+    data = _series('2024-01-01', 2000, '37s', rng.uniform(0, 4000, 2000))
+    window = RealtimeWindow([5, 15, 60], capacity=8)
+
+    # Feed in uneven batches; already seen samples are skipped
+    for end in (10, 11, 700, 700, 2000):
+        window.update(data.iloc[:end])
+
+    now = data.index[-1]
+    for minutes in (5, 15, 60):
+        expected = data['value'][data.index > now - pd.Timedelta(minutes=minutes)]
+        stats = window.stats(minutes)
+        assert stats['count'] == len(expected)
+        assert stats['mean'] == pytest.approx(expected.mean())
+        assert stats['min'] == expected.min()
+        assert stats['max'] == expected.max()
+    # Only the longest window (plus one held sample) is kept in memory
+    assert len(window) <= 60 * 60 // 37 + 2
+
+
+def test_realtime_energy_is_time_based():
+    """Quarter-hour energy and EPEX stats use time windows, not row counts"""
+    consumption = _series('2024-01-01 10:00', 121, '30s', [2000.0] * 121)
+    prices = _series('2024-01-01 09:00', 3, '15min', [0.10, 0.20, 0.40])
+    consumption_window, price_window = create_realtime_windows()
+
+    result = analyze_realtime(consumption, prices, 0.30, consumption_window, price_window)
+
+    # 2 kW held for 15 minutes / 60 minutes
+    assert result['total_consumption_last_quarter_kwh'] == pytest.approx(0.5)
+    assert result['total_consumption_last_hour_kwh'] == pytest.approx(2.0)
+    assert result['current_epex'] == pytest.approx(0.40)
+    # Three 15-minute prices cover the last hour up to the newest price
+    assert result['max_epex_last_hour'] == pytest.approx(0.40)
+    assert result['min_epex_last_hour'] == pytest.approx(0.10)
+
+    # A refresh with one more sample only appends that sample
+    more = _series('2024-01-01 10:00', 122, '30s', [2000.0] * 121 + [0.0])
+    assert consumption_window.update(more) == 1
@@ -0,0 +1,68 @@
+"""
+Unit tests for the multi-granularity rollup engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.consumption import analyze_monthly_consumption, get_consumption_by_hour
+from core.analysis.rollup import compute_rollups, period_edges
+
+
+@pytest.fixture
+def power():
+    # Two months of 15 minute samples at 1 kW with a 3 kW spike
+    index = pd.date_range('2023-01-30', '2023-02-02', freq='15min', tz='UTC', inclusive='left', name='time')
+    values = np.full(len(index), 1000.0)
+    values[10] = 3000.0
+    return pd.DataFrame({'value': values}, index=index)
+
+
+def test_rollups_for_all_granularities(power):
+    """Every granularity reports energy, extremes, counts and coverage from one pass"""
+    before = power.copy()
+    rollups = compute_rollups(power)
+
+    pd.testing.assert_frame_equal(power, before)
+    assert set(rollups) == {'hour', 'day', 'week', 'month', 'year'}
+
+    hour = rollups['hour']
+    assert len(hour) == 72
+    assert hour['count'].tolist() == [4] * 72
+    assert hour['max_w'].iloc[2] == 3000.0
+
+    day = rollups['day']
+    assert day['energy_kwh'].iloc[0] == pytest.approx(24.5)
+    assert day['min_w'].iloc[0] == 1000.0
+    # The last sample is not held, so the last day is covered for 23h45
+    assert day['coverage'].iloc[-1] == pytest.approx(23.75 / 24)
+
+    month = rollups['month']
+    assert month.index.tolist() == [pd.Timestamp('2023-01-01', tz='UTC'), pd.Timestamp('2023-02-01', tz='UTC')]
+    assert month['energy_kwh'].sum() == pytest.approx(rollups['year']['energy_kwh'].sum())
+    assert month['count'].sum() == len(power)
+    assert rollups['week'].index[0] == pd.Timestamp('2023-01-30', tz='UTC')
+
+
+def test_calendar_edges_follow_local_time():
+    """Day edges in local time stay at midnight across the DST switch"""
+    edges = period_edges(pd.Timestamp('2023-03-25 12:00', tz='Europe/Berlin'),
+                         pd.Timestamp('2023-03-27 12:00', tz='Europe/Berlin'), 'day')
+
+    assert [edge.hour for edge in edges] == [0, 0, 0, 0]
+    assert (edges[2] - edges[1]) == pd.Timedelta(hours=23)
+
+
+def test_views_over_rollups(power):
+    """Monthly and hour-of-day analyses are views over the shared rollups"""
+    rollups = compute_rollups(power)
+
+    monthly = analyze_monthly_consumption(power, rollups)
+    assert list(monthly) == ['2023-01', '2023-02']
+    assert monthly['2023-01']['total_consumption_kwh'] == pytest.approx(48.5)
+    assert monthly['2023-01']['max_power_w'] == 3000.0
+
+    by_hour = get_consumption_by_hour(power, rollups)
+    assert len(by_hour) == 24
+    assert by_hour.sum() == pytest.approx(rollups['hour']['energy_kwh'].sum())
+    assert 'hour' not in power.columns
@@ -0,0 +1,86 @@
+"""
+Unit tests for the persistent, incrementally maintained rollup store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.consumption import analyze_historical_consumption, analyze_monthly_consumption
+from core.analysis.rollup import compute_rollups
+from core.analysis.rollup_store import RollupStore
+from core.analysis.timeindex import TimeSeriesIndex
+
+
+def _power(periods, start='2024-03-29', freq='1min', seed=0):
+    index = pd.date_range(start, periods=periods, freq=freq, tz='Europe/Berlin', name='time')
+    values = np.random.default_rng(seed).uniform(100, 3000, periods)
+    return pd.DataFrame({'value': values}, index=index)
+
+
+def test_incremental_updates_match_one_shot_and_compute_rollups(tmp_path):
+    """Batches over the DST switch add up to the same rollups as a single pass over the raw data"""
+    data = _power(4 * 24 * 60)
+    prices = pd.DataFrame({'value': np.linspace(0.1, 0.4, 4 * 96)},
+                          index=pd.date_range('2024-03-29', periods=4 * 96, freq='15min', tz='Europe/Berlin'))
+    once = RollupStore(str(tmp_path / 'once.sqlite'))
+    batched = RollupStore(str(tmp_path / 'batched.sqlite'))
+
+    assert once.update('sensor.grid', data, prices) == len(data)
+    assert batched.update('sensor.grid', data.iloc[:1000], prices) == 1000
+    # Overlapping batches only add samples after the watermark
+    assert batched.update('sensor.grid', data.iloc[:3000], prices) == 2000
+    batched.update('sensor.grid', data, prices)
+    assert batched.update('sensor.grid', data, prices) == 0
+
+    expected = compute_rollups(data)
+    first, second = once.rollups('sensor.grid'), batched.rollups('sensor.grid')
+    for granularity in ('hour', 'day', 'month'):
+        reference = expected[granularity].loc[first[granularity].index]
+        for column in ('energy_kwh', 'mean_w', 'min_w', 'max_w', 'count', 'coverage'):
+            assert first[granularity][column].to_numpy() == pytest.approx(reference[column].to_numpy())
+            assert second[granularity][column].to_numpy() == pytest.approx(reference[column].to_numpy())
+        assert second[granularity]['cost_eur'].to_numpy() == pytest.approx(first[granularity]['cost_eur'].to_numpy())
+    # 31 March has 23 hours, so 96 hours of data end at 01:00 on 2 April (last sample not held)
+    assert first['day']['covered_hours'].tolist() == pytest.approx([24.0, 24.0, 23.0, 24.0, 1.0 - 1 / 60])
+
+
+def test_store_path_matches_raw_path_for_a_sub_range(tmp_path):
+    """A loaded sub-range of a larger store yields the raw-path results; partial hours come from raw data"""
+    history = _power(22 * 24 * 60, start='2024-01-20')
+    store = RollupStore(str(tmp_path / 'rollups.sqlite'))
+    store.update('sensor.house', history)
+    # Dashboard range inside the stored history, across a month boundary and off the hour grid
+    data = history.loc['2024-01-28 07:20':'2024-02-03 16:40']
+    raw_index = TimeSeriesIndex(data)
+    index = store.index('sensor.house', fallback=raw_index)
+
+    # Periods beyond the loaded data (e.g. "Aktuelles Jahr") use the stored history up to its
+    # last closed hour (the hour of the newest stored sample is still open)
+    history_index = TimeSeriesIndex(history)
+    for start, end, reference in (('2024-01-29', '2024-01-31', raw_index),
+                                  ('2024-01-28 10:30', '2024-02-02 09:15', raw_index),
+                                  ('2024-01-01', '2024-02-10 23:00', history_index)):
+        stored = index.stats(pd.Timestamp(start, tz='Europe/Berlin'), pd.Timestamp(end, tz='Europe/Berlin'))
+        raw = reference.stats(pd.Timestamp(start, tz='Europe/Berlin'), pd.Timestamp(end, tz='Europe/Berlin'))
+        assert stored.keys() == raw.keys()
+        for key in raw:
+            assert stored[key] == pytest.approx(raw[key])
+
+    from_store = analyze_historical_consumption(data, index=index)
+    from_raw = analyze_historical_consumption(data)
+    for key in ('total_consumption_kwh', 'duration_hours', 'average_power_w', 'max_power_w', 'min_power_w', 'data_points'):
+        assert from_store[key] == pytest.approx(from_raw[key])
+    assert from_store['start_time'] == from_raw['start_time']
+    assert from_store['end_time'] == from_raw['end_time']
+
+    monthly_store = analyze_monthly_consumption(data, index=index)
+    monthly_raw = analyze_monthly_consumption(data)
+    assert monthly_store.keys() == monthly_raw.keys() == {'2024-01', '2024-02'}
+    for month, values in monthly_raw.items():
+        for key in values:
+            assert monthly_store[month][key] == pytest.approx(values[key])
+
+    # Stored rollups only contain whole periods inside the requested range
+    days = store.rollups('sensor.house', '2024-01-28 07:20', '2024-02-03 16:40', granularities=('day',))['day']
+    assert days.index[0] == pd.Timestamp('2024-01-29', tz='Europe/Berlin')
+    assert days.index[-1] == pd.Timestamp('2024-02-02', tz='Europe/Berlin')
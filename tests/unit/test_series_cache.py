@@ -0,0 +1,93 @@
+"""
+Unit tests for the on-disk Parquet series cache
+"""
+
+import pytest
+import pandas as pd
+from core.data.cache import SeriesCache
+
+
+def _wide(start, end, entity_ids=('house', 'grid'), freq='1h'):
+    index = pd.date_range(start, end, freq=freq, tz='UTC', inclusive='left', name='time')
+    return pd.concat({entity_id: pd.DataFrame({'value': 1.0}, index=index) for entity_id in entity_ids}, axis=1)
+
+
+class RecordingFetcher:
+    """Serves synthetic hourly data and records the requested ranges"""
+
+    def __init__(self):
+        self.ranges = []
+
+    def __call__(self, start, end):
+        self.ranges.append((start, end))
+        return _wide(start, end)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SeriesCache(str(tmp_path), max_size_mb=50, settle_minutes=0)
+
+
+def test_closed_days_are_served_from_disk(cache):
+    """A second request for past days does not hit InfluxDB again"""
+    fetcher = RecordingFetcher()
+    start, end = pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-03')
+
+    first = cache.fetch('senec', ['house', 'grid'], 'raw', start, end, fetcher)
+    assert len(fetcher.ranges) == 1
+
+    # Cache hits only touch the in-memory access times, the manifest file is not rewritten
+    saves = []
+    cache._save_manifest = lambda: saves.append(1)
+    second = cache.fetch('senec', ['house', 'grid'], 'raw', start, end, fetcher)
+    assert len(fetcher.ranges) == 1
+    assert saves == []
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+
+
+def test_only_missing_days_are_fetched(cache):
+    """Extending the range fetches just the new days"""
+    fetcher = RecordingFetcher()
+    cache.fetch('senec', ['house', 'grid'], 'raw', pd.Timestamp('2023-01-02'), pd.Timestamp('2023-01-03'), fetcher)
+    fetcher.ranges.clear()
+
+    result = cache.fetch('senec', ['house', 'grid'], 'raw', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-04'), fetcher)
+
+    assert fetcher.ranges == [
+        (pd.Timestamp('2023-01-01', tz='UTC'), pd.Timestamp('2023-01-02', tz='UTC')),
+        (pd.Timestamp('2023-01-04', tz='UTC'), pd.Timestamp('2023-01-05', tz='UTC')),
+    ]
+    assert result.index.min() == pd.Timestamp('2023-01-01', tz='UTC')
+    assert result.index.max() == pd.Timestamp('2023-01-04', tz='UTC')
+
+
+def test_open_day_is_always_refetched(cache):
+    """The still-open current day is never stored"""
+    fetcher = RecordingFetcher()
+    now = pd.Timestamp.now(tz='UTC')
+    start = now.floor('D') - pd.Timedelta(days=1)
+
+    cache.fetch('epex', ['house', 'grid'], 'raw', start, now, fetcher)
+    fetcher.ranges.clear()
+    cache.fetch('epex', ['house', 'grid'], 'raw', start, now, fetcher)
+
+    assert fetcher.ranges == [(now.floor('D'), now)]
+
+
+def test_manifest_survives_restart_and_evicts_by_size(tmp_path):
+    """Coverage is persisted and the oldest days are evicted once the size limit is hit"""
+    cache = SeriesCache(str(tmp_path), max_size_mb=50, settle_minutes=0)
+    cache.fetch('senec', ['house'], 'raw', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-10'),
+                lambda start, end: _wide(start, end, ('house',), freq='1min'))
+
+    reopened = SeriesCache(str(tmp_path), max_size_mb=50, settle_minutes=0)
+    _, missing = reopened.lookup('senec', ['house'], 'raw', pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-09 12:00'))
+    assert missing == []
+
+    size = reopened.size_bytes()
+    small = SeriesCache(str(tmp_path), max_size_mb=size / 2 / 1024 / 1024, settle_minutes=0)
+    small.store('senec', ['house'], 'raw', _wide('2023-02-01', '2023-02-02', ('house',), freq='1min'),
+                [(pd.Timestamp('2023-02-01'), pd.Timestamp('2023-02-02'))])
+    assert small.size_bytes() <= size / 2
+    _, missing = small.lookup('senec', ['house'], 'raw', pd.Timestamp('2023-02-01'), pd.Timestamp('2023-02-01 12:00'))
+    assert missing == []
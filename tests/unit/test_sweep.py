@@ -0,0 +1,54 @@
+"""
+Unit tests for the shared-memory scenario sweep runner
+"""
+
+import numpy as np
+import pytest
+from core.analysis.sweep import SharedArrays, evaluate_batteries, evaluate_tariffs, run_sweep
+
+
+def _inputs(n=2000):
+    rng = np.random.default_rng(11)
+    hours = np.full(n, 1 / 60)
+    return {
+        'net_kwh': rng.normal(0.0, 2.0, n) * hours,
+        'hours': hours,
+        'price': rng.uniform(0.05, 0.4, n)
+    }
+
+
+def test_shared_arrays_round_trip():
+    """Arrays placed in shared memory are readable through the descriptor layout"""
+    inputs = _inputs()
+    with SharedArrays(inputs) as shared:
+        name, layout = shared.descriptor
+        assert [entry[0] for entry in layout] == list(inputs)
+        for key, values in inputs.items():
+            np.testing.assert_array_equal(shared.arrays[key], values)
+
+
+def test_process_pool_matches_in_process_run():
+    """Scenarios evaluated in worker processes give the same tidy table as in-process"""
+    inputs = _inputs()
+    scenarios = [{'capacity_kwh': capacity, 'markup_eur_kwh': markup} for capacity in (0.0, 0.5, 2.0) for markup in (0.0, 0.1)]
+    calls = []
+
+    parallel = run_sweep(inputs, scenarios, evaluate_batteries, max_workers=2, batch_size=2,
+                         progress=lambda done, total, elapsed: calls.append((done, total)))
+    sequential = run_sweep(inputs, scenarios, evaluate_batteries, max_workers=1)
+
+    assert list(parallel.columns[:2]) == ['capacity_kwh', 'markup_eur_kwh']
+    assert calls[-1] == (6, 6)
+    np.testing.assert_allclose(parallel['cost_eur'], sequential['cost_eur'])
+    assert parallel.loc[0, 'savings_eur'] == pytest.approx(0.0, abs=1e-9)
+    assert (parallel.loc[2:, 'savings_eur'] > 0).all()
+
+
+def test_tariff_scenarios():
+    """Flat and dynamic tariffs are priced against the same grid import"""
+    inputs = _inputs()
+    result = run_sweep(inputs, [{'flat_price': 0.30}, {'markup_eur_kwh': 0.0}], evaluate_tariffs, max_workers=1)
+
+    imported = np.maximum(inputs['net_kwh'], 0.0)
+    assert result.loc[0, 'cost_eur'] == pytest.approx(imported.sum() * 0.30)
+    assert result.loc[1, 'cost_eur'] == pytest.approx(imported @ inputs['price'])
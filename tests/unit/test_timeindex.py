@@ -0,0 +1,53 @@
+"""
+Unit tests for the prefix-sum time series index used for ad-hoc range queries
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis.timeindex import TimeSeriesIndex
+
+
+def _random_power(n=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2023-03-20', periods=n, freq='10s', tz='Europe/Berlin', name='time')
+    values = rng.uniform(0, 5000, n)
+    values[rng.choice(n, n // 20, replace=False)] = np.nan
+    return pd.DataFrame({'value': values}, index=index)
+
+
+def test_range_queries_match_slicing():
+    """Count, mean, std, min and max for [start, end) agree with a boolean mask"""
+    data = _random_power()
+    index = TimeSeriesIndex(data)
+    rng = np.random.default_rng(1)
+
+    for _ in range(200):
+        a, b = sorted(rng.integers(0, len(data) + 1, 2))
+        start = data.index[0] + pd.Timedelta(seconds=10 * int(a) - 3)
+        end = data.index[0] + pd.Timedelta(seconds=10 * int(b))
+        window = data['value'][(data.index >= start) & (data.index < end)].dropna()
+
+        stats = index.stats(start, end)
+        assert stats['count'] == len(window)
+        if len(window):
+            assert stats['sample_mean_w'] == pytest.approx(window.mean())
+            assert stats['std_w'] == pytest.approx(window.std(ddof=0), rel=1e-6, abs=1e-6)
+            assert stats['min_w'] == window.min()
+            assert stats['max_w'] == window.max()
+        else:
+            assert np.isnan(stats['min_w']) and np.isnan(stats['max_w'])
+
+
+def test_energy_is_time_weighted_and_half_open():
+    """Energy comes from the integrator; the end boundary sample is excluded"""
+    index_values = pd.DatetimeIndex(['2023-01-01 00:00', '2023-01-01 00:30', '2023-01-01 01:00'], tz='UTC')
+    data = pd.DataFrame({'value': [2000.0, 4000.0, 1000.0]}, index=index_values)
+    index = TimeSeriesIndex(data)
+
+    stats = index.stats(pd.Timestamp('2023-01-01 00:00'), pd.Timestamp('2023-01-01 01:00'))
+    assert stats['count'] == 2
+    assert stats['energy_kwh'] == pytest.approx(3.0)
+    assert stats['mean_w'] == pytest.approx(3000.0)
+    assert stats['max_w'] == 4000.0
+    assert index.count(pd.Timestamp('2023-01-01 01:00'), pd.Timestamp('2023-01-01 02:00')) == 1
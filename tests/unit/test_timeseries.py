@@ -0,0 +1,49 @@
+"""
+Unit tests for the compact array-backed TimeSeries container
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.analysis import analyze_historical_consumption, analyze_time_period
+from core.analysis.energy import EnergyIntegrator
+from core.analysis.rollup import compute_rollups
+from core.data.timeseries import TimeSeries, to_timeseries
+
+
+def _frame(periods=5000, freq='10s'):
+    rng = np.random.default_rng(11)
+    index = pd.date_range('2024-03-30', periods=periods, freq=freq, tz='Europe/Berlin', name='time')
+    return pd.DataFrame({'value': rng.uniform(0, 4000, periods)}, index=index)
+
+
+def test_slicing_is_zero_copy_and_round_trips():
+    """Time slices share memory with the parent and convert back to the same frame"""
+    frame = _frame()
+    series = to_timeseries(frame, unit='W', entity_id='sensor.house')
+
+    assert series.values.dtype == np.float32
+    assert series.nbytes == len(frame) * 12
+    part = series.between('2024-03-30 01:00', '2024-03-30 02:00')
+    assert np.shares_memory(part.values, series.values)
+    assert len(part) == 360
+    assert part.start == pd.Timestamp('2024-03-30 01:00', tz='Europe/Berlin')
+    assert len(series.tail('1h')) == 361
+
+    back = part.to_pandas()
+    expected = frame.loc['2024-03-30 01:00':'2024-03-30 01:59:59']
+    pd.testing.assert_index_equal(back.index, expected.index.as_unit('ns'))
+    np.testing.assert_allclose(back['value'], expected['value'], rtol=1e-6)
+    assert to_timeseries(None) is None
+
+
+def test_analysis_accepts_timeseries():
+    """Energy, rollups and period stats match the DataFrame path (float64 container)"""
+    frame = _frame(periods=20000, freq='13s')
+    series = TimeSeries.from_pandas(frame, dtype=np.float64)
+
+    assert EnergyIntegrator(series).total_kwh() == pytest.approx(EnergyIntegrator(frame).total_kwh())
+    pd.testing.assert_frame_equal(compute_rollups(series)['day'], compute_rollups(frame)['day'])
+    assert analyze_historical_consumption(series)['max_power_w'] == pytest.approx(frame['value'].max())
+    period = analyze_time_period(series, '2024-03-30 06:00', '2024-03-30 18:00', 'Tag')
+    assert period == analyze_time_period(frame, '2024-03-30 06:00', '2024-03-30 18:00', 'Tag')
@@ -0,0 +1,89 @@
+"""
+Unit tests for the time-window normalizer and in-process window memo
+"""
+
+import pandas as pd
+from core.data.cache import assemble_frames
+from core.data.windows import WindowMemo, split_window
+
+
+def _wide(start, end, freq='5min'):
+    index = pd.date_range(start, end, freq=freq, tz='UTC', name='time')
+    return pd.concat({'house': pd.DataFrame({'value': range(len(index))}, index=index, dtype=float)}, axis=1)
+
+
+class RecordingFetcher:
+    """Serves synthetic 5 minute data and records the requested ranges"""
+
+    def __init__(self):
+        self.ranges = []
+
+    def __call__(self, start, end):
+        self.ranges.append((start, end))
+        return _wide(start, end)
+
+
+def _fetch(memo, fetcher, start, end):
+    frames, missing = memo.lookup('senec', ['house'], 'raw', start, end)
+    for range_start, range_end in missing:
+        fetched = fetcher(range_start, range_end)
+        memo.store('senec', ['house'], 'raw', fetched, [(range_start, range_end)])
+        frames.append(fetched)
+    return assemble_frames(frames, start, end)
+
+
+def test_split_window_aligns_buckets_and_tail():
+    """Closed buckets are UTC-aligned, the unsettled rest becomes the tail"""
+    buckets, tail = split_window(pd.Timestamp('2023-01-01 00:30'), pd.Timestamp('2023-01-01 03:20'),
+                                 3600, pd.Timestamp('2023-01-01 03:20', tz='UTC'))
+
+    assert [bucket.hour for bucket in buckets] == [0, 1, 2]
+    assert tail == (pd.Timestamp('2023-01-01 03:00', tz='UTC'), pd.Timestamp('2023-01-01 03:20', tz='UTC'))
+
+    # Historical ranges are fully covered by closed buckets
+    buckets, tail = split_window(pd.Timestamp('2023-01-01 00:30'), pd.Timestamp('2023-01-01 03:20'),
+                                 3600, pd.Timestamp('2024-01-01', tz='UTC'))
+    assert len(buckets) == 4
+    assert tail is None
+
+
+def test_warm_refresh_only_fetches_tail():
+    """A moving 'now' only refetches the open tail once the closed buckets are memoized"""
+    memo = WindowMemo(bucket_seconds=3600, tail_ttl_seconds=0, settle_minutes=0)
+    fetcher = RecordingFetcher()
+    end = pd.Timestamp.now(tz='UTC')
+    start = end - pd.Timedelta(days=30)
+
+    first = _fetch(memo, fetcher, start, end)
+    cold_ranges = len(fetcher.ranges)
+
+    second = _fetch(memo, fetcher, start + pd.Timedelta(seconds=1), end + pd.Timedelta(seconds=1))
+
+    assert len(fetcher.ranges) == cold_ranges + 1
+    tail_start, tail_end = fetcher.ranges[-1]
+    assert tail_end - tail_start <= pd.Timedelta(hours=1)
+    assert second.index.is_unique
+    assert second.index[-1] >= first.index[-1]
+
+
+def test_tail_is_reused_within_ttl():
+    """Within the TTL even the tail is served from memory"""
+    memo = WindowMemo(bucket_seconds=3600, tail_ttl_seconds=60, settle_minutes=0)
+    fetcher = RecordingFetcher()
+    end = pd.Timestamp.now(tz='UTC')
+
+    _fetch(memo, fetcher, end - pd.Timedelta(hours=3), end)
+    calls = len(fetcher.ranges)
+    _fetch(memo, fetcher, end - pd.Timedelta(hours=3), end)
+
+    assert len(fetcher.ranges) == calls
+
+
+def test_memo_evicts_least_recently_used():
+    """The memo stays within its size limit"""
+    memo = WindowMemo(bucket_seconds=3600, max_size_mb=0.01, settle_minutes=0)
+    fetcher = RecordingFetcher()
+
+    _fetch(memo, fetcher, pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-10'))
+
+    assert 0 < memo.size_bytes() <= 0.01 * 1024 * 1024
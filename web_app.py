@@ -14,15 +14,22 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Importiere alle benötigten Module
 from core import CONFIG, TARIFF_PROVIDERS
-from core.data import (fetch_senec_house_power_data_v1, 
-                      fetch_senec_solar_generated_power_v1,
-                      fetch_senec_battery_power_v1,
-                      fetch_senec_grid_power_v1,
-                      generate_sample_tariff_data)
+from core.data import (fetch_dashboard_data,
+                      fetch_local_dashboard_data,
+                      get_entity_series,
+                      generate_sample_tariff_data,
+                      bucket_extremes,
+                      to_timeseries)
 from core.data.providers_mock import MockTariffProvider
-from core.data.influxdb_market import fetch_market_prices
-from core.analysis.realtime import analyze_realtime
-from core.analysis import analyze_historical_consumption, analyze_monthly_consumption, calculate_costs, find_best_alternative, get_consumption_by_hour
+from core.analysis.realtime import analyze_realtime, create_realtime_windows, realtime_window_minutes
+from core.analysis import analyze_historical_consumption, analyze_monthly_consumption, analyze_time_period, calculate_costs, find_best_alternative, get_consumption_by_hour
+from core.analysis.energy import EnergyIntegrator
+from core.analysis.rollup import compute_rollups
+from core.analysis.rollup_store import get_rollup_store
+from core.analysis.timeindex import TimeSeriesIndex
+from core.analysis.profile import LoadProfile
+from core.analysis.flow import aggregate_energy_flows, summarize_energy_flows
+from core.analysis.alignment import align_series
 
 import streamlit as st
 import plotly.express as px
@@ -111,12 +118,34 @@ def main():
     
     # Load all data sources
     with st.spinner("Lade Energiedaten..."):
-        # Fetch all power data sources
-        house_power_data = fetch_senec_house_power_data_v1(start_time, end_time)
-        solar_generated_data = fetch_senec_solar_generated_power_v1(start_time, end_time)
-        battery_power_data = fetch_senec_battery_power_v1(start_time, end_time)
-        grid_power_data = fetch_senec_grid_power_v1(start_time, end_time)
-        tariff_data = fetch_market_prices(start_time, end_time)
+        # Fetch all power data sources with a single batched query
+        entity_ids = CONFIG['data_sources']['influxdb']['entity_ids']
+        # The realtime windows need every sample, not bucket means: their tail is loaded at raw resolution
+        # (longest window plus one held interval before it)
+        tail_start = (min(end_time, datetime.now())
+                      - timedelta(minutes=max(realtime_window_minutes()) + float(CONFIG['max_gap_minutes'])))
+        if CONFIG['local_store']['enabled']:
+            # Local mirror kept current by the ingest worker (python main.py ingest); no InfluxDB round trips
+            dashboard_data = fetch_local_dashboard_data(start_time, end_time, list(entity_ids.values()),
+                                                        tail_start=tail_start)
+        else:
+            # SENEC and EPEX queries run concurrently on the long-lived async client from the registry
+            dashboard_data = fetch_dashboard_data(start_time, end_time, list(entity_ids.values()), tail_start=tail_start)
+        power_data = dashboard_data['power']
+        # Keep each series as compact int64/float32 arrays; pandas frames are only built for charts
+        house_power_data, solar_generated_data, battery_power_data, grid_power_data = (
+            to_timeseries(get_entity_series(power_data, entity_ids[key]), unit='W', entity_id=entity_ids[key])
+            for key in ('house_power', 'solar_generated', 'battery_power', 'grid_power'))
+        # Bucketed queries also return per-bucket min/max; the max/min statistics of the consumption use them
+        consumption_entity = entity_ids['grid_power' if grid_power_data is not None else 'house_power']
+        consumption_extremes = bucket_extremes(get_entity_series(power_data, consumption_entity), unit='W',
+                                               entity_id=consumption_entity)
+        house_tail_data, grid_tail_data = (
+            to_timeseries(get_entity_series(dashboard_data['power_tail'], entity_ids[key]), unit='W', entity_id=entity_ids[key])
+            for key in ('house_power', 'grid_power'))
+        tariff_data = dashboard_data['market_prices']
+        # Drop the wide frames so only the compact series stay alive for the rest of the rerun
+        del power_data, dashboard_data
         
         # Note: Raw data is in Wh, but our analysis expects W
         # Since we're dealing with power (instantaneous measurements), the values should be in W
@@ -162,7 +191,7 @@ def main():
         # Datenquellenstatus
         st.subheader("🔌 Datenquellen")
         if CONFIG["data_sources"]["influxdb"]["enabled"]:
-            st.success("✅ InfluxDB verbunden")
+            st.success("✅ Lokaler Store (Ingest-Worker)" if CONFIG["local_store"]["enabled"] else "✅ InfluxDB verbunden")
             
             # Status messages moved from main content
             if consumption_data is not None and not consumption_data.empty:
@@ -182,6 +211,16 @@ def main():
     
     # Use grid power data for analysis (this is what matters for provider switching)
     consumption_data = grid_power_data if grid_power_data is not None else house_power_data
+
+    # One shared time axis per rerun for the energy-flow analysis (prices hold until the next price)
+    aligned = align_series({'house': house_power_data, 'solar': solar_generated_data, 'battery': battery_power_data,
+                            'grid': grid_power_data, 'price': tariff_data},
+                           max_staleness_seconds={'price': None})
+    # Realtime axis from the raw tail only; the last price before the tail still applies
+    realtime_aligned = (align_series({'house': house_tail_data, 'grid': grid_tail_data, 'price': tariff_data},
+                                     grid=['house', 'grid'], max_staleness_seconds={'price': None})
+                        if house_tail_data is not None or grid_tail_data is not None else None)
+    realtime_key = 'grid' if realtime_aligned is not None and 'grid' in realtime_aligned else 'house'
     
     # Add energy flow analysis section
     st.header("🔄 Energiefluss-Analyse")
@@ -223,27 +262,41 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            st.metric("Hausverbrauch (aktuell)", f"{house_power_data['value'].iloc[-1]:.0f} W")
-            st.metric("Netzbezug (aktuell)", f"{grid_power_data['value'].iloc[-1]:.0f} W")
+            st.metric("Hausverbrauch (aktuell)", f"{house_power_data.last_value:.0f} W")
+            st.metric("Netzbezug (aktuell)", f"{grid_power_data.last_value:.0f} W")
         
         with col2:
-            house_avg = house_power_data['value'].mean()
-            grid_avg = grid_power_data['value'].mean()
+            house_avg = house_power_data.mean()
+            grid_avg = grid_power_data.mean()
             st.metric("Hausverbrauch (⌀)", f"{house_avg:.0f} W")
             st.metric("Netzbezug (⌀)", f"{grid_avg:.0f} W")
         
-        # Calculate self-consumption ratio
+        # Self-consumption and self-sufficiency from per-interval energy flows
         if solar_generated_data is not None and not solar_generated_data.empty:
-            solar_avg = solar_generated_data['value'].mean()
-            if solar_avg > 0:
-                self_consumption_ratio = max(0, (house_avg - grid_avg) / solar_avg)
-                st.metric("Eigenverbrauch", f"{self_consumption_ratio:.1%}")
+            daily_flows = aggregate_energy_flows(house_power_data, solar_generated_data, battery_power_data, grid_power_data, 'day',
+                                                 aligned=aligned)
+            if daily_flows is not None and not daily_flows.empty:
+                flow_totals = summarize_energy_flows(daily_flows)
+                col1, col2 = st.columns(2)
+                with col1:
+                    if flow_totals['solar_kwh'] > 0:
+                        st.metric("Eigenverbrauch", f"{flow_totals['self_consumption']:.1%}")
+                with col2:
+                    if flow_totals['house_kwh'] > 0:
+                        st.metric("Autarkie", f"{flow_totals['self_sufficiency']:.1%}")
     
     if consumption_data is not None and not consumption_data.empty:
         if tariff_data is not None and not tariff_data.empty:
                 
                 # Echtzeit-Analyse
-                realtime_result = analyze_realtime(consumption_data, tariff_data, CONFIG['current_tariff'])
+                # Rolling window state survives the auto-refresh, so each run only feeds newly arrived samples
+                if 'realtime_windows' not in st.session_state:
+                    st.session_state['realtime_windows'] = create_realtime_windows()
+                consumption_window, price_window = st.session_state['realtime_windows']
+                realtime_result = analyze_realtime(grid_tail_data if realtime_key == 'grid' else house_tail_data,
+                                                   tariff_data, CONFIG['current_tariff'],
+                                                   consumption_window, price_window,
+                                                   aligned=realtime_aligned, consumption_key=realtime_key)
                 
                 if realtime_result:
                     st.header("🔥 Echtzeit-Analyse - Letzte Stunde")
@@ -382,23 +435,8 @@ def main():
                     st.subheader("📊 Verbrauchsverlauf - Letzte Stunde")
                     
                     # Daten für die Visualisierung vorbereiten - zeitbasiert wie in den Berechnungen
-                    last_hour_data = consumption_data[consumption_data.index > (consumption_data.index[-1] - timedelta(hours=1))]
-                    
-                    # If no data in the last hour, use the last available data point
-                    if last_hour_data.empty:
-                        st.warning("⚠️ Keine Verbrauchsdaten in der letzten Stunde verfügbar. Zeige letzte verfügbare Daten.")
-                        # Use the last available data point and create a small time range around it
-                        last_available_time = consumption_data.index[-1]
-                        # Create a small time window around the last available data point
-                        time_window = timedelta(minutes=30)
-                        last_hour_data = consumption_data[
-                            (consumption_data.index >= (last_available_time - time_window)) &
-                            (consumption_data.index <= last_available_time)
-                        ]
-                    
-                    # If still no data, use just the last data point
-                    if last_hour_data.empty:
-                        last_hour_data = consumption_data.tail(1)
+                    # Zero-copy slice of the compact series; always contains at least the last sample
+                    last_hour_data = consumption_data.tail(timedelta(hours=1)).to_pandas()
                     
                     fig_consumption = go.Figure()
                     
@@ -560,10 +598,26 @@ def main():
                 st.markdown("---")
                 analysis_tab1, analysis_tab2, analysis_tab3 = st.tabs(["📊 Historische Analyse", "📅 Monatliche Analyse", "📈 Zeitperioden-Vergleich"])
                 
+                # Energy and rollups are computed once per run and shared by all tabs
+                integrator = EnergyIntegrator(consumption_data)
+                series_index = TimeSeriesIndex(consumption_data, integrator=integrator, extremes=consumption_extremes)
+                # Persistent hourly rollups are written only by the ingest worker from raw points
+                # (python main.py ingest); stored full hours replace the raw-data pass, partial edge
+                # hours and anything the store does not hold yet come from the loaded data
+                stored_index = None
+                rollup_store = get_rollup_store()
+                consumption_entity = consumption_data.entity_id
+                if rollup_store is not None and consumption_entity and rollup_store.covers(consumption_entity, consumption_data.start):
+                    stored_index = series_index = rollup_store.index(consumption_entity, fallback=series_index)
+                rollups = (compute_rollups(consumption_data, integrator=integrator, extremes=consumption_extremes)
+                           if stored_index is None else None)
+                # Hourly energy plus cached calendar codes; all profiles below are single bincounts
+                load_profile = LoadProfile(consumption_data, integrator=integrator, prices=tariff_data)
+                
                 with analysis_tab1:
                     col1, col2, col3, col4 = st.columns(4)
                     
-                    analysis_result = analyze_historical_consumption(consumption_data)
+                    analysis_result = analyze_historical_consumption(consumption_data, integrator, stored_index, consumption_extremes)
                     
                     if analysis_result:
                         with col1:
@@ -578,7 +632,7 @@ def main():
                         # Verbrauchskurve
                         st.subheader("Stromverbrauch über Zeit")
                         fig_consumption = px.line(
-                            consumption_data.reset_index(),
+                            consumption_data.to_pandas().reset_index(),
                             x='time',
                             y='value',
                             title='Stromverbrauch (Watt) über Zeit',
@@ -665,7 +719,7 @@ def main():
                             # Kostenverteilung nach Tageszeit
                             st.subheader("🕒 Verbrauch nach Tageszeit")
                             
-                            hourly_consumption = get_consumption_by_hour(consumption_data)
+                            hourly_consumption = get_consumption_by_hour(consumption_data, rollups, load_profile)
                             
                             if hourly_consumption is not None:
                                 fig_hourly_costs = go.Figure()
@@ -686,6 +740,35 @@ def main():
                                 )
                                 
                                 st.plotly_chart(fig_hourly_costs, width="stretch")
+                            
+                            if load_profile.cost_eur is not None:
+                                hourly_cost = load_profile.cost_by_hour()
+                                fig_cost_by_hour = go.Figure(go.Bar(
+                                    x=hourly_cost.index,
+                                    y=hourly_cost['cost_eur'],
+                                    customdata=hourly_cost['price_eur_kwh'],
+                                    hovertemplate='Stunde %{x}: %{y:.2f} € (⌀ %{customdata:.3f} €/kWh)<extra></extra>',
+                                    marker_color='orange'
+                                ))
+                                fig_cost_by_hour.update_layout(
+                                    title='EPEX Kosten nach Stunde des Tages',
+                                    xaxis_title='Stunde des Tages',
+                                    yaxis_title='Kosten (€)',
+                                    height=300,
+                                    xaxis=dict(tickmode='linear', tick0=0, dtick=1)
+                                )
+                                st.plotly_chart(fig_cost_by_hour, width="stretch")
+                            
+                            st.subheader("🗓️ Lastprofil (Wochentag × Stunde)")
+                            weekday_profile = load_profile.profile('weekday', 'hour', statistic='power')
+                            fig_heatmap = px.imshow(
+                                weekday_profile,
+                                labels={'x': 'Stunde', 'y': 'Wochentag', 'color': 'kW'},
+                                aspect='auto',
+                                color_continuous_scale='YlOrRd'
+                            )
+                            fig_heatmap.update_layout(height=320)
+                            st.plotly_chart(fig_heatmap, width="stretch")
                         else:
                             st.warning("⚠️ Keine EPEX Daten verfügbar für historischen Vergleich")
                     else:
@@ -696,7 +779,7 @@ def main():
                     # Monatliche Analyse
                     st.header("📅 Monatliche Verbrauchsanalyse")
                     
-                    monthly_result = analyze_monthly_consumption(consumption_data)
+                    monthly_result = analyze_monthly_consumption(consumption_data, rollups, stored_index)
                     
                     if monthly_result and len(monthly_result) > 0:
                         # Monatliche Statistiken anzeigen
@@ -781,81 +864,36 @@ def main():
                     # Zeitperioden-Vergleich
                     st.header("📈 Zeitperioden-Vergleich")
                     
-                    # Helper function to analyze a specific time period
-                    def analyze_time_period(data, start_time, end_time, period_name):
-                        """Analyze consumption data for a specific time period"""
-                        # Make timezone-aware if data has timezone
-                        if hasattr(data.index, 'tz') and data.index.tz is not None:
-                            # Convert datetime objects to timezone-aware using pandas
-                            if not isinstance(start_time, pd.Timestamp):
-                                start_time = pd.Timestamp(start_time).tz_localize(data.index.tz)
-                            if not isinstance(end_time, pd.Timestamp):
-                                end_time = pd.Timestamp(end_time).tz_localize(data.index.tz)
-                        
-                        period_data = data[(data.index >= start_time) & (data.index <= end_time)]
-                        
-                        if period_data.empty:
-                            return None
-                            
-                        # Calculate duration in hours
-                        duration_hours = (period_data.index.max() - period_data.index.min()).total_seconds() / 3600
-                        if duration_hours == 0:  # Handle case where all data points are at same timestamp
-                            duration_hours = len(period_data) / 3600  # Assume 1 second intervals
-                        
-                        # Correct kWh calculation: average power (kW) * duration (hours)
-                        average_power_w = period_data['value'].mean()
-                        total_consumption_kwh = (average_power_w / 1000) * duration_hours  # (W → kW) * hours = kWh
-                        
-                        # Power metrics in kW
-                        average_power_kw = average_power_w / 1000  # W to kW
-                        max_power_kw = period_data['value'].max() / 1000  # W to kW
-                        min_power_kw = period_data['value'].min() / 1000  # W to kW
-                        cost = total_consumption_kwh * current_tariff
-                        
-                        return {
-                            'period_name': period_name,
-                            'total_consumption_kwh': total_consumption_kwh,
-                            'average_power_kw': average_power_kw,
-                            'max_power_kw': max_power_kw,
-                            'min_power_kw': min_power_kw,
-                            'cost': cost,
-                            'data_points': len(period_data)
-                        }
-                    
-                    # Define time periods
+                    # Define time periods as half-open ranges [start, end)
                     now = datetime.now()
                     
                     # Today
                     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                    today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    today_end = today_start + timedelta(days=1)
                     
                     # Yesterday
-                    yesterday_start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-                    yesterday_end = (now - timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
+                    yesterday_start = today_start - timedelta(days=1)
+                    yesterday_end = today_start
                     
                     # Current Week (Monday to today)
-                    current_week_start = now - timedelta(days=now.weekday())
-                    current_week_start = current_week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-                    current_week_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    current_week_start = today_start - timedelta(days=now.weekday())
+                    current_week_end = today_end
                     
                     # Last Week (Monday to Sunday)
-                    last_week_end = current_week_start - timedelta(days=1)
-                    last_week_start = last_week_end - timedelta(days=6)
-                    last_week_start = last_week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-                    last_week_end = last_week_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    last_week_start = current_week_start - timedelta(days=7)
+                    last_week_end = current_week_start
                     
                     # This Month
-                    this_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                    this_month_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    this_month_start = today_start.replace(day=1)
+                    this_month_end = today_end
                     
                     # Last Month
-                    last_month_end = this_month_start - timedelta(days=1)
-                    last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                    last_month_end = last_month_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
+                    last_month_end = this_month_start
                     
                     # Current Year
-                    this_year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-                    this_year_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+                    this_year_start = today_start.replace(month=1, day=1)
+                    this_year_end = today_end
                     
                     # Analyze all periods
                     periods = [
@@ -870,7 +908,7 @@ def main():
                     
                     period_results = []
                     for start, end, name in periods:
-                        result = analyze_time_period(consumption_data, start, end, name)
+                        result = analyze_time_period(consumption_data, start, end, name, current_tariff, series_index)
                         if result:
                             period_results.append(result)
                     